@@ -1,39 +1,9 @@
 # analyzer-service/app/__init__.py
 """
 Analyzer Service Package
-"""
-__version__ = "1.0.0"
-
-
-# analyzer-service/app/models/__init__.py
-"""
-Database Models
-"""
-from app.models.task import Task
-
-__all__ = ['Task']
-
-
-# analyzer-service/app/routes/__init__.py
-"""
-API Routes
-"""
-from app.routes import upload, tasks
-
-__all__ = ['upload', 'tasks']
-
-
-# analyzer-service/app/services/__init__.py
-"""
-Business Logic Services
-"""
-__all__ = []
-
 
-# analyzer-service/app/workers/__init__.py
-"""
-Background Workers
+Subpackages are imported explicitly by their entry points (app.main for the
+API, app.workers.file_worker for the worker) so that starting the API does
+not load the worker and its embedding model.
 """
-from app.workers.file_worker import process_file, run_worker
-
-__all__ = ['process_file', 'run_worker']
\ No newline at end of file
+__version__ = "1.0.0"
@@ -27,20 +27,103 @@ class Settings(BaseSettings):
     MONGODB_PASSWORD: str = "admin123"
     MONGODB_DB: str = "logs"
     
+    # Event logging (buffered MongoDB writes)
+    EVENT_LOG_QUEUE_SIZE: int = 10000  # Events held in memory before dropping
+    EVENT_LOG_BATCH_SIZE: int = 500  # Events per insert_many
+    EVENT_LOG_FLUSH_INTERVAL_MS: int = 1000  # Max time an event waits in memory
+    EVENT_LOG_OVERFLOW_POLICY: str = "drop_new"  # "drop_new" or "drop_oldest" when the queue is full
+    
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     
+    # Task event streams (GET /events, server-sent events)
+    TASK_EVENTS_QUEUE_SIZE: int = 100  # Events buffered per connected client
+    TASK_EVENTS_HEARTBEAT_SECONDS: int = 15  # Keep-alive comment interval
+    TASK_EVENTS_MAX_STREAM_SECONDS: int = 300  # Streams end after this and the client reconnects
+    
     # File Upload
     UPLOAD_DIR: str = "/app/uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Bytes streamed to disk per read
+    MAX_BATCH_FILES: int = 100  # Files accepted by one POST /upload/batch
+    
+    # Embeddings (documents are embedded as overlapping chunks)
+    EMBEDDING_CHUNK_SIZE: int = 2000  # Characters per chunk
+    EMBEDDING_CHUNK_OVERLAP: int = 200  # Characters shared by consecutive chunks
+    EMBEDDING_MAX_CHUNKS: int = 16  # Caps per-document cost on huge files
+    EMBEDDING_BATCH_SIZE: int = 32  # Chunks per model forward pass
+    EMBEDDING_CACHE_SIZE: int = 10000  # In-process LRU entries (0 disables)
+    EMBEDDING_CACHE_REDIS: bool = True  # Share cached embeddings through Redis
+    EMBEDDING_CACHE_TTL: int = 7 * 24 * 3600  # Seconds
+    EMBEDDING_STORAGE_FORMAT: str = "float32"  # "float32", or "int8" for 4x smaller approximate vectors
+    EMBEDDING_LOAD_RETRY_SECONDS: int = 30  # Wait before retrying a failed model load (doubles per failure)
+    EMBEDDING_LOAD_RETRY_MAX_SECONDS: int = 600
+    
+    # Worker
+    WORKER_MODE: str = "single"  # "single": one job at a time, "batch": embed many files per model call
+    WORKER_BATCH_SIZE: int = 16  # Max jobs drained per batch
+    WORKER_BATCH_WAIT_MS: int = 200  # Max time spent filling a batch
+    WORKER_CONCURRENCY: int = 1  # Worker processes forked per container, sharing one loaded model
+    WORKER_SHUTDOWN_TIMEOUT: int = 60  # Seconds pool workers get to finish their job on SIGTERM
+    WORKER_FAST_LANE_WORKERS: int = 0  # Pool workers that only take "high" lane jobs (capacity kept for small files)
+    
+    # Queue lanes: jobs are routed by file size (or an explicit priority) and
+    # workers take them in weighted turns, so no lane starves
+    QUEUE_SMALL_FILE_MAX_SIZE: int = 256 * 1024  # Files up to this size (bytes) take the "high" lane
+    QUEUE_LARGE_FILE_MIN_SIZE: int = 2 * 1024 * 1024  # Files from this size take the "low" lane
+    QUEUE_WEIGHT_HIGH: int = 6  # Dequeue turns per round of each lane
+    QUEUE_WEIGHT_NORMAL: int = 3
+    QUEUE_WEIGHT_LOW: int = 1
+    
+    # Fair share: a user's jobs wait in their own sub-queue of each lane and
+    # are released to the lane queue one user per turn
+    FAIR_SHARE_ENABLED: bool = True
+    FAIR_SHARE_QUEUE_DEPTH: int = 4  # Released jobs kept waiting in each lane queue
+    FAIR_SHARE_MAX_RUNNING_PER_USER: int = 0  # Released, unfinished jobs per user (0: no cap)
+    FAIR_SHARE_SLOT_TIMEOUT: int = 900  # Seconds after which an unfinished job stops counting against the cap
+    FAIR_SHARE_RELEASE_INTERVAL: int = 5  # Seconds between releases of an idle worker
+    
+    # Similarity Index (per-user ANN indexes held by the API)
+    ANN_INDEX_MEMORY_BUDGET_MB: int = 512
+    ANN_MIN_TRAIN_SIZE: int = 2048  # Smaller indexes are always scanned exactly
+    ANN_NPROBE: int = 8  # Clusters probed per query: higher = better recall, slower
+    ANN_KMEANS_ITERATIONS: int = 8
+    SIMILARITY_CACHE_SIZE: int = 10000  # Cached search results per API process (0 disables)
+    
+    # Free-text search (GET /similarity/query encodes queries in the API)
+    QUERY_ENCODER_PRELOAD: bool = True  # Load the model at API startup instead of on the first query
+    QUERY_EMBEDDING_CACHE_SIZE: int = 10000  # Query embeddings kept per API process (0 disables)
+    QUERY_MAX_LENGTH: int = 1000  # Characters of a query
+    
+    # Keyword search (BM25 over the task_terms inverted index)
+    KEYWORD_MAX_TERMS_PER_DOCUMENT: int = 5000  # Most frequent distinct terms indexed per document
+    KEYWORD_BM25_K1: float = 1.2  # Term frequency saturation
+    KEYWORD_BM25_B: float = 0.75  # Document length normalization
+    KEYWORD_COMMON_TERM_RATIO: float = 0.1  # Terms in more documents only score documents matching a rarer query term
+    KEYWORD_FUSION_CANDIDATES: int = 100  # Results taken from each ranking before hybrid fusion
+    
+    # Near-duplicate detection (all pairs above a threshold, per user)
+    NEAR_DUPLICATE_THRESHOLD: float = 0.95  # Default cosine similarity of a near-duplicate pair
+    NEAR_DUPLICATE_BLOCK_SIZE: int = 2048  # Rows per matrix block; memory is block_size² float32 scores
+    
+    # Near-duplicates at ingest (MinHash signatures, LSH band index in Redis)
+    MINHASH_PERMUTATIONS: int = 128  # Signature length (power of two)
+    MINHASH_BANDS: int = 16  # LSH bands; more bands find less similar candidates (must divide the length)
+    MINHASH_JACCARD_THRESHOLD: float = 0.8  # Estimated shingle similarity that links a task to an earlier one
+    MINHASH_REUSE_EMBEDDING: bool = True  # Copy the linked task's embedding instead of running the model
     
     @property
     def postgres_url(self) -> str:
         """PostgreSQL connection URL"""
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
     
+    @property
+    def postgres_async_url(self) -> str:
+        """PostgreSQL connection URL for the asyncpg driver"""
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+    
     @property
     def mongodb_url(self) -> str:
         """MongoDB connection URL"""
@@ -4,10 +4,14 @@ Manages PostgreSQL and MongoDB connections
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pymongo import MongoClient
+import os
+
 from app.config import settings
+from app.services.event_logger import EventLogger
 
 # PostgreSQL Setup
 engine = create_engine(
@@ -20,31 +24,61 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async PostgreSQL Setup (asyncpg), used by the API routes so queries do not
+# block the event loop. The worker and create_all keep the sync engine.
+async_engine = create_async_engine(
+    settings.postgres_async_url,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20
+)
+
+# Objects stay loaded after commit: lazy refreshes cannot run implicitly in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # MongoDB Setup
 mongo_client = None
 mongo_db = None
+_mongo_pid = None
 
 
 def init_db():
     """Initialize database connections"""
-    global mongo_client, mongo_db
-    
     # Create PostgreSQL tables
     from app.models.task import Task
+    from app.models.task_chunk import TaskChunk
+    from app.models.near_duplicate import NearDuplicatePair
+    from app.models.task_term import TaskTerm
     Base.metadata.create_all(bind=engine)
     print("✓ PostgreSQL tables created")
     
     # Connect to MongoDB
-    mongo_client = MongoClient(settings.mongodb_url)
-    mongo_db = mongo_client[settings.MONGODB_DB]
+    connect_mongo()
     print("✓ MongoDB connected")
 
 
-def close_db():
+def connect_mongo():
+    """
+    Get the MongoDB database, connecting on first use in each process
+    
+    MongoClient is not fork-safe, so forked children (RQ work horses)
+    open their own client instead of reusing the parent's.
+    """
+    global mongo_client, mongo_db, _mongo_pid
+    
+    if mongo_client is None or _mongo_pid != os.getpid():
+        mongo_client = MongoClient(settings.mongodb_url)
+        mongo_db = mongo_client[settings.MONGODB_DB]
+        _mongo_pid = os.getpid()
+    return mongo_db
+
+
+async def close_db():
     """Close database connections"""
     global mongo_client
     if mongo_client:
         mongo_client.close()
+    await async_engine.dispose()
 
 
 def get_db():
@@ -59,6 +93,15 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Dependency for async PostgreSQL sessions
+    Usage: db: AsyncSession = Depends(get_async_db)
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def get_mongo_db():
     """
     Get MongoDB database instance
@@ -66,15 +109,25 @@ def get_mongo_db():
     return mongo_db
 
 
+# Buffered MongoDB event writer, see app.services.event_logger
+event_logger = EventLogger(
+    get_db=connect_mongo,
+    max_queue_size=settings.EVENT_LOG_QUEUE_SIZE,
+    batch_size=settings.EVENT_LOG_BATCH_SIZE,
+    flush_interval=settings.EVENT_LOG_FLUSH_INTERVAL_MS / 1000,
+    overflow_policy=settings.EVENT_LOG_OVERFLOW_POLICY
+)
+
+
 def log_event(collection: str, event: dict):
     """
     Log event to MongoDB
     
+    The event is queued and written in the background by event_logger,
+    so callers never wait on MongoDB.
+    
     Args:
         collection: Collection name
         event: Event data to log
     """
-    try:
-        mongo_db[collection].insert_one(event)
-    except Exception as e:
-        print(f"Failed to log event: {e}")
\ No newline at end of file
+    event_logger.log(collection, event)
@@ -3,14 +3,28 @@ Analyzer Service - FastAPI Entry Point
 Handles file upload and task management
 """
 
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 
 from app.config import settings
-from app.database import init_db, close_db
-from app.routes import upload, tasks, similarity
+from app.database import init_db, close_db, event_logger
+from app.redis_client import get_lane_stats
+from app.services.ann_index import ann_index_registry
+from app.services.query_encoder import query_encoder
+from app.services.similarity_cache import similarity_cache
+from app.services.task_event_hub import task_event_hub
+from app.routes import upload, tasks, similarity, search, events, duplicates
+from app.services import task_events  # Installs the task status hooks
+
+# The embedding model is not imported here; see QUERY_ENCODER_PRELOAD
+IMPORT_TIME = time.perf_counter() - _import_started
 
 
 @asynccontextmanager
@@ -18,12 +32,43 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
     print("🚀 Starting Analyzer Service...")
+    init_started = time.perf_counter()
     init_db()
     print("✓ Database connections established")
+    init_db_ms = round((time.perf_counter() - init_started) * 1000, 1)
+    
+    # Free-text search encodes queries here; load the model before serving
+    encoder_ms = 0.0
+    if settings.QUERY_ENCODER_PRELOAD:
+        encoder_ms = round(await query_encoder.warmup() * 1000, 1)
+        if query_encoder.is_ready:
+            print("✓ Query encoder loaded")
+        else:
+            print("⚠️  Query encoder failed to load, text search will return 503 until a retry succeeds")
+    
+    app.state.startup = {
+        "importMs": round(IMPORT_TIME * 1000, 1),
+        "initDbMs": init_db_ms,
+        "queryEncoderMs": encoder_ms
+    }
+    print(
+        f"✓ Startup completed in {sum(app.state.startup.values()):.0f}ms "
+        f"(imports {app.state.startup['importMs']:.0f}ms, databases {init_db_ms:.0f}ms, "
+        f"query encoder {encoder_ms:.0f}ms)"
+    )
     yield
     # Shutdown
     print("🛑 Shutting down Analyzer Service...")
-    close_db()
+    # End open event streams and the shared pub/sub subscription
+    await task_event_hub.close()
+    query_encoder.close()
+    # Apply the status changes of the last commits before exiting
+    await run_in_threadpool(task_events.close)
+    # Write buffered log events while MongoDB is still connected
+    await run_in_threadpool(event_logger.close)
+    event_stats = event_logger.stats()
+    print(f"✓ Event log flushed ({event_stats['flushed']} written, {event_stats['dropped']} dropped, {event_stats['failed']} failed)")
+    await close_db()
     print("✓ Database connections closed")
 
 
@@ -50,17 +95,42 @@ app.add_middleware(
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Health check endpoint"""
+    """
+    Health check endpoint
+    
+    DEGRADED (still 200) while the query encoder model is not loaded: only
+    free-text search is unavailable, and the model load is being retried.
+    """
+    encoder = query_encoder.load_status()
+    degraded = not encoder["loaded"] and (settings.QUERY_ENCODER_PRELOAD or encoder["failures"] > 0)
     return {
-        "status": "UP",
+        "status": "DEGRADED" if degraded else "UP",
         "service": "analyzer-service",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "queryEncoder": encoder
+    }
+
+# Runtime metrics endpoint
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Counters of the in-process buffers and caches, and of the queue lanes"""
+    return {
+        "eventLog": event_logger.stats(),
+        "similarityIndex": ann_index_registry.stats(),
+        "similarityCache": similarity_cache.stats(),
+        "queryEncoder": query_encoder.stats(),
+        "taskEvents": task_event_hub.stats(),
+        "queueLanes": await run_in_threadpool(get_lane_stats),
+        "startup": getattr(app.state, "startup", None)
     }
 
 # Include routers
 app.include_router(upload.router, prefix="/api/v1", tags=["Upload"])
 app.include_router(tasks.router, prefix="/api/v1", tags=["Tasks"])
 app.include_router(similarity.router, prefix="/api/v1", tags=["Similarity"])
+app.include_router(search.router, prefix="/api/v1", tags=["Search"])
+app.include_router(events.router, prefix="/api/v1", tags=["Events"])
+app.include_router(duplicates.router, prefix="/api/v1", tags=["Duplicates"])
 
 # Root endpoint
 @app.get("/", tags=["Root"])
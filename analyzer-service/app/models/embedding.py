@@ -0,0 +1,59 @@
+"""
+Embedding Columns
+Mixin storing an embedding vector in the compact binary format
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Column, String, Float, LargeBinary
+
+from app.config import settings
+from app.services.embedding_codec import encode_embedding, decode_embedding
+
+
+class EmbeddingMixin:
+    """
+    Adds embedding_data/embedding_format/embedding_scale columns
+    
+    See app.services.embedding_codec for the formats. Read vectors through
+    embedding_vector and write them with set_embedding.
+    """
+    
+    embedding_data = Column(LargeBinary, nullable=True)
+    embedding_format = Column(String(16), nullable=True)
+    embedding_scale = Column(Float, nullable=True)  # int8 quantization scale
+    
+    @property
+    def has_embedding(self) -> bool:
+        """Whether an embedding is stored"""
+        return self.embedding_data is not None
+    
+    @property
+    def embedding_vector(self) -> Optional[np.ndarray]:
+        """Stored embedding as a float32 array, or None"""
+        if self.embedding_data is None:
+            return None
+        return decode_embedding(self.embedding_data, self.embedding_format, self.embedding_scale)
+    
+    def set_embedding(self, vector: Optional[Sequence[float]], storage_format: Optional[str] = None):
+        """
+        Store an embedding (None clears it)
+        
+        Args:
+            vector: Embedding vector
+            storage_format: Codec format, defaults to settings.EMBEDDING_STORAGE_FORMAT
+        """
+        if vector is None:
+            self.embedding_data = self.embedding_format = self.embedding_scale = None
+            return
+        
+        storage_format = storage_format or settings.EMBEDDING_STORAGE_FORMAT
+        self.embedding_data, self.embedding_scale = encode_embedding(vector, storage_format)
+        self.embedding_format = storage_format
+    
+    def copy_embedding_from(self, other: "EmbeddingMixin"):
+        """Reuse another row's stored embedding as is"""
+        self.embedding_data = other.embedding_data
+        self.embedding_format = other.embedding_format
+        self.embedding_scale = other.embedding_scale
@@ -0,0 +1,20 @@
+"""
+Near-Duplicate Pair Model for PostgreSQL
+Pairs of a user's documents whose embeddings are nearly identical
+"""
+
+from sqlalchemy import Column, Float, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+
+
+class NearDuplicatePair(Base):
+    """Two tasks of one user with a cosine similarity above the scan threshold"""
+    
+    __tablename__ = "near_duplicate_pairs"
+    
+    task_id_a = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    task_id_b = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    score = Column(Float, nullable=False)
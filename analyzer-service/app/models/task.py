@@ -3,16 +3,18 @@ Task Model for PostgreSQL
 Stores information about file analysis tasks
 """
 
-from sqlalchemy import Column, String, DateTime, JSON, Integer, Text, Float
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import Column, String, DateTime, JSON, Integer, Text, Index, LargeBinary, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import column_property
 from datetime import datetime
 import uuid
 
 from app.database import Base
+from app.models.embedding import EmbeddingMixin
 
 
-class Task(Base):
-    """Task model for file analysis"""
+class Task(EmbeddingMixin, Base):
+    """Task model for file analysis (the document embedding comes from EmbeddingMixin)"""
     
     __tablename__ = "tasks"
     
@@ -21,16 +23,32 @@ class Task(Base):
     filename = Column(String(255), nullable=False)
     file_path = Column(String(512), nullable=False)
     file_size = Column(Integer, nullable=False)
-    status = Column(String(50), nullable=False, default="queued", index=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of file content
+    # active_history: the previous status is always known to the transition
+    # hooks in app.services.task_events, even on an expired instance
+    status = column_property(
+        Column(String(50), nullable=False, default="queued", index=True),
+        active_history=True
+    )
     job_id = Column(String(255), nullable=True)
     result = Column(JSON, nullable=True)
     error = Column(String(1000), nullable=True)
-    embedding = Column(ARRAY(Float), nullable=True)
     content_preview = Column(Text, nullable=True)
+    term_count = Column(Integer, nullable=True)  # Terms indexed for keyword search (BM25 length)
+    minhash_signature = Column(LargeBinary, nullable=True)  # Packed MinHash of the terms (app.services.minhash)
+    # Earlier task of the same user this one was found a near-duplicate of
+    near_duplicate_of = Column(
+        UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True, index=True
+    )
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     
+    __table_args__ = (
+        # Keyset pagination of a user's tasks, newest first
+        Index("ix_tasks_user_created_id", "user_id", created_at.desc(), id.desc()),
+    )
+    
     def to_dict(self):
         """Convert model to dictionary"""
         return {
@@ -41,8 +59,9 @@ class Task(Base):
             "status": self.status,
             "result": self.result,
             "error": self.error,
-            "has_embedding": self.embedding is not None,
+            "has_embedding": self.has_embedding,
             "content_preview": self.content_preview,
+            "near_duplicate_of": str(self.near_duplicate_of) if self.near_duplicate_of else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "started_at": self.started_at.isoformat() if self.started_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None
@@ -0,0 +1,31 @@
+"""
+Task Chunk Model for PostgreSQL
+Stores the embedding of each chunk of an analyzed document
+"""
+
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+from app.models.embedding import EmbeddingMixin
+
+
+class TaskChunk(EmbeddingMixin, Base):
+    """Embedding of one chunk of a task's document"""
+    
+    __tablename__ = "task_chunks"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    start_char = Column(Integer, nullable=False)
+    end_char = Column(Integer, nullable=False)
+    
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            "taskId": str(self.task_id),
+            "chunkIndex": self.chunk_index,
+            "startChar": self.start_char,
+            "endChar": self.end_char
+        }
@@ -0,0 +1,30 @@
+"""
+Task Term Model for PostgreSQL
+Postings of the keyword search inverted index
+"""
+
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+
+
+class TaskTerm(Base):
+    """Occurrences of one term in one task's document"""
+    
+    __tablename__ = "task_terms"
+    
+    task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String(64), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    tf = Column(Integer, nullable=False)  # Occurrences of the term in the document
+    doc_length = Column(Integer, nullable=False)  # Terms in the document, copied for BM25
+    
+    __table_args__ = (
+        # The inverted index: a user's postings of a term, read from the
+        # index alone (no table access) when scoring
+        Index(
+            "ix_task_terms_user_term", "user_id", "term",
+            postgresql_include=["task_id", "tf", "doc_length"]
+        ),
+    )
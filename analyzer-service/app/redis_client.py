@@ -3,7 +3,11 @@ Redis Client and Queue Configuration
 """
 
 import redis
+import time
+import uuid
+from collections import Counter
 from rq import Queue
+from typing import List, Optional, Sequence, Tuple
 from app.config import settings
 
 # Redis connection
@@ -14,26 +18,352 @@ redis_conn = redis.Redis(
     decode_responses=True
 )
 
-# RQ Queue for background tasks
-task_queue = Queue('file_processing', connection=redis_conn)
+# Redis connection for binary payloads (e.g. packed embedding vectors)
+redis_binary_conn = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=False
+)
+
+# Processing lanes, highest priority first: lane -> RQ queue name. The
+# "normal" lane keeps the original queue name, so jobs queued before lanes
+# existed still run, and jobs other than file processing go there.
+LANE_QUEUE_NAMES = {
+    "high": "file_processing:high",
+    "normal": "file_processing",
+    "low": "file_processing:low",
+}
+LANES = tuple(LANE_QUEUE_NAMES)
+DEFAULT_LANE = "normal"
+
+# RQ Queues for background tasks, one per lane
+lane_queues = {lane: Queue(name, connection=redis_conn) for lane, name in LANE_QUEUE_NAMES.items()}
+
+# Import path of the file processing job, so enqueuing does not import the
+# worker module (and with it the embedding model)
+PROCESS_FILE_FUNC = 'app.workers.file_worker.process_file'
+
+
+def lane_for_size(file_size: int) -> str:
+    """
+    Lane of a file processing job by file size
+    
+    Small files take the "high" lane so a burst of large files does not
+    hold them up; large files take the "low" lane.
+    """
+    if file_size <= settings.QUEUE_SMALL_FILE_MAX_SIZE:
+        return "high"
+    if file_size >= settings.QUEUE_LARGE_FILE_MIN_SIZE:
+        return "low"
+    return "normal"
+
+
+def lane_weights() -> dict:
+    """Dequeue turns of each lane per round (see app.workers.lanes)"""
+    return {
+        "high": settings.QUEUE_WEIGHT_HIGH,
+        "normal": settings.QUEUE_WEIGHT_NORMAL,
+        "low": settings.QUEUE_WEIGHT_LOW,
+    }
+
+
+# Fair share: jobs of a user wait in that user's sub-queue of their lane
+# (fair:{queue}:user:{user_id}), and the users with waiting jobs take turns
+# in a ring (fair:{queue}:users). _RELEASE_JOBS moves jobs from the ring's
+# users to the RQ queue, one per turn, keeping at most FAIR_SHARE_QUEUE_DEPTH
+# there: a user's backlog stays in its sub-queue, so another user's job waits
+# behind a few released jobs and one turn per busy user, not behind the
+# backlog. With FAIR_SHARE_MAX_RUNNING_PER_USER, released and unfinished jobs
+# are tracked per user (fair:running:{user_id}) and a user at the cap passes
+# its turn until one of them finishes.
+
+# A user is in the ring exactly while its sub-queue is not empty
+_HOLD_JOB = redis_conn.register_script("""
+if redis.call('RPUSH', KEYS[1], ARGV[2]) == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+end
+redis.call('INCR', KEYS[3])
+""")
+
+# KEYS: (queue key, users key, held key) of each lane
+# ARGV: now, depth, cap, slot timeout, then the queue name of each lane
+#
+# The per-user keys (fair:{queue}:user:{user_id}, fair:running:{user_id})
+# depend on the ring's contents, so the script derives them from the queue
+# name and user instead of receiving them in KEYS. This assumes a single
+# Redis instance (the one RQ uses); under Redis Cluster or a sharding proxy
+# these keys could live on another node and the script would fail.
+_RELEASE_JOBS = redis_conn.register_script("""
+local now, depth, cap, timeout = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local released = 0
+for lane = 0, #KEYS / 3 - 1 do
+    local queue, users, held = KEYS[lane * 3 + 1], KEYS[lane * 3 + 2], KEYS[lane * 3 + 3]
+    local prefix = 'fair:' .. ARGV[lane + 5] .. ':'
+    local room = depth - redis.call('LLEN', queue)
+    local passed = 0
+    while room > 0 and passed < redis.call('LLEN', users) do
+        local user = redis.call('LINDEX', users, 0)
+        local running = 'fair:running:' .. user
+        local capped = false
+        if cap > 0 then
+            redis.call('ZREMRANGEBYSCORE', running, '-inf', now - timeout)
+            capped = redis.call('ZCARD', running) >= cap
+        end
+        if capped then
+            redis.call('LMOVE', users, users, 'LEFT', 'RIGHT')
+            passed = passed + 1
+        else
+            local pending = prefix .. 'user:' .. user
+            local job_id = redis.call('LPOP', pending)
+            if job_id then
+                redis.call('RPUSH', queue, job_id)
+                redis.call('DECR', held)
+                if cap > 0 then
+                    redis.call('ZADD', running, now, job_id)
+                    redis.call('EXPIRE', running, timeout)
+                end
+                room = room - 1
+                released = released + 1
+                passed = 0
+            end
+            if redis.call('LLEN', pending) == 0 then
+                redis.call('LPOP', users)
+            else
+                redis.call('LMOVE', users, users, 'LEFT', 'RIGHT')
+            end
+        end
+    end
+end
+return released
+""")
+
+
+def _user_queue_key(queue_name: str, user_id: str) -> str:
+    return f"fair:{queue_name}:user:{user_id}"
+
+
+def _fair_users_key(queue_name: str) -> str:
+    return f"fair:{queue_name}:users"
+
+
+def _fair_held_key(queue_name: str) -> str:
+    return f"fair:{queue_name}:held"
+
+
+def _running_jobs_key(user_id: str) -> str:
+    return f"fair:running:{user_id}"
+
+
+class FairShareQueue(Queue):
+    """
+    Lane queue that holds jobs in their owner's sub-queue
+    
+    RQ saves the job as queued as usual; only the push onto the queue goes
+    to the sub-queue of `owners[job_id]` instead, for release_jobs to move
+    on. Jobs without an owner are pushed to the queue directly.
+    """
+    
+    def __init__(self, name: str, owners: dict, **kwargs):
+        super().__init__(name, **kwargs)
+        self.owners = owners
+    
+    def push_job_id(self, job_id: str, pipeline=None, at_front: bool = False):
+        user_id = self.owners.get(job_id)
+        if user_id is None:
+            return super().push_job_id(job_id, pipeline=pipeline, at_front=at_front)
+        _HOLD_JOB(
+            keys=[_user_queue_key(self.name, user_id), _fair_users_key(self.name), _fair_held_key(self.name)],
+            args=[user_id, job_id],
+            client=pipeline if pipeline is not None else self.connection
+        )
+
+
+def release_jobs() -> int:
+    """
+    Move held jobs to the lane queues, one user per turn
+    
+    Called after enqueuing, by workers before each dequeue (and every
+    FAIR_SHARE_RELEASE_INTERVAL seconds while idle) and when a job of a
+    capped user ends. Cheap when the lane queues are full. Runs even with
+    FAIR_SHARE_ENABLED off, so jobs held before still run. A failure is
+    logged, not raised: held jobs simply wait for the next release.
+    
+    Returns:
+        Number of jobs released
+    """
+    args = [
+        time.time(),
+        settings.FAIR_SHARE_QUEUE_DEPTH,
+        settings.FAIR_SHARE_MAX_RUNNING_PER_USER,
+        settings.FAIR_SHARE_SLOT_TIMEOUT,
+    ]
+    keys = []
+    for queue in lane_queues.values():
+        keys += [queue.key, _fair_users_key(queue.name), _fair_held_key(queue.name)]
+        args.append(queue.name)
+    try:
+        return _RELEASE_JOBS(keys=keys, args=args)
+    except Exception as e:
+        print(f"Failed to release held jobs: {e}")
+        return 0
+
+
+def job_finished(job):
+    """
+    Free the running slot of a finished (or failed) job of a capped user
+    
+    Releases the user's next held job, if any, right away.
+    """
+    user_id = job.meta.get("user_id")
+    if not settings.FAIR_SHARE_ENABLED or settings.FAIR_SHARE_MAX_RUNNING_PER_USER <= 0 or not user_id:
+        return
+    try:
+        redis_conn.zrem(_running_jobs_key(user_id), job.id)
+        release_jobs()
+    except Exception as e:
+        # The slot frees itself after FAIR_SHARE_SLOT_TIMEOUT
+        print(f"Failed to free the running slot of job {job.id}: {e}")
 
 
-def enqueue_task(func, *args, **kwargs):
+def enqueue_task(func, *args, lane: str = DEFAULT_LANE, user_id: Optional[str] = None, **kwargs):
     """
     Enqueue a task for background processing
     
     Args:
         func: Function to execute
         *args: Positional arguments
+        lane: Processing lane (see LANE_QUEUE_NAMES)
+        user_id: Owner of the job; owned jobs are fair-share scheduled
         **kwargs: Keyword arguments
     
     Returns:
         Job object
     """
-    job = task_queue.enqueue(func, *args, **kwargs)
+    if user_id is None or not settings.FAIR_SHARE_ENABLED:
+        return lane_queues[lane].enqueue(func, *args, **kwargs)
+    
+    job_id = str(uuid.uuid4())
+    queue = FairShareQueue(LANE_QUEUE_NAMES[lane], {job_id: str(user_id)}, connection=redis_conn)
+    job = queue.enqueue(func, *args, job_id=job_id, meta={"user_id": str(user_id)}, **kwargs)
+    release_jobs()
     return job
 
 
+def enqueue_tasks(
+    func,
+    args_list: Sequence[tuple],
+    job_ids: Optional[Sequence[str]] = None,
+    lanes: Optional[Sequence[str]] = None,
+    user_ids: Optional[Sequence[str]] = None
+) -> List:
+    """
+    Enqueue many jobs for the same function through one Redis pipeline
+    
+    Args:
+        func: Function to execute
+        args_list: Positional arguments of each job
+        job_ids: IDs to give the jobs (generated if omitted)
+        lanes: Lane of each job (DEFAULT_LANE if omitted)
+        user_ids: Owner of each job; owned jobs are fair-share scheduled
+    
+    Returns:
+        Job objects, in the order of args_list
+    """
+    if job_ids is None:
+        job_ids = [None] * len(args_list)
+    if lanes is None:
+        lanes = [DEFAULT_LANE] * len(args_list)
+    if user_ids is None or not settings.FAIR_SHARE_ENABLED:
+        user_ids = [None] * len(args_list)
+    
+    by_lane = {}
+    for position, (args, job_id, lane, user_id) in enumerate(zip(args_list, job_ids, lanes, user_ids)):
+        job_id = job_id or str(uuid.uuid4())
+        meta = {"user_id": str(user_id)} if user_id is not None else None
+        queue, entries = by_lane.setdefault(
+            lane, (FairShareQueue(LANE_QUEUE_NAMES[lane], {}, connection=redis_conn), [])
+        )
+        if user_id is not None:
+            queue.owners[job_id] = str(user_id)
+        entries.append((position, Queue.prepare_data(func, args=args, job_id=job_id, meta=meta)))
+    
+    jobs = [None] * len(args_list)
+    with redis_conn.pipeline() as pipe:
+        for queue, entries in by_lane.values():
+            enqueued = queue.enqueue_many([data for _, data in entries], pipeline=pipe)
+            for (position, _), job in zip(entries, enqueued):
+                jobs[position] = job
+        pipe.execute()
+    if any(user_id is not None for user_id in user_ids):
+        release_jobs()
+    return jobs
+
+
+# Recent queue waits of each lane in milliseconds, newest first
+LANE_WAIT_SAMPLES = 1000
+
+
+def _lane_waits_key(lane: str) -> str:
+    return f"queue:waits:{lane}"
+
+
+def record_lane_waits(waits: Sequence[Tuple[str, float]]):
+    """
+    Record how long dequeued jobs waited, in one round-trip
+    
+    Args:
+        waits: (lane, milliseconds) pairs
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for lane, wait_ms in waits:
+                pipe.lpush(_lane_waits_key(lane), round(wait_ms))
+            for lane in {lane for lane, _ in waits}:
+                pipe.ltrim(_lane_waits_key(lane), 0, LANE_WAIT_SAMPLES - 1)
+            pipe.execute()
+    except Exception as e:
+        print(f"Failed to record queue waits: {e}")
+
+
+def get_lane_stats() -> dict:
+    """
+    Queue length and recent wait percentiles of each lane
+    
+    Returns:
+        Mapping of lane to queued (released to the RQ queue), held (in
+        fair-share sub-queues), heldUsers, samples, waitP50Ms, waitP95Ms and
+        waitMaxMs (wait fields are None before the first sample; waits
+        include the time held), or an empty dict if Redis is unavailable
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for lane in LANES:
+                queue = lane_queues[lane]
+                pipe.llen(queue.key)
+                pipe.get(_fair_held_key(queue.name))
+                pipe.llen(_fair_users_key(queue.name))
+                pipe.lrange(_lane_waits_key(lane), 0, -1)
+            replies = pipe.execute()
+    except Exception:
+        return {}
+    
+    stats = {}
+    for position, lane in enumerate(LANES):
+        queued, held, held_users, waits = replies[4 * position:4 * position + 4]
+        samples = sorted(int(wait) for wait in waits)
+        stats[lane] = {
+            "queued": queued,
+            "held": int(held or 0),
+            "heldUsers": held_users,
+            "samples": len(samples),
+            "waitP50Ms": samples[len(samples) // 2] if samples else None,
+            "waitP95Ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else None,
+            "waitMaxMs": samples[-1] if samples else None,
+        }
+    return stats
+
+
 def get_job_status(job_id: str):
     """
     Get job status from Redis
@@ -49,4 +379,389 @@ def get_job_status(job_id: str):
         job = Job.fetch(job_id, connection=redis_conn)
         return job.get_status()
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+def bump_embedding_version(user_id: str) -> Optional[int]:
+    """
+    Signal that a user's set of embeddings changed
+    
+    API processes compare this counter with the version their in-memory
+    similarity index was built at to know when to pick up new rows.
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        New version number, or None if Redis is unavailable
+    """
+    try:
+        return redis_conn.incr(f"embeddings:version:{user_id}")
+    except Exception as e:
+        print(f"Failed to bump embedding version: {e}")
+        return None
+
+
+def get_embedding_version(user_id: str) -> Optional[int]:
+    """
+    Get the current embedding version of a user
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        Version number (0 if never bumped), or None if Redis is unavailable
+    """
+    try:
+        return int(redis_conn.get(f"embeddings:version:{user_id}") or 0)
+    except Exception:
+        return None
+
+
+def bump_keyword_version(user_id: str) -> Optional[int]:
+    """
+    Signal that a user's keyword index (task_terms) changed
+    
+    Cached keyword statistics and search results of the user are stale once
+    this counter moves.
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        New version number, or None if Redis is unavailable
+    """
+    try:
+        return redis_conn.incr(f"keywords:version:{user_id}")
+    except Exception as e:
+        print(f"Failed to bump keyword version: {e}")
+        return None
+
+
+def get_keyword_version(user_id: str) -> Optional[int]:
+    """
+    Get the current keyword index version of a user
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        Version number (0 if never bumped), or None if Redis is unavailable
+    """
+    try:
+        return int(redis_conn.get(f"keywords:version:{user_id}") or 0)
+    except Exception:
+        return None
+
+# Per-user task counters: hash with a "total" field and one field per status
+TASK_COUNTS_TTL = 24 * 3600  # Rebuilt from PostgreSQL at least daily
+
+# Counters are only adjusted while the hash exists; a missing hash is
+# rebuilt from PostgreSQL on the next read instead of starting from partial deltas
+_INCREMENT_TASK_COUNTS = redis_conn.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    for i = 1, #ARGV, 2 do
+        redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+""")
+
+_INIT_TASK_COUNTS = redis_conn.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+""")
+
+
+def _task_counts_key(user_id: str) -> str:
+    return f"tasks:counts:{user_id}"
+
+
+def get_task_counts(user_id: str) -> Optional[dict]:
+    """
+    Get a user's cached task counters
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        Mapping of "total" and each status to a count, or None if the
+        counters are not cached (or Redis is unavailable)
+    """
+    try:
+        counts = redis_conn.hgetall(_task_counts_key(user_id))
+    except Exception:
+        return None
+    return {field: int(value) for field, value in counts.items()} if counts else None
+
+
+def init_task_counts(user_id: str, counts: dict):
+    """
+    Cache counters computed from PostgreSQL, unless already cached
+    
+    Args:
+        user_id: User ID
+        counts: Mapping of "total" and each status to a count
+    """
+    fields = [item for field, value in counts.items() for item in (field, value)]
+    try:
+        _INIT_TASK_COUNTS(keys=[_task_counts_key(user_id)], args=[TASK_COUNTS_TTL] + fields)
+    except Exception as e:
+        print(f"Failed to cache task counts: {e}")
+
+
+def increment_task_counts(deltas: dict):
+    """
+    Apply counter changes for several users in one round-trip
+    
+    Args:
+        deltas: Mapping of user ID to {field: delta}
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for user_id, fields in deltas.items():
+                args = [item for field, delta in fields.items() if delta for item in (field, delta)]
+                if args:
+                    _INCREMENT_TASK_COUNTS(keys=[_task_counts_key(user_id)], args=args, client=pipe)
+            pipe.execute()
+    except Exception as e:
+        print(f"Failed to update task counts: {e}")
+
+
+# Per-task status cache: hash with userId, status and ISO timestamps
+TASK_STATUS_TTL = 24 * 3600
+
+# Fills only missing fields, so a status read from PostgreSQL never
+# overwrites a newer transition written in the meantime
+_FILL_TASK_STATUS = redis_conn.register_script("""
+for i = 2, #ARGV, 2 do
+    redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+""")
+
+
+def _task_status_key(task_id: str) -> str:
+    return f"tasks:status:{task_id}"
+
+
+def get_task_statuses(task_ids: Sequence[str]) -> dict:
+    """
+    Get cached status entries in one round-trip
+    
+    Args:
+        task_ids: Task IDs
+    
+    Returns:
+        Mapping of task ID to its cached fields, for the IDs that are cached
+        (empty if Redis is unavailable)
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for task_id in task_ids:
+                pipe.hgetall(_task_status_key(task_id))
+            entries = pipe.execute()
+    except Exception:
+        return {}
+    return {task_id: entry for task_id, entry in zip(task_ids, entries) if entry}
+
+
+def set_task_statuses(entries: dict):
+    """
+    Write status transitions to the cache
+    
+    Args:
+        entries: Mapping of task ID to the fields to set, or to None for a
+            deleted task
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for task_id, fields in entries.items():
+                key = _task_status_key(task_id)
+                if fields is None:
+                    pipe.delete(key)
+                else:
+                    pipe.hset(key, mapping=fields)
+                    pipe.expire(key, TASK_STATUS_TTL)
+            pipe.execute()
+    except Exception as e:
+        print(f"Failed to cache task statuses: {e}")
+
+
+def fill_task_statuses(entries: dict):
+    """
+    Cache statuses read from PostgreSQL without overwriting newer ones
+    
+    Args:
+        entries: Mapping of task ID to its fields
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for task_id, fields in entries.items():
+                args = [item for field, value in fields.items() for item in (field, value)]
+                _FILL_TASK_STATUS(keys=[_task_status_key(task_id)], args=[TASK_STATUS_TTL] + args, client=pipe)
+            pipe.execute()
+    except Exception as e:
+        print(f"Failed to cache task statuses: {e}")
+
+
+# Pub/sub channel of each user's task status transitions
+TASK_EVENTS_PATTERN = "tasks:events:*"
+
+
+def task_events_channel(user_id: str) -> str:
+    return f"tasks:events:{user_id}"
+
+
+def publish_task_events(events: Sequence[tuple]):
+    """
+    Publish task events in one round-trip
+    
+    Args:
+        events: (user_id, JSON message) pairs
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for user_id, message in events:
+                pipe.publish(task_events_channel(user_id), message)
+            pipe.execute()
+    except Exception as e:
+        print(f"Failed to publish task events: {e}")
+
+
+def create_async_redis():
+    """
+    New asyncio Redis client, for long-lived subscriptions in the API
+    
+    Created per subscriber loop: asyncio connections cannot be shared
+    across event loops the way the module-level clients are across threads.
+    """
+    import redis.asyncio
+    return redis.asyncio.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        decode_responses=True
+    )
+
+
+# Near-duplicate scan of each user: hash with status, threshold, watermark
+# and totals of the last run (no TTL, the pairs live in PostgreSQL)
+FIND_NEAR_DUPLICATES_FUNC = 'app.workers.duplicate_worker.find_near_duplicates'
+
+# An update is already queued for the user while this flag exists
+DUPLICATE_UPDATE_PENDING_TTL = 3600
+
+_CLAIM_DUPLICATE_UPDATE = redis_conn.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('SET', KEYS[2], 1, 'NX', 'EX', ARGV[1])
+end
+return false
+""")
+
+
+def _duplicate_scan_key(user_id: str) -> str:
+    return f"duplicates:scan:{user_id}"
+
+
+def _duplicate_pending_key(user_id: str) -> str:
+    return f"duplicates:pending:{user_id}"
+
+
+def get_duplicate_scan(user_id: str) -> Optional[dict]:
+    """
+    Get the state of a user's near-duplicate scan
+    
+    Returns:
+        Scan fields, or None if the user never ran a scan
+    """
+    return redis_conn.hgetall(_duplicate_scan_key(user_id)) or None
+
+
+def set_duplicate_scan(user_id: str, fields: dict):
+    """Update fields of a user's near-duplicate scan state"""
+    redis_conn.hset(_duplicate_scan_key(user_id), mapping={key: str(value) for key, value in fields.items()})
+
+
+def claim_duplicate_updates(user_ids: Sequence[str]) -> List[str]:
+    """
+    Pick the users whose near-duplicates need an update enqueued
+    
+    Only users with a scan qualify, and a user with an update already
+    queued is skipped, so a burst of completions enqueues one job.
+    
+    Args:
+        user_ids: Users with newly completed tasks
+    
+    Returns:
+        Users to enqueue an update for
+    """
+    user_ids = list(user_ids)
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                _CLAIM_DUPLICATE_UPDATE(
+                    keys=[_duplicate_scan_key(user_id), _duplicate_pending_key(user_id)],
+                    args=[DUPLICATE_UPDATE_PENDING_TTL],
+                    client=pipe
+                )
+            claimed = pipe.execute()
+    except Exception as e:
+        print(f"Failed to schedule near-duplicate updates: {e}")
+        return []
+    return [user_id for user_id, ok in zip(user_ids, claimed) if ok]
+
+
+def release_duplicate_update(user_id: str):
+    """Let later completions enqueue another update (called when one starts)"""
+    redis_conn.delete(_duplicate_pending_key(user_id))
+
+
+# MinHash LSH band index: one set of task IDs per (user, band, band hash),
+# no TTL (the signatures live in PostgreSQL, migrations.minhash_index
+# rebuilds the sets from them)
+def _minhash_band_key(user_id: str, band: int, band_hash: str) -> str:
+    return f"minhash:band:{user_id}:{band}:{band_hash}"
+
+
+def find_minhash_candidates(user_id: str, band_hashes: Sequence[str], limit: int) -> List[str]:
+    """
+    Find a user's tasks sharing at least one LSH band with a signature
+    
+    Args:
+        user_id: User ID
+        band_hashes: Band hashes of the signature (minhash.band_hashes)
+        limit: Maximum number of candidates
+    
+    Returns:
+        Task IDs, those sharing the most bands first (empty if Redis is
+        unavailable)
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for band, band_hash in enumerate(band_hashes):
+                pipe.smembers(_minhash_band_key(user_id, band, band_hash))
+            members = pipe.execute()
+    except Exception as e:
+        print(f"Failed to look up near-duplicate candidates: {e}")
+        return []
+    shared = Counter(task_id for bucket in members for task_id in bucket)
+    return [task_id for task_id, _ in shared.most_common(limit)]
+
+
+def add_minhash_signatures(entries: Sequence[Tuple[str, str, Sequence[str]]]):
+    """
+    Add tasks to the LSH band index in one round-trip
+    
+    Args:
+        entries: (user_id, task_id, band hashes) tuples
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            for user_id, task_id, band_hashes in entries:
+                for band, band_hash in enumerate(band_hashes):
+                    pipe.sadd(_minhash_band_key(user_id, band, band_hash), task_id)
+            pipe.execute()
+    except Exception as e:
+        print(f"Failed to index MinHash signatures: {e}")
@@ -1,6 +1,6 @@
 """
 API Routes
 """
-from app.routes import upload, tasks, similarity
+from app.routes import upload, tasks, similarity, search, events, duplicates
 
-__all__ = ['upload', 'tasks', 'similarity']
\ No newline at end of file
+__all__ = ['upload', 'tasks', 'similarity', 'search', 'events', 'duplicates']
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""
+Near-Duplicate Routes
+Clusters of near-identical documents across a user's corpus, and the
+near-duplicates of one document found through its MinHash signature
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from typing import Optional
+import uuid
+
+from app.config import settings
+from app.database import get_async_db
+from app.models.near_duplicate import NearDuplicatePair
+from app.models.task import Task
+from app.redis_client import (
+    enqueue_task, get_duplicate_scan, set_duplicate_scan, claim_duplicate_updates, find_minhash_candidates,
+    FIND_NEAR_DUPLICATES_FUNC
+)
+from app.services.minhash import MAX_CANDIDATES, band_hashes, estimate_jaccard, signature_from_bytes
+from app.services.near_duplicates import cluster_pairs
+
+router = APIRouter()
+
+# Lower thresholds pair up merely related documents, not duplicates, and
+# the number of stored pairs grows quickly
+MIN_THRESHOLD = 0.8
+
+# Lowest MinHash threshold: with the default 16 LSH bands of 8 rows, pairs
+# less similar than this mostly share no band and would not be found
+MIN_JACCARD_THRESHOLD = 0.7
+
+
+def parse_user_id(user_id: str) -> uuid.UUID:
+    try:
+        return uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid user ID format"
+        )
+
+
+@router.post("/duplicates/scan", status_code=status.HTTP_202_ACCEPTED)
+async def scan_near_duplicates(
+    user_id: str = Query(...),
+    threshold: Optional[float] = Query(None, ge=MIN_THRESHOLD, le=1.0),
+    full: bool = Query(False)
+):
+    """
+    Queue a near-duplicate scan of the user's documents
+    
+    - **user_id**: User ID
+    - **threshold**: Minimum cosine similarity (default: that of the last
+      scan, else NEAR_DUPLICATE_THRESHOLD); a new threshold rescans everything
+    - **full**: Rescan everything instead of only documents completed since
+      the last scan
+    
+    Once a user has scanned, new completed documents are added to the
+    stored pairs automatically.
+    """
+    
+    parse_user_id(user_id)
+    
+    scan = get_duplicate_scan(user_id) or {}
+    threshold = threshold or float(scan.get("threshold", settings.NEAR_DUPLICATE_THRESHOLD))
+    set_duplicate_scan(user_id, {"status": "queued", "threshold": scan.get("threshold", threshold)})
+    # Completions until the job starts are covered by it, no extra updates
+    claim_duplicate_updates([user_id])
+    
+    job = enqueue_task(FIND_NEAR_DUPLICATES_FUNC, user_id, full, threshold, user_id=user_id)
+    
+    return {
+        "status": "queued",
+        "jobId": job.id,
+        "threshold": threshold,
+        "full": full or scan.get("threshold") is None or float(scan["threshold"]) != threshold
+    }
+
+
+@router.get("/duplicates")
+async def get_near_duplicates(
+    user_id: str = Query(...),
+    threshold: Optional[float] = Query(None, ge=MIN_THRESHOLD, le=1.0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get clusters of near-identical documents
+    
+    - **user_id**: User ID
+    - **threshold**: Only use pairs at least this similar (not below the
+      threshold of the last scan)
+    
+    Clusters are connected components of the stored pairs: A~B and B~C put
+    A, B and C in one cluster even if A and C are less similar.
+    """
+    
+    user_uuid = parse_user_id(user_id)
+    
+    scan = get_duplicate_scan(user_id)
+    if not scan or "threshold" not in scan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No near-duplicate scan yet. Start one with POST /duplicates/scan"
+        )
+    
+    scan_threshold = float(scan["threshold"])
+    threshold = threshold or scan_threshold
+    if threshold < scan_threshold:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stored pairs use threshold {scan_threshold}. Scan again with a lower threshold first"
+        )
+    
+    pairs = (await db.execute(
+        select(NearDuplicatePair.task_id_a, NearDuplicatePair.task_id_b, NearDuplicatePair.score).where(
+            NearDuplicatePair.user_id == user_uuid,
+            NearDuplicatePair.score >= threshold
+        )
+    )).all()
+    clusters = cluster_pairs((str(a), str(b), score) for a, b, score in pairs)
+    
+    # Names of the clustered tasks only
+    filenames = {}
+    member_ids = [uuid.UUID(task_id) for cluster in clusters for task_id in cluster["ids"]]
+    if member_ids:
+        filenames = {
+            str(row.id): row.filename
+            for row in (await db.execute(
+                select(Task.id, Task.filename).where(Task.id.in_(member_ids))
+            )).all()
+        }
+    
+    return {
+        "scan": {
+            "status": scan.get("status"),
+            "threshold": scan_threshold,
+            "documents": int(scan.get("documents", 0)),
+            "updatedAt": scan.get("updatedAt"),
+            "error": scan.get("error") or None
+        },
+        "threshold": threshold,
+        "pairs": len(pairs),
+        "clusters": [
+            {
+                "size": len(cluster["ids"]),
+                "minScore": round(cluster["minScore"], 4),
+                "maxScore": round(cluster["maxScore"], 4),
+                "tasks": [
+                    {"taskId": task_id, "filename": filenames.get(task_id)}
+                    for task_id in cluster["ids"]
+                ]
+            }
+            for cluster in clusters
+        ]
+    }
+
+
+@router.get("/duplicates/{task_id}")
+async def get_task_near_duplicates(
+    task_id: str,
+    user_id: str = Query(...),
+    threshold: Optional[float] = Query(None, ge=MIN_JACCARD_THRESHOLD, le=1.0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the near-duplicates of one document
+    
+    - **task_id**: Task ID
+    - **user_id**: User ID for authorization
+    - **threshold**: Minimum estimated Jaccard similarity of the documents'
+      word shingles (default: MINHASH_JACCARD_THRESHOLD)
+    
+    Needs no scan: candidates come from the LSH band index in Redis, filled
+    as documents are processed, and only their MinHash signatures are
+    compared. Nothing is embedded and no file is read.
+    """
+    
+    user_uuid = parse_user_id(user_id)
+    try:
+        task_uuid = uuid.UUID(task_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid task ID format"
+        )
+    threshold = threshold or settings.MINHASH_JACCARD_THRESHOLD
+    
+    task = await db.scalar(
+        select(Task)
+        .options(load_only(Task.id, Task.filename, Task.minhash_signature, Task.near_duplicate_of))
+        .where(
+            Task.id == task_uuid,
+            Task.user_id == user_uuid
+        )
+    )
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found or access denied"
+        )
+    if task.minhash_signature is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Task has no MinHash signature. File may not be processed yet."
+        )
+    
+    signature = signature_from_bytes(task.minhash_signature)
+    candidates = [
+        uuid.UUID(candidate)
+        for candidate in find_minhash_candidates(
+            user_id, band_hashes(signature, settings.MINHASH_BANDS), MAX_CANDIDATES
+        )
+        if candidate != str(task_uuid)
+    ]
+    
+    results = []
+    if candidates:
+        rows = (await db.execute(
+            select(Task.id, Task.filename, Task.minhash_signature).where(
+                Task.id.in_(candidates),
+                Task.user_id == user_uuid,
+                Task.status == "completed",
+                Task.minhash_signature.isnot(None)
+            )
+        )).all()
+        for row in rows:
+            similarity = estimate_jaccard(signature, signature_from_bytes(row.minhash_signature))
+            if similarity >= threshold:
+                results.append({"taskId": str(row.id), "filename": row.filename, "similarity": round(similarity, 4)})
+        results.sort(key=lambda result: result["similarity"], reverse=True)
+    
+    return {
+        "taskId": str(task_uuid),
+        "filename": task.filename,
+        "nearDuplicateOf": str(task.near_duplicate_of) if task.near_duplicate_of else None,
+        "threshold": threshold,
+        "results": results,
+        "totalFound": len(results)
+    }
@@ -0,0 +1,137 @@
+"""
+Task Event Routes
+Push task status changes to clients with server-sent events
+"""
+
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+import asyncio
+import json
+import time
+import uuid
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services.task_event_hub import task_event_hub, RESYNC, CLOSED
+from app.services.task_service import get_task_status_entries
+
+router = APIRouter()
+
+# Statuses after which a single-task stream ends
+FINAL_STATUSES = ("completed", "failed")
+
+
+def format_event(event: str, data: dict) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def status_event(entry: dict) -> dict:
+    """Client-facing fields of a status cache entry or pub/sub message"""
+    return {key: value for key, value in entry.items() if key != "userId"}
+
+
+async def current_status(task_id: str) -> Optional[dict]:
+    """Status cache entry of a task, read with a short-lived session"""
+    async with AsyncSessionLocal() as db:
+        entries = await get_task_status_entries(db, [uuid.UUID(task_id)])
+    entry = entries.get(task_id)
+    if entry is not None:
+        entry = dict(entry, taskId=task_id)
+    return entry
+
+
+async def task_event_stream(user_id: str, task_id: Optional[str]) -> AsyncIterator[str]:
+    """
+    Stream status events until the task finishes, the stream reaches its
+    maximum age or the service shuts down
+    """
+    deadline = time.monotonic() + settings.TASK_EVENTS_MAX_STREAM_SECONDS
+    yield "retry: 1000\n\n"
+    
+    async with task_event_hub.subscribe(user_id, task_id) as subscription:
+        if task_id:
+            # Subscribed first, so a transition right after this read is still delivered
+            entry = await current_status(task_id)
+            if entry is None or entry["userId"] != user_id:
+                return
+            yield format_event("status", status_event(entry))
+            if entry["status"] in FINAL_STATUSES:
+                return
+        else:
+            # Events published while the client was not connected are not replayed
+            yield format_event("ready", {})
+        
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                item = await asyncio.wait_for(
+                    subscription.get(),
+                    min(remaining, settings.TASK_EVENTS_HEARTBEAT_SECONDS)
+                )
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            
+            if item == CLOSED:
+                return
+            
+            if item == RESYNC:
+                # The shared subscription was re-established: catch up
+                if not task_id:
+                    yield format_event("resync", {})
+                    continue
+                item = await current_status(task_id)
+                if item is None:
+                    item = {"taskId": task_id, "status": None}
+            
+            yield format_event("status", status_event(item))
+            if task_id and (item["status"] in FINAL_STATUSES or item["status"] is None):
+                return
+
+
+@router.get("/events")
+async def stream_task_events(
+    user_id: str = Query(...),
+    task_id: Optional[str] = Query(None)
+):
+    """
+    Receive task status changes as server-sent events
+    
+    - **user_id**: User whose tasks to follow
+    - **task_id**: Follow only this task; the stream starts with its current
+      status and ends once it is completed or failed
+    
+    Each change is a `status` event with taskId, status, previousStatus and
+    timestamps (status is null for a deleted task). Streams of all of a
+    user's tasks start with a `ready` event and send `resync` when events
+    may have been missed; clients should then re-read the statuses they
+    track (POST /tasks/status). Streams end after
+    TASK_EVENTS_MAX_STREAM_SECONDS and EventSource clients reconnect.
+    """
+    
+    try:
+        user_uuid = uuid.UUID(user_id)
+        task_uuid = uuid.UUID(task_id) if task_id else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid UUID format"
+        )
+    
+    if task_uuid:
+        entry = await current_status(str(task_uuid))
+        if entry is None or entry["userId"] != str(user_uuid):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found or access denied"
+            )
+    
+    return StreamingResponse(
+        task_event_stream(str(user_uuid), str(task_uuid) if task_uuid else None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
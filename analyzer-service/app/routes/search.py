@@ -0,0 +1,204 @@
+"""
+Keyword Search Routes
+BM25 search over the inverted index, optionally fused with semantic search
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+import uuid
+
+from app.config import settings
+from app.database import get_async_db
+from app.models.task import Task
+from app.redis_client import get_embedding_version, get_keyword_version
+from app.routes.similarity import describe_matches, get_user_index
+from app.services.keyword_index import (
+    bm25_query, common_terms_bound, document_frequencies_query, inverse_document_frequency,
+    pruned_ranking_is_exact, reciprocal_rank_fusion, select_required_terms, tokenize
+)
+from app.services.query_encoder import query_encoder
+from app.services.similarity_cache import similarity_cache
+
+router = APIRouter()
+
+
+@router.get("/search")
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=settings.QUERY_MAX_LENGTH),
+    user_id: str = Query(...),
+    top_k: int = Query(10, ge=1, le=50),
+    hybrid: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search a user's documents by keywords
+    
+    - **q**: Query text (case-insensitive; stop words are ignored)
+    - **user_id**: User ID for authorization
+    - **top_k**: Number of documents to return (1-50)
+    - **hybrid**: Also rank by semantic similarity to the query and merge
+      both rankings
+    
+    Returns documents ranked by BM25 score, or by fused rank when hybrid
+    """
+    
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid UUID format"
+        )
+    
+    terms = list(dict.fromkeys(tokenize(q)))
+    query = query_encoder.normalize(q)
+    if not terms and not (hybrid and query):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query has no searchable terms"
+        )
+    
+    # Keyword results change with the user's postings, hybrid ones also
+    # with their embeddings; both counters only grow, so their sum does too
+    keyword_version = get_keyword_version(str(user_uuid))
+    version = keyword_version
+    if hybrid and version is not None:
+        embedding_version = get_embedding_version(str(user_uuid))
+        version = None if embedding_version is None else version + embedding_version
+    
+    if version is None:
+        return await run_search(db, user_uuid, query, terms, top_k, hybrid, keyword_version)
+    
+    return await similarity_cache.get_or_compute(
+        (str(user_uuid), "search", query if hybrid else tuple(terms), top_k, hybrid),
+        version,
+        lambda: run_search(db, user_uuid, query, terms, top_k, hybrid, keyword_version)
+    )
+
+
+async def run_search(
+    db: AsyncSession,
+    user_uuid: uuid.UUID,
+    query: str,
+    terms: List[str],
+    top_k: int,
+    hybrid: bool,
+    keyword_version: Optional[int]
+) -> dict:
+    """Run a keyword or hybrid search and build its response"""
+    candidates = max(top_k, settings.KEYWORD_FUSION_CANDIDATES) if hybrid else top_k
+    keyword_ranking = await keyword_search(db, user_uuid, terms, candidates, keyword_version)
+    ranking = keyword_ranking
+    
+    if hybrid:
+        try:
+            query_vector = await query_encoder.encode(query)
+        except RuntimeError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Query encoder not available, retry without hybrid"
+            )
+        index = await get_user_index(db, user_uuid)
+        semantic_ranking = index.search(query_vector, top_k=candidates)
+        ranking = reciprocal_rank_fusion([keyword_ranking, semantic_ranking], top_k)
+    
+    results = await describe_matches(db, ranking[:top_k], score_key="score")
+    
+    if hybrid:
+        keyword_scores = dict(keyword_ranking)
+        semantic_scores = dict(semantic_ranking)
+        for result in results:
+            keyword_score = keyword_scores.get(result["taskId"])
+            semantic_score = semantic_scores.get(result["taskId"])
+            result["keywordScore"] = round(keyword_score, 4) if keyword_score is not None else None
+            result["semanticScore"] = round(semantic_score, 4) if semantic_score is not None else None
+    
+    return {
+        "query": query,
+        "terms": terms,
+        "mode": "hybrid" if hybrid else "keyword",
+        "results": results,
+        "totalFound": len(results)
+    }
+
+
+async def keyword_search(
+    db: AsyncSession,
+    user_uuid: uuid.UUID,
+    terms: List[str],
+    top_k: int,
+    keyword_version: Optional[int]
+) -> List[Tuple[str, float]]:
+    """
+    Rank a user's documents by BM25
+    
+    Only the postings of the query terms are read, from the covering
+    (user_id, term) index, and scored in the database. Document
+    frequencies are counted first; they give the idf of each term and
+    decide which terms are common (see select_required_terms). Documents
+    matching only common terms are skipped when they cannot reach the
+    top_k, and the query is scored in full when they could.
+    
+    Returns:
+        List of (task_id, score) tuples, best first
+    """
+    if not terms:
+        return []
+    
+    if keyword_version is None:
+        documents, average_length = await get_collection_stats(db, user_uuid)
+    else:
+        documents, average_length = await similarity_cache.get_or_compute(
+            (str(user_uuid), "keyword-stats"),
+            keyword_version,
+            lambda: get_collection_stats(db, user_uuid)
+        )
+    if not documents:
+        return []
+    
+    df = dict((await db.execute(document_frequencies_query(user_uuid, terms))).all())
+    if not df:
+        return []
+    
+    idf = {term: inverse_document_frequency(count, documents) for term, count in df.items()}
+    
+    async def rank(required: Optional[List[str]]) -> List[Tuple[str, float]]:
+        ranked = (await db.execute(
+            bm25_query(
+                user_uuid,
+                idf,
+                average_length,
+                top_k,
+                k1=settings.KEYWORD_BM25_K1,
+                b=settings.KEYWORD_BM25_B,
+                required=required
+            )
+        )).all()
+        return [(str(task_id), score) for task_id, score in ranked]
+    
+    # Documents with a rare term first; score in full unless that ranking
+    # provably equals the full one
+    required = select_required_terms(df, documents, settings.KEYWORD_COMMON_TERM_RATIO)
+    if required:
+        ranked = await rank(required)
+        bound = common_terms_bound(idf, required, settings.KEYWORD_BM25_K1)
+        if pruned_ranking_is_exact(ranked, top_k, bound):
+            return ranked
+    return await rank(None)
+
+
+async def get_collection_stats(db: AsyncSession, user_uuid: uuid.UUID) -> Tuple[int, float]:
+    """
+    BM25 collection statistics of a user
+    
+    Returns:
+        (indexed documents, average document length in terms) tuple
+    """
+    documents, total_length = (await db.execute(
+        select(func.count(Task.term_count), func.coalesce(func.sum(Task.term_count), 0)).where(
+            Task.user_id == user_uuid
+        )
+    )).one()
+    return documents, (float(total_length) / documents if documents else 0.0)
@@ -4,23 +4,178 @@ Find similar documents based on semantic embeddings
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+from datetime import timedelta
+import asyncio
 import uuid
+import weakref
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_db
 from app.models.task import Task
+from app.redis_client import get_embedding_version
+from app.services.ann_index import IVFIndex, ann_index_registry
+from app.services.embedding_codec import decode_embeddings
 from app.services.embedding_service import embedding_service
+from app.services.query_encoder import query_encoder
+from app.services.similarity_cache import similarity_cache
 
 router = APIRouter()
 
+# Tasks completed this long before the index watermark are re-checked on
+# refresh, covering workers that commit slightly out of completion order
+INDEX_REFRESH_SLACK = timedelta(minutes=5)
+
+# Responses show this much of each content preview
+PREVIEW_CHARS = 100
+
+EMBEDDING_COLUMNS = (Task.embedding_data, Task.embedding_format, Task.embedding_scale)
+
+# One index load or refresh at a time per user (kept while in use)
+_index_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Only the winners' display metadata is read; the preview is cut in SQL
+WINNER_COLUMNS = (
+    Task.id, Task.filename, Task.file_size,
+    func.substr(Task.content_preview, 1, PREVIEW_CHARS).label("content_preview"),
+    Task.created_at
+)
+
+
+async def get_user_index(db: AsyncSession, user_uuid: uuid.UUID) -> IVFIndex:
+    """
+    Get a user's similarity index, loading or refreshing it as needed
+    
+    The index is built from PostgreSQL on first use. Afterwards, only tasks
+    completed since the last refresh are fetched, and only when a worker has
+    bumped the user's embedding version in Redis.
+    
+    Building, adding and retraining are NumPy work, run in the threadpool
+    so the event loop keeps serving. One request per user refreshes; while
+    it does, other requests search the previous index (or wait for the
+    first build).
+    
+    Args:
+        db: Async database session
+        user_uuid: User UUID
+    
+    Returns:
+        Up-to-date index of the user's completed tasks
+    """
+    user_key = str(user_uuid)
+    version = get_embedding_version(user_key)
+    index = ann_index_registry.get(user_key)
+    
+    if index is not None and version is not None and index.version == version:
+        return index
+    
+    lock = _index_locks.get(user_key)
+    if lock is None:
+        lock = _index_locks[user_key] = asyncio.Lock()
+    if index is not None and lock.locked():
+        # Being refreshed: the previous index is at most a few tasks behind
+        return index
+    
+    async with lock:
+        # Another request may have refreshed it while this one waited
+        index = ann_index_registry.get(user_key)
+        if index is not None and version is not None and index.version == version:
+            return index
+        
+        query = select(Task.id, *EMBEDDING_COLUMNS, Task.completed_at).where(
+            Task.user_id == user_uuid,
+            Task.embedding_data.isnot(None),
+            Task.status == "completed"
+        )
+        if index is not None and index.watermark is not None:
+            query = query.where(Task.completed_at >= index.watermark - INDEX_REFRESH_SLACK)
+        
+        rows = (await db.execute(query)).all()
+        index = await run_in_threadpool(refresh_index, index, rows, version)
+        ann_index_registry.put(user_key, index)
+        return index
+
+
+def refresh_index(index: Optional[IVFIndex], rows: list, version: Optional[int]) -> IVFIndex:
+    """
+    Add fetched rows to a fork of an index (or a new index)
+    
+    Runs in the threadpool; the given index is left untouched for the
+    requests still searching it.
+    
+    Returns:
+        The refreshed index
+    """
+    index = IVFIndex() if index is None else index.fork()
+    if rows:
+        # Packed bytes are decoded in one np.frombuffer call, not row by row
+        vectors = decode_embeddings(
+            [(row.embedding_data, row.embedding_format, row.embedding_scale) for row in rows],
+            index.dimensions
+        )
+        index.add(zip((str(row.id) for row in rows), vectors))
+    
+    completed = [row.completed_at for row in rows if row.completed_at]
+    if completed:
+        index.watermark = max([index.watermark or completed[0]] + completed)
+    index.version = version
+    return index
+
+
+async def describe_matches(
+    db: AsyncSession,
+    similar: List[tuple],
+    score_key: str = "similarityScore"
+) -> List[dict]:
+    """
+    Build response entries for search results
+    
+    Args:
+        db: Async database session
+        similar: (task_id, score) tuples, best first
+        score_key: Response field holding the score
+    
+    Returns:
+        One dict per result whose task still exists, in order
+    """
+    # Load metadata for the winners only
+    winners = (await db.execute(
+        select(*WINNER_COLUMNS).where(
+            Task.id.in_([uuid.UUID(task_id_str) for task_id_str, _ in similar])
+        )
+    )).all()
+    tasks_by_id = {str(task.id): task for task in winners}
+    
+    # Format response
+    similar_docs = []
+    for task_id_str, similarity_score in similar:
+        task = tasks_by_id.get(task_id_str)
+        if not task:
+            continue
+        similar_docs.append({
+            "taskId": task_id_str,
+            "filename": task.filename,
+            "fileSize": task.file_size,
+            score_key: round(similarity_score, 4),
+            "contentPreview": task.content_preview or None,
+            "createdAt": task.created_at.isoformat() if task.created_at else None
+        })
+    
+    return similar_docs
+
 
 @router.get("/similarity/search/{task_id}")
 async def search_similar_documents(
     task_id: str,
     user_id: str = Query(...),
     top_k: int = Query(5, ge=1, le=20),
-    db: Session = Depends(get_db)
+    nprobe: Optional[int] = Query(None, ge=1, le=256),
+    exact: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Find documents similar to a given task
@@ -28,6 +183,8 @@ async def search_similar_documents(
     - **task_id**: Reference task UUID
     - **user_id**: User ID for authorization
     - **top_k**: Number of similar documents to return (1-20)
+    - **nprobe**: Index clusters to scan; higher improves recall at some latency
+    - **exact**: Scan every document instead of using the approximate index
     
     Returns list of similar documents with similarity scores
     """
@@ -41,11 +198,36 @@ async def search_similar_documents(
             detail="Invalid UUID format"
         )
     
-    # Get reference task
-    ref_task = db.query(Task).filter(
-        Task.id == task_uuid,
-        Task.user_id == user_uuid
-    ).first()
+    # Results are valid until the user's embeddings change
+    version = get_embedding_version(str(user_uuid))
+    if version is None:
+        return await find_similar(db, task_uuid, user_uuid, top_k, nprobe, exact)
+    
+    return await similarity_cache.get_or_compute(
+        (str(user_uuid), str(task_uuid), top_k, nprobe, exact),
+        version,
+        lambda: find_similar(db, task_uuid, user_uuid, top_k, nprobe, exact)
+    )
+
+
+async def find_similar(
+    db: AsyncSession,
+    task_uuid: uuid.UUID,
+    user_uuid: uuid.UUID,
+    top_k: int,
+    nprobe: Optional[int],
+    exact: bool
+) -> dict:
+    """Run a similarity search and build its response"""
+    # Get reference task: its vector and what the response shows
+    ref_task = await db.scalar(
+        select(Task)
+        .options(load_only(Task.id, Task.filename, Task.content_preview, *EMBEDDING_COLUMNS))
+        .where(
+            Task.id == task_uuid,
+            Task.user_id == user_uuid
+        )
+    )
     
     if not ref_task:
         raise HTTPException(
@@ -53,21 +235,23 @@ async def search_similar_documents(
             detail="Task not found or access denied"
         )
     
-    if not ref_task.embedding:
+    if not ref_task.has_embedding:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Reference task does not have embedding. File may not be processed yet."
         )
     
-    # Get all user's tasks with embeddings (exclude reference task)
-    candidate_tasks = db.query(Task).filter(
-        Task.user_id == user_uuid,
-        Task.id != task_uuid,
-        Task.embedding.isnot(None),
-        Task.status == "completed"
-    ).all()
+    # Search the user's in-memory index (exclude reference task)
+    index = await get_user_index(db, user_uuid)
+    similar = index.search(
+        ref_task.embedding_vector,
+        top_k=top_k,
+        nprobe=nprobe,
+        exact=exact,
+        exclude=[str(task_uuid)]
+    )
     
-    if not candidate_tasks:
+    if not similar:
         return {
             "referenceTask": {
                 "taskId": str(ref_task.id),
@@ -77,46 +261,108 @@ async def search_similar_documents(
             "message": "No other documents with embeddings found"
         }
     
-    # Prepare candidate embeddings
-    candidates = [(str(task.id), task.embedding) for task in candidate_tasks]
-    
-    # Find similar documents
-    similar = embedding_service.find_similar_embeddings(
-        ref_task.embedding,
-        candidates,
-        top_k=top_k
-    )
-    
-    # Format response
-    similar_docs = []
-    for task_id_str, similarity_score in similar:
-        task = next(t for t in candidate_tasks if str(t.id) == task_id_str)
-        similar_docs.append({
-            "taskId": task_id_str,
-            "filename": task.filename,
-            "fileSize": task.file_size,
-            "similarityScore": round(similarity_score, 4),
-            "contentPreview": task.content_preview[:100] if task.content_preview else None,
-            "createdAt": task.created_at.isoformat() if task.created_at else None
-        })
+    similar_docs = await describe_matches(db, similar)
     
     return {
         "referenceTask": {
             "taskId": str(ref_task.id),
             "filename": ref_task.filename,
-            "contentPreview": ref_task.content_preview[:100] if ref_task.content_preview else None
+            "contentPreview": ref_task.content_preview[:PREVIEW_CHARS] if ref_task.content_preview else None
         },
         "similarDocuments": similar_docs,
         "totalFound": len(similar_docs)
     }
 
 
+@router.get("/similarity/query")
+async def search_by_text(
+    q: str = Query(..., min_length=1, max_length=settings.QUERY_MAX_LENGTH),
+    user_id: str = Query(...),
+    top_k: int = Query(5, ge=1, le=20),
+    nprobe: Optional[int] = Query(None, ge=1, le=256),
+    exact: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Find documents matching a free-text query
+    
+    - **q**: Query text
+    - **user_id**: User ID for authorization
+    - **top_k**: Number of documents to return (1-20)
+    - **nprobe**: Index clusters to scan; higher improves recall at some latency
+    - **exact**: Scan every document instead of using the approximate index
+    
+    Returns the user's documents ranked by semantic similarity to the query
+    """
+    
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid UUID format"
+        )
+    
+    query = query_encoder.normalize(q)
+    if not query:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query is empty"
+        )
+    
+    version = get_embedding_version(str(user_uuid))
+    if version is None:
+        return await find_by_text(db, query, user_uuid, top_k, nprobe, exact)
+    
+    return await similarity_cache.get_or_compute(
+        (str(user_uuid), "query", query, top_k, nprobe, exact),
+        version,
+        lambda: find_by_text(db, query, user_uuid, top_k, nprobe, exact)
+    )
+
+
+async def find_by_text(
+    db: AsyncSession,
+    query: str,
+    user_uuid: uuid.UUID,
+    top_k: int,
+    nprobe: Optional[int],
+    exact: bool
+) -> dict:
+    """Run a free-text search and build its response"""
+    try:
+        query_vector = await query_encoder.encode(query)
+    except RuntimeError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Query encoder not available"
+        )
+    
+    index = await get_user_index(db, user_uuid)
+    similar = index.search(query_vector, top_k=top_k, nprobe=nprobe, exact=exact)
+    
+    if not similar:
+        return {
+            "query": query,
+            "results": [],
+            "message": "No documents with embeddings found"
+        }
+    
+    results = await describe_matches(db, similar)
+    
+    return {
+        "query": query,
+        "results": results,
+        "totalFound": len(results)
+    }
+
+
 @router.post("/similarity/compare")
 async def compare_two_documents(
     task_id_1: str = Query(...),
     task_id_2: str = Query(...),
     user_id: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Compare similarity between two specific documents
@@ -138,16 +384,20 @@ async def compare_two_documents(
             detail="Invalid UUID format"
         )
     
-    # Get both tasks
-    task1 = db.query(Task).filter(
-        Task.id == task_uuid_1,
-        Task.user_id == user_uuid
-    ).first()
-    
-    task2 = db.query(Task).filter(
-        Task.id == task_uuid_2,
-        Task.user_id == user_uuid
-    ).first()
+    # Get both tasks in one round-trip
+    tasks_by_id = {
+        task.id: task
+        for task in (await db.scalars(
+            select(Task)
+            .options(load_only(Task.id, Task.filename, *EMBEDDING_COLUMNS))
+            .where(
+                Task.id.in_([task_uuid_1, task_uuid_2]),
+                Task.user_id == user_uuid
+            )
+        )).all()
+    }
+    task1 = tasks_by_id.get(task_uuid_1)
+    task2 = tasks_by_id.get(task_uuid_2)
     
     if not task1 or not task2:
         raise HTTPException(
@@ -155,7 +405,7 @@ async def compare_two_documents(
             detail="One or both tasks not found or access denied"
         )
     
-    if not task1.embedding or not task2.embedding:
+    if not task1.has_embedding or not task2.has_embedding:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="One or both tasks do not have embeddings"
@@ -163,8 +413,8 @@ async def compare_two_documents(
     
     # Calculate similarity
     similarity = embedding_service.calculate_similarity(
-        task1.embedding,
-        task2.embedding
+        task1.embedding_vector,
+        task2.embedding_vector
     )
     
     return {
@@ -3,22 +3,42 @@ Tasks Routes
 Handles task status queries and results
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from typing import List, Optional
 import uuid
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.task import Task
+from app.services.task_service import (
+    encode_cursor, decode_cursor, count_user_tasks, get_task_status_entries
+)
 
 router = APIRouter()
 
+# Task IDs accepted by one POST /tasks/status
+MAX_STATUS_BATCH = 1000
+
+# Columns each endpoint returns. Embeddings, content previews and file paths
+# are never sent to the client, so they are never read either; the listing
+# also leaves out results and errors.
+TASK_DETAIL_COLUMNS = (
+    Task.id, Task.filename, Task.file_size, Task.status, Task.created_at,
+    Task.started_at, Task.completed_at, Task.result, Task.error
+)
+TASK_LIST_COLUMNS = (
+    Task.id, Task.filename, Task.file_size, Task.status, Task.created_at,
+    Task.completed_at
+)
+
 
 @router.get("/tasks/{task_id}")
 async def get_task(
     task_id: str,
     user_id: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get task status and result by ID
@@ -39,10 +59,14 @@ async def get_task(
         )
     
     # Query task
-    task = db.query(Task).filter(
-        Task.id == task_uuid,
-        Task.user_id == user_uuid
-    ).first()
+    task = await db.scalar(
+        select(Task)
+        .options(load_only(*TASK_DETAIL_COLUMNS))
+        .where(
+            Task.id == task_uuid,
+            Task.user_id == user_uuid
+        )
+    )
     
     if not task:
         raise HTTPException(
@@ -81,17 +105,18 @@ async def get_task(
 async def get_user_tasks(
     user_id: str = Query(...),
     limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get all tasks for a user
+    Get all tasks for a user, newest first
     
     - **user_id**: User ID for filtering
     - **limit**: Maximum number of tasks to return (1-100)
-    - **offset**: Number of tasks to skip
+    - **cursor**: `nextCursor` of the previous page; omit for the first page
     
-    Returns list of tasks
+    Returns list of tasks. Pages are fetched by keyset on (created_at, id),
+    so every page costs the same however deep it is.
     """
     
     try:
@@ -102,15 +127,32 @@ async def get_user_tasks(
             detail="Invalid user ID format"
         )
     
-    # Query tasks
-    tasks = db.query(Task).filter(
-        Task.user_id == user_uuid
-    ).order_by(
-        Task.created_at.desc()
-    ).limit(limit).offset(offset).all()
-    
-    # Get total count
-    total = db.query(Task).filter(Task.user_id == user_uuid).count()
+    # Plain rows: no ORM objects to build for a read-only page
+    query = select(*TASK_LIST_COLUMNS).where(Task.user_id == user_uuid)
+    
+    if cursor:
+        try:
+            after_created_at, after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(tuple_(Task.created_at, Task.id) < tuple_(after_created_at, after_id))
+    
+    # Query one extra row to know whether there is a next page
+    tasks = (await db.execute(
+        query.order_by(
+            Task.created_at.desc(),
+            Task.id.desc()
+        ).limit(limit + 1)
+    )).all()
+    
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+    
+    # Totals come from cached per-user counters, not COUNT(*)
+    counts = await count_user_tasks(db, user_uuid)
     
     # Format response
     tasks_list = []
@@ -130,7 +172,64 @@ async def get_user_tasks(
     
     return {
         "tasks": tasks_list,
-        "total": total,
+        "total": counts["total"],
+        "statusCounts": {key: value for key, value in counts.items() if key != "total"},
         "limit": limit,
-        "offset": offset
-    }
\ No newline at end of file
+        "nextCursor": encode_cursor(tasks[-1]) if has_more else None
+    }
+
+
+@router.post("/tasks/status")
+async def get_task_statuses_bulk(
+    user_id: str = Query(...),
+    task_ids: List[str] = Body(..., embed=True, alias="taskIds"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the status and timing of many tasks in one call
+    
+    - **user_id**: User ID for authorization
+    - **taskIds**: Task UUIDs (JSON body, at most 1000)
+    
+    Statuses come from the Redis status cache, which is updated on every
+    status transition; tasks missing from it are read with one IN query
+    and cached. Tasks that do not exist or belong to another user are
+    listed in `notFound`.
+    """
+    
+    if len(task_ids) > MAX_STATUS_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many task IDs. Maximum: {MAX_STATUS_BATCH}"
+        )
+    
+    try:
+        user_uuid = uuid.UUID(user_id)
+        task_uuids = list(dict.fromkeys(uuid.UUID(task_id) for task_id in task_ids))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid UUID format"
+        )
+    
+    keys = [str(task_uuid) for task_uuid in task_uuids]
+    entries = await get_task_status_entries(db, task_uuids)
+    
+    tasks_list = []
+    not_found = []
+    for task_id in keys:
+        entry = entries.get(task_id)
+        if not entry or entry["userId"] != str(user_uuid):
+            not_found.append(task_id)
+            continue
+        
+        task_data = {"taskId": task_id, "status": entry["status"], "createdAt": entry["createdAt"]}
+        for field in ("startedAt", "completedAt"):
+            if field in entry:
+                task_data[field] = entry[field]
+        tasks_list.append(task_data)
+    
+    return {
+        "tasks": tasks_list,
+        "notFound": not_found
+    }
@@ -4,35 +4,58 @@ Handles file upload and queuing for processing
 """
 
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.exceptions import RedisError
 from pathlib import Path
+from typing import List, Optional
 import uuid
 from datetime import datetime
-import aiofiles
 
-from app.database import get_db, log_event
+from app.database import get_async_db, log_event
 from app.models.task import Task
-from app.redis_client import enqueue_task
+from app.redis_client import (
+    enqueue_task, enqueue_tasks, bump_embedding_version, bump_keyword_version, lane_for_size,
+    LANES, PROCESS_FILE_FUNC
+)
+from app.services.file_processor import save_upload, FileTooLargeError
+from app.services.task_service import (
+    find_completed_by_hash, find_completed_by_hashes, clone_completed_task, copy_task_terms,
+    index_minhash_signatures
+)
 from app.config import settings
 
 router = APIRouter()
 
 
+def check_priority(priority: Optional[str]):
+    """Reject a priority that is not a lane name"""
+    if priority is not None and priority not in LANES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid priority. Use one of: {', '.join(LANES)}"
+        )
+
+
 @router.post("/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_file(
     file: UploadFile = File(...),
     user_id: str = Form(...),
-    db: Session = Depends(get_db)
+    priority: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload a file for analysis
     
     - **file**: File to upload
     - **user_id**: User ID from authentication
+    - **priority**: Processing lane: high, normal or low (default: by file
+      size, small files high, large files low)
     
     Returns task ID and status
     """
     
+    check_priority(priority)
+    
     # Validate file
     if not file.filename:
         raise HTTPException(
@@ -40,33 +63,84 @@ async def upload_file(
             detail="No filename provided"
         )
     
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
+        )
+    
+    # Create task record
+    task_id = uuid.uuid4()
+    file_path = Path(settings.UPLOAD_DIR) / f"{task_id}_{file.filename}"
+    
+    # Ensure upload directory exists
+    Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
     
-    # Check file size
-    if file_size > settings.MAX_UPLOAD_SIZE:
+    # Stream file to a temporary name, counting and hashing in the same pass
+    partial_path = Path(settings.UPLOAD_DIR) / f".{task_id}.part"
+    try:
+        file_size, content_hash = await save_upload(
+            file,
+            partial_path,
+            max_size=settings.MAX_UPLOAD_SIZE,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE
+        )
+    except FileTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
         )
     
     if file_size == 0:
+        partial_path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Empty file"
         )
     
-    # Create task record
-    task_id = uuid.uuid4()
-    file_path = Path(settings.UPLOAD_DIR) / f"{task_id}_{file.filename}"
-    
-    # Ensure upload directory exists
-    Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    # Identical content already analyzed for this user: reuse its file and result
+    original = await find_completed_by_hash(db, uuid.UUID(user_id), content_hash)
+    if original:
+        partial_path.unlink(missing_ok=True)
+        
+        task = clone_completed_task(
+            original,
+            task_id=task_id,
+            user_id=uuid.UUID(user_id),
+            filename=file.filename,
+            file_size=file_size
+        )
+        db.add(task)
+        await copy_task_terms(db, original.id, task)
+        await db.commit()
+        
+        if task.has_embedding:
+            bump_embedding_version(user_id)
+        if task.term_count is not None:
+            bump_keyword_version(user_id)
+        index_minhash_signatures([task])
+        
+        log_event('file_uploads', {
+            'task_id': str(task_id),
+            'user_id': user_id,
+            'filename': file.filename,
+            'file_size': file_size,
+            'sha256': content_hash,
+            'deduplicated_from': str(original.id),
+            'timestamp': datetime.utcnow(),
+            'status': 'completed'
+        })
+        
+        return {
+            "taskId": str(task_id),
+            "status": "completed",
+            "message": "Identical file already analyzed, result reused",
+            "filename": file.filename,
+            "fileSize": file_size
+        }
     
-    # Save file
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+    partial_path.replace(file_path)
     
     # Create task in database
     task = Task(
@@ -75,20 +149,20 @@ async def upload_file(
         filename=file.filename,
         file_path=str(file_path),
         file_size=file_size,
+        content_hash=content_hash,
         status="queued"
     )
     
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    await db.commit()
     
-    # Enqueue processing job
-    from app.workers.file_worker import process_file
-    job = enqueue_task(process_file, str(task_id), str(file_path))
+    # Enqueue processing job (by import path, the API never loads the worker)
+    lane = priority or lane_for_size(file_size)
+    job = enqueue_task(PROCESS_FILE_FUNC, str(task_id), str(file_path), lane=lane, user_id=str(task.user_id))
     
     # Update task with job ID
     task.job_id = job.id
-    db.commit()
+    await db.commit()
     
     # Log event to MongoDB
     log_event('file_uploads', {
@@ -96,6 +170,8 @@ async def upload_file(
         'user_id': user_id,
         'filename': file.filename,
         'file_size': file_size,
+        'sha256': content_hash,
+        'lane': lane,
         'timestamp': datetime.utcnow(),
         'status': 'queued'
     })
@@ -105,5 +181,201 @@ async def upload_file(
         "status": "queued",
         "message": "File uploaded and queued for processing",
         "filename": file.filename,
-        "fileSize": file_size
-    }
\ No newline at end of file
+        "fileSize": file_size,
+        "lane": lane
+    }
+
+
+@router.post("/upload/batch", status_code=status.HTTP_202_ACCEPTED)
+async def upload_files(
+    files: List[UploadFile] = File(...),
+    user_id: str = Form(...),
+    priority: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload many files for analysis in one request
+    
+    - **files**: Files to upload (repeat the `files` field)
+    - **user_id**: User ID from authentication
+    - **priority**: Processing lane of every file: high, normal or low
+      (default: by the size of each file)
+    
+    Each file is streamed to disk and checked on its own; a file that is
+    rejected (too large, empty, no name) does not fail the others. A file
+    identical to an earlier one in the batch is not stored again: it reports
+    that file's task, with `duplicateOf` set to its position. All task rows
+    are inserted in one transaction and all jobs are enqueued through one
+    Redis pipeline.
+    
+    Returns the status of each file, in request order
+    """
+    
+    if len(files) > settings.MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. Maximum per batch: {settings.MAX_BATCH_FILES}"
+        )
+    
+    check_priority(priority)
+    
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid user ID format"
+        )
+    
+    Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    too_large = f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
+    
+    # Stream every file to a temporary name first; entries are the response
+    entries = []
+    stored = []  # (entry, task_id, partial_path, file_size, content_hash)
+    first_positions = {}  # content hash -> position of its first file in the batch
+    repeats = []  # (entry, position of the identical earlier file)
+    for position, file in enumerate(files):
+        entry = {"filename": file.filename}
+        entries.append(entry)
+        
+        if not file.filename:
+            entry.update(status="rejected", error="No filename provided")
+            continue
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            entry.update(status="rejected", error=too_large)
+            continue
+        
+        task_id = uuid.uuid4()
+        partial_path = Path(settings.UPLOAD_DIR) / f".{task_id}.part"
+        try:
+            file_size, content_hash = await save_upload(
+                file,
+                partial_path,
+                max_size=settings.MAX_UPLOAD_SIZE,
+                chunk_size=settings.UPLOAD_CHUNK_SIZE
+            )
+        except FileTooLargeError:
+            entry.update(status="rejected", error=too_large)
+            continue
+        
+        if file_size == 0:
+            partial_path.unlink(missing_ok=True)
+            entry.update(status="rejected", error="Empty file")
+            continue
+        
+        # Same content earlier in this batch: stored and processed once
+        if content_hash in first_positions:
+            partial_path.unlink(missing_ok=True)
+            entry["fileSize"] = file_size
+            repeats.append((entry, first_positions[content_hash]))
+            continue
+        first_positions[content_hash] = position
+        
+        stored.append((entry, task_id, partial_path, file_size, content_hash))
+    
+    # One lookup for every already-analyzed file in the batch
+    originals = await find_completed_by_hashes(db, user_uuid, (item[4] for item in stored))
+    
+    queued = []
+    clones = []
+    events = []
+    has_embeddings = False
+    for entry, task_id, partial_path, file_size, content_hash in stored:
+        original = originals.get(content_hash)
+        event = {
+            'task_id': str(task_id),
+            'user_id': user_id,
+            'filename': entry["filename"],
+            'file_size': file_size,
+            'sha256': content_hash,
+            'batch': True
+        }
+        
+        if original:
+            partial_path.unlink(missing_ok=True)
+            task = clone_completed_task(
+                original,
+                task_id=task_id,
+                user_id=user_uuid,
+                filename=entry["filename"],
+                file_size=file_size
+            )
+            has_embeddings = has_embeddings or task.has_embedding
+            clones.append((original.id, task))
+            event['deduplicated_from'] = str(original.id)
+        else:
+            file_path = Path(settings.UPLOAD_DIR) / f"{task_id}_{entry['filename']}"
+            partial_path.replace(file_path)
+            # The job ID is known up front, so the row is written once
+            task = Task(
+                id=task_id,
+                user_id=user_uuid,
+                filename=entry["filename"],
+                file_path=str(file_path),
+                file_size=file_size,
+                content_hash=content_hash,
+                status="queued",
+                job_id=str(uuid.uuid4())
+            )
+            queued.append(task)
+            entry["lane"] = event['lane'] = priority or lane_for_size(file_size)
+        
+        db.add(task)
+        entry.update(taskId=str(task_id), status=task.status, fileSize=file_size)
+        events.append(event)
+    
+    for original_id, task in clones:
+        await copy_task_terms(db, original_id, task)
+    
+    if stored:
+        await db.commit()
+    
+    if has_embeddings:
+        bump_embedding_version(user_id)
+    if any(task.term_count is not None for _, task in clones):
+        bump_keyword_version(user_id)
+    index_minhash_signatures(task for _, task in clones)
+    
+    if queued:
+        try:
+            enqueue_tasks(
+                PROCESS_FILE_FUNC,
+                [(str(task.id), task.file_path) for task in queued],
+                job_ids=[task.job_id for task in queued],
+                lanes=[priority or lane_for_size(task.file_size) for task in queued],
+                user_ids=[str(task.user_id) for task in queued]
+            )
+        except RedisError as e:
+            # Rows exist but no job will run them: report them as failed
+            for task in queued:
+                task.status = "failed"
+                task.error = f"Could not queue for processing: {e}"
+                task.completed_at = datetime.utcnow()
+            await db.commit()
+            failed = {str(task.id) for task in queued}
+            for entry in entries:
+                if entry.get("taskId") in failed:
+                    entry.update(status="failed", error="Could not queue for processing")
+    
+    # Repeated files report the task of their first copy
+    for entry, first in repeats:
+        entry.update(
+            {key: entries[first][key] for key in ("taskId", "status", "lane", "error") if key in entries[first]},
+            duplicateOf=first
+        )
+    
+    now = datetime.utcnow()
+    for event, entry in zip(events, (item[0] for item in stored)):
+        event.update(timestamp=now, status=entry["status"])
+        log_event('file_uploads', event)
+    
+    counts = {"queued": 0, "completed": 0, "failed": 0, "rejected": 0}
+    for entry in entries:
+        counts[entry["status"]] += 1
+    
+    return {
+        "files": entries,
+        "total": len(entries),
+        **counts
+    }
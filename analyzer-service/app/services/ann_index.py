@@ -0,0 +1,272 @@
+"""
+ANN Index Service
+Per-user approximate nearest-neighbour indexes for similarity search
+
+Each user gets an IVF (inverted file) index held in the API process: vectors
+are clustered with spherical k-means and a query only scores the rows of the
+`nprobe` closest clusters. Small indexes, or callers asking for it, fall back
+to an exact scan. Indexes are kept in an LRU bounded by a memory budget.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+import copy
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.vector_search import normalize_rows, top_k_indices
+
+# Rows assigned to centroids per batch, bounds the temporary score matrix
+ASSIGN_BATCH_SIZE = 8192
+
+# Training sample size per centroid for k-means
+TRAIN_SAMPLES_PER_LIST = 64
+
+
+class IVFIndex:
+    """Inverted-file index over the normalized embeddings of one user"""
+    
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self.ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors = np.empty((0, dimensions), dtype=np.float32)
+        self._valid = np.empty(0, dtype=bool)
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        
+        # Refresh bookkeeping, see app.routes.similarity
+        self.version: Optional[int] = None
+        self.watermark: Optional[datetime] = None
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._positions
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint in bytes"""
+        centroid_bytes = self.centroids.nbytes if self.centroids is not None else 0
+        # ~100 bytes per id: the UUID string plus its dict entry
+        return (
+            self._vectors.nbytes + self._valid.nbytes + self._assignments.nbytes
+            + centroid_bytes + 100 * len(self.ids)
+        )
+    
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+    
+    def fork(self) -> "IVFIndex":
+        """
+        Copy to refresh while this index keeps serving searches
+        
+        The backing arrays are shared, not copied: adding to the copy only
+        writes rows past this index's size (or into new arrays when they
+        grow), and training gives it new centroids and assignments. So this
+        index never changes under a reader. Fork the latest index only.
+        """
+        index = copy.copy(self)
+        index.ids = list(self.ids)
+        index._positions = dict(self._positions)
+        return index
+    
+    def add(self, items: Iterable[Tuple[str, Sequence[float]]]):
+        """
+        Add embeddings to the index
+        
+        Args:
+            items: (id, embedding) tuples; ids already indexed are skipped
+        """
+        new_items = [(item_id, emb) for item_id, emb in items if item_id not in self._positions]
+        if not new_items:
+            return
+        
+        vectors, valid = normalize_rows(
+            np.array([emb for _, emb in new_items], dtype=np.float32).reshape(len(new_items), -1)
+        )
+        self._reserve(self._size + len(new_items))
+        
+        start, end = self._size, self._size + len(new_items)
+        self._vectors[start:end] = vectors
+        self._valid[start:end] = valid
+        for offset, (item_id, _) in enumerate(new_items):
+            self._positions[item_id] = start + offset
+            self.ids.append(item_id)
+        self._size = end
+        
+        if self.is_trained:
+            self._assignments[start:end] = self._assign(vectors)
+        
+        # Retrain once the index has doubled since the last training
+        if self._size >= settings.ANN_MIN_TRAIN_SIZE and self._size >= 2 * self._trained_size:
+            self.train()
+    
+    def train(self, seed: int = 0):
+        """
+        Cluster the indexed vectors with spherical k-means
+        
+        Args:
+            seed: Random seed for sampling and initial centroids
+        """
+        vectors = self._vectors[:self._size][self._valid[:self._size]]
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        if len(vectors) < nlist:
+            return
+        
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(vectors), nlist * TRAIN_SAMPLES_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        
+        for _ in range(settings.ANN_KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(labels, minlength=nlist)
+            # Sum each cluster's members; empty clusters keep their centroid
+            filled = counts > 0
+            starts = (np.cumsum(counts) - counts)[filled]
+            sums = np.add.reduceat(sample[np.argsort(labels, kind="stable")], starts, axis=0)
+            centroids[filled], _ = normalize_rows(sums)
+        
+        # New arrays, not written in place: a forked index shares the old ones
+        assignments = np.zeros(len(self._assignments), dtype=np.int32)
+        self.centroids = centroids
+        assignments[:self._size] = self._assign(self._vectors[:self._size])
+        self._assignments = assignments
+        self._trained_size = self._size
+    
+    def search(
+        self,
+        query: Sequence[float],
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+        exclude: Iterable[str] = ()
+    ) -> List[tuple]:
+        """
+        Find the indexed embeddings most similar to a query
+        
+        Args:
+            query: Query embedding vector
+            top_k: Number of results to return
+            nprobe: Clusters to scan; more means better recall and slower
+                queries (defaults to settings.ANN_NPROBE)
+            exact: Scan every row instead of probing clusters
+            exclude: Ids to leave out of the results
+        
+        Returns:
+            List of (id, similarity_score) tuples with scores scaled to 0-1
+        """
+        exclude = set(exclude)
+        if self._size == 0 or top_k <= 0:
+            return []
+        
+        query_vec = np.asarray(query, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm == 0:
+            return []
+        query_vec = query_vec / query_norm
+        
+        nprobe = nprobe or settings.ANN_NPROBE
+        if exact or not self.is_trained or nprobe >= len(self.centroids):
+            rows = None
+            cos = self._vectors[:self._size] @ query_vec
+            valid = self._valid[:self._size]
+        else:
+            probe = np.argpartition(-(self.centroids @ query_vec), nprobe - 1)[:nprobe]
+            rows = np.flatnonzero(np.isin(self._assignments[:self._size], probe))
+            cos = self._vectors[rows] @ query_vec
+            valid = self._valid[rows]
+        
+        # Zero vectors score 0.0, as in EmbeddingService.calculate_similarity
+        scores = np.where(valid, (cos + 1) / 2, 0).astype(np.float32)
+        
+        results = []
+        for i in top_k_indices(scores, top_k + len(exclude)):
+            item_id = self.ids[i if rows is None else rows[i]]
+            if item_id not in exclude:
+                results.append((item_id, float(scores[i])))
+        return results[:top_k]
+    
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid for each vector, computed in bounded batches"""
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), ASSIGN_BATCH_SIZE):
+            batch = vectors[start:start + ASSIGN_BATCH_SIZE]
+            assignments[start:start + len(batch)] = np.argmax(batch @ self.centroids.T, axis=1)
+        return assignments
+    
+    def _reserve(self, capacity: int):
+        """Grow the backing arrays geometrically to fit `capacity` rows"""
+        if capacity <= len(self._vectors):
+            return
+        new_capacity = max(capacity, 2 * len(self._vectors), 64)
+        
+        vectors = np.zeros((new_capacity, self.dimensions), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        valid = np.zeros(new_capacity, dtype=bool)
+        valid[:self._size] = self._valid[:self._size]
+        assignments = np.zeros(new_capacity, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        
+        self._vectors, self._valid, self._assignments = vectors, valid, assignments
+
+
+class AnnIndexRegistry:
+    """Per-user indexes kept in LRU order under a memory budget"""
+    
+    def __init__(self, memory_budget_bytes: int):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._indexes: "OrderedDict[str, IVFIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    def get(self, user_id: str) -> Optional[IVFIndex]:
+        """Get a user's index and mark it as recently used"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+            return index
+    
+    def put(self, user_id: str, index: IVFIndex):
+        """
+        Store (or re-account) a user's index, evicting least recently used
+        indexes while over budget. The most recent index is always kept.
+        """
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > 1 and self._total_bytes() > self.memory_budget_bytes:
+                self._indexes.popitem(last=False)
+                self.evictions += 1
+    
+    def discard(self, user_id: str):
+        """Drop a user's index"""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+    
+    def stats(self) -> dict:
+        """Registry usage statistics"""
+        with self._lock:
+            return {
+                "users": len(self._indexes),
+                "vectors": sum(len(index) for index in self._indexes.values()),
+                "memoryBytes": self._total_bytes(),
+                "memoryBudgetBytes": self.memory_budget_bytes,
+                "evictions": self.evictions
+            }
+    
+    def _total_bytes(self) -> int:
+        return sum(index.nbytes for index in self._indexes.values())
+
+
+# Global instance
+ann_index_registry = AnnIndexRegistry(settings.ANN_INDEX_MEMORY_BUDGET_MB * 1024 * 1024)
@@ -0,0 +1,144 @@
+"""
+Embedding Cache
+Two-tier cache of text embeddings: an in-process LRU backed by Redis
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Cache of embeddings keyed by model name and input text hash
+    
+    Lookups hit a bounded in-process LRU first, then Redis, where vectors are
+    stored as packed float32 bytes with a TTL so every worker replica reuses
+    the others' encodings. Redis errors degrade to cache misses.
+    """
+    
+    def __init__(self, model_name: str, max_entries: int, redis_conn=None, ttl_seconds: int = 0):
+        """
+        Args:
+            model_name: Model the cached vectors were produced by
+            max_entries: Capacity of the in-process LRU (0 disables it)
+            redis_conn: Redis connection with decode_responses=False, or None
+                to disable the shared tier
+            ttl_seconds: Expiry of Redis entries (0 means no expiry)
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.redis_conn = redis_conn
+        self.ttl_seconds = ttl_seconds
+        
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.redis_errors = 0
+    
+    def key(self, text: str) -> str:
+        """Cache key of a text for this model"""
+        digest = hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+        return f"embcache:{digest}"
+    
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings
+        
+        Args:
+            texts: Input texts
+        
+        Returns:
+            One float32 vector (or None on a miss) per text, in order
+        """
+        keys = [self.key(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    results[i] = vector
+                    self.local_hits += 1
+        
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing and self.redis_conn is not None:
+            try:
+                blobs = self.redis_conn.mget([keys[i] for i in missing])
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                self.redis_errors += 1
+                blobs = [None] * len(missing)
+            
+            for i, blob in zip(missing, blobs):
+                if blob:
+                    results[i] = np.frombuffer(blob, dtype='<f4')
+                    self._store_local(keys[i], results[i])
+                    self.redis_hits += 1
+        
+        self.misses += sum(1 for vector in results if vector is None)
+        return results
+    
+    def put_many(self, texts: Sequence[str], vectors: Sequence[np.ndarray]):
+        """
+        Store embeddings in both tiers
+        
+        Args:
+            texts: Input texts
+            vectors: Embedding of each text
+        """
+        if not texts:
+            return
+        
+        keys = [self.key(text) for text in texts]
+        packed = [np.asarray(vector, dtype='<f4') for vector in vectors]
+        
+        for key, vector in zip(keys, packed):
+            self._store_local(key, vector)
+        
+        if self.redis_conn is None:
+            return
+        
+        try:
+            with self.redis_conn.pipeline(transaction=False) as pipe:
+                for key, vector in zip(keys, packed):
+                    pipe.set(key, vector.tobytes(), ex=self.ttl_seconds or None)
+                pipe.execute()
+        except Exception as e:
+            logger.warning(f"Embedding cache store failed: {e}")
+            self.redis_errors += 1
+    
+    def stats(self) -> dict:
+        """Hit/miss counters"""
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "localHits": self.local_hits,
+            "redisHits": self.redis_hits,
+            "misses": self.misses,
+            "hitRate": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+            "localEntries": len(self._entries),
+            "localEvictions": self.evictions,
+            "redisErrors": self.redis_errors
+        }
+    
+    def _store_local(self, key: str, vector: np.ndarray):
+        """Insert into the LRU, evicting the least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
@@ -0,0 +1,110 @@
+"""
+Embedding Codec
+Compact binary encodings for stored embedding vectors
+
+Vectors are stored as raw bytes instead of PostgreSQL float arrays:
+
+- "float32": packed little-endian float32, 4 bytes per dimension
+- "int8": symmetric int8 quantization, 1 byte per dimension plus a float
+  scale; each value is recovered as q * scale
+
+Decoding uses np.frombuffer, so no per-element Python objects are created.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_FLOAT32 = "float32"
+FORMAT_INT8 = "int8"
+
+FORMATS = (FORMAT_FLOAT32, FORMAT_INT8)
+
+# Stored byte order is fixed so blobs are portable between hosts
+_DTYPES = {
+    FORMAT_FLOAT32: np.dtype("<f4"),
+    FORMAT_INT8: np.dtype("i1"),
+}
+
+
+def encode_embedding(vector: Sequence[float], storage_format: str = FORMAT_FLOAT32) -> Tuple[bytes, Optional[float]]:
+    """
+    Encode an embedding for storage
+    
+    Args:
+        vector: Embedding vector
+        storage_format: FORMAT_FLOAT32 or FORMAT_INT8
+    
+    Returns:
+        (data, scale) tuple; scale is None for float32
+    """
+    values = np.asarray(vector, dtype=np.float32)
+    
+    if storage_format == FORMAT_FLOAT32:
+        return values.astype("<f4", copy=False).tobytes(), None
+    
+    if storage_format == FORMAT_INT8:
+        peak = float(np.abs(values).max()) if values.size else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(values / scale), -127, 127).astype("i1")
+        return quantized.tobytes(), scale
+    
+    raise ValueError(f"Unknown embedding storage format: {storage_format}")
+
+
+def decode_embedding(data: bytes, storage_format: str, scale: Optional[float] = None) -> np.ndarray:
+    """
+    Decode a stored embedding
+    
+    float32 data is returned as a read-only view of the buffer (no copy);
+    int8 data is dequantized into a new float32 array.
+    
+    Args:
+        data: Stored bytes
+        storage_format: Format the bytes were encoded with
+        scale: Quantization scale (int8 only)
+    
+    Returns:
+        1D float32 array
+    """
+    if storage_format not in _DTYPES:
+        raise ValueError(f"Unknown embedding storage format: {storage_format}")
+    
+    values = np.frombuffer(data, dtype=_DTYPES[storage_format])
+    if storage_format == FORMAT_INT8:
+        return values.astype(np.float32) * np.float32(scale)
+    return values
+
+
+def decode_embeddings(rows: Sequence[Tuple[bytes, str, Optional[float]]], dimensions: int) -> np.ndarray:
+    """
+    Decode many stored embeddings into one matrix
+    
+    Blobs sharing a format are joined and decoded with a single
+    np.frombuffer call instead of one call per row.
+    
+    Args:
+        rows: (data, storage_format, scale) tuples, all of `dimensions` values
+        dimensions: Embedding dimensions
+    
+    Returns:
+        float32 matrix with one row per input
+    """
+    unknown = {row[1] for row in rows} - set(_DTYPES)
+    if unknown:
+        raise ValueError(f"Unknown embedding storage format: {', '.join(map(str, unknown))}")
+    
+    matrix = np.empty((len(rows), dimensions), dtype=np.float32)
+    
+    for storage_format, dtype in _DTYPES.items():
+        positions = [i for i, row in enumerate(rows) if row[1] == storage_format]
+        if not positions:
+            continue
+        block = np.frombuffer(b"".join(rows[i][0] for i in positions), dtype=dtype).reshape(len(positions), dimensions)
+        if storage_format == FORMAT_INT8:
+            scales = np.array([rows[i][2] for i in positions], dtype=np.float32)
+            matrix[positions] = block * scales[:, None]
+        else:
+            matrix[positions] = block
+    
+    return matrix
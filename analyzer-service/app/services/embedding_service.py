@@ -1,12 +1,23 @@
 """
 Embedding Service
 Generates semantic embeddings for text content using sentence-transformers
+
+The model is loaded lazily: importing this module does not import torch or
+sentence-transformers, so the HTTP app can use the similarity helpers
+without paying for the model. Workers call warmup() before taking jobs, the
+API only to encode free-text search queries (see query_encoder).
 """
 
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import logging
+import threading
+import time
+
+from app.config import settings
+from app.redis_client import redis_binary_conn
+from app.services.embedding_cache import EmbeddingCache
+from app.services.vector_search import find_top_k
 
 logger = logging.getLogger(__name__)
 
@@ -14,16 +25,86 @@ logger = logging.getLogger(__name__)
 class EmbeddingService:
     """Service for generating text embeddings"""
     
+    model_name = 'all-MiniLM-L6-v2'
+    
     def __init__(self):
-        """Initialize the embedding model"""
-        try:
-            # Load lightweight model (22MB, 384 dimensions)
-            # CPU-friendly, fast inference (~0.1s per document)
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("✓ Embedding model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load embedding model: {e}")
-            self.model = None
+        """Initialize the service; the model itself is loaded on first use"""
+        self.cache = EmbeddingCache(
+            self.model_name,
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            redis_conn=redis_binary_conn if settings.EMBEDDING_CACHE_REDIS else None,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL
+        )
+        self._model = None
+        self._load_lock = threading.Lock()
+        self.load_failures = 0  # Consecutive failed loads
+        self.load_error: Optional[str] = None
+        self._retry_at = 0.0  # time.monotonic() before which a failed load is not retried
+    
+    @property
+    def model(self):
+        """
+        Embedding model, loaded on first access
+        
+        None while loading fails; a failed load is retried on access once its
+        backoff (EMBEDDING_LOAD_RETRY_SECONDS, doubling per failure) is over.
+        """
+        if self._model is None and time.monotonic() >= self._retry_at:
+            self.warmup()
+        return self._model
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the model is already in memory"""
+        return self._model is not None
+    
+    def warmup(self) -> float:
+        """
+        Load the model and run one encode so the first job is not slowed down
+        
+        Safe to call repeatedly; a previous load failure is retried.
+        
+        Returns:
+            Seconds spent loading (0 if the model was already loaded)
+        """
+        with self._load_lock:
+            if self._model is not None:
+                return 0.0
+            
+            start = time.perf_counter()
+            try:
+                from sentence_transformers import SentenceTransformer
+                
+                # Load lightweight model (22MB, 384 dimensions)
+                # CPU-friendly, fast inference (~0.1s per document)
+                model = SentenceTransformer(self.model_name)
+                model.encode(["warmup"], show_progress_bar=False)
+                self._model = model
+                self.load_failures = 0
+                self.load_error = None
+                logger.info("✓ Embedding model loaded successfully")
+            except Exception as e:
+                self.load_failures += 1
+                self.load_error = str(e)
+                backoff = min(
+                    settings.EMBEDDING_LOAD_RETRY_SECONDS * 2 ** (self.load_failures - 1),
+                    settings.EMBEDDING_LOAD_RETRY_MAX_SECONDS
+                )
+                self._retry_at = time.monotonic() + backoff
+                logger.error(f"Failed to load embedding model (retry in {backoff}s): {e}")
+            
+            return time.perf_counter() - start
+    
+    def load_status(self) -> dict:
+        """Whether the model is loaded, and the last load error while it is not"""
+        if self._model is not None:
+            return {"loaded": True}
+        return {
+            "loaded": False,
+            "failures": self.load_failures,
+            "error": self.load_error,
+            "retryInSeconds": round(max(0.0, self._retry_at - time.monotonic()), 1) if self.load_failures else None
+        }
     
     def generate_embedding(self, text: str, max_length: int = 1000) -> Optional[List[float]]:
         """
@@ -36,20 +117,12 @@ class EmbeddingService:
         Returns:
             List of 384 floats representing the embedding, or None if failed
         """
-        if not self.model:
-            logger.warning("Embedding model not available")
-            return None
-        
         try:
             # Truncate text if too long (for performance)
             text_truncated = text[:max_length] if len(text) > max_length else text
             
             # Generate embedding
-            embedding = self.model.encode(
-                text_truncated,
-                convert_to_numpy=True,
-                show_progress_bar=False
-            )
+            embedding = self._encode([text_truncated])[0]
             
             # Convert to list for JSON serialization
             return embedding.tolist()
@@ -58,6 +131,195 @@ class EmbeddingService:
             logger.error(f"Error generating embedding: {e}")
             return None
     
+    def generate_embeddings(self, texts: List[str], max_length: int = 1000) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for several texts with a single model call
+        
+        Args:
+            texts: Input texts to embed
+            max_length: Maximum text length to process (truncate if longer)
+        
+        Returns:
+            One embedding (or None if it failed) per input text, in order
+        """
+        if not texts:
+            return []
+        
+        try:
+            embeddings = self._encode([text[:max_length] for text in texts])
+            return [embedding.tolist() for embedding in embeddings]
+        
+        except Exception as e:
+            # Isolate the failing input by falling back to one call per text
+            logger.error(f"Error generating batch embeddings, retrying one by one: {e}")
+            return [self.generate_embedding(text, max_length=max_length) for text in texts]
+    
+    def encode_query(self, text: str) -> np.ndarray:
+        """
+        Embed a search query
+        
+        Goes through the embedding cache like document chunks, so a query
+        already encoded by another process is read from Redis.
+        
+        Args:
+            text: Query text
+        
+        Returns:
+            float32 embedding vector
+        
+        Raises:
+            RuntimeError: If the model is not available
+        """
+        return self._encode([text])[0]
+    
+    def chunk_text(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Split text into overlapping windows for embedding
+        
+        Windows are EMBEDDING_CHUNK_SIZE characters long and overlap by
+        EMBEDDING_CHUNK_OVERLAP. A window end is moved back to the last
+        whitespace in its final fifth so words are not cut in half. At most
+        EMBEDDING_MAX_CHUNKS windows are produced, from the start of the text.
+        
+        Args:
+            text: Input text
+        
+        Returns:
+            List of (start, end) character offsets
+        """
+        chunk_size = settings.EMBEDDING_CHUNK_SIZE
+        
+        chunks = []
+        start = 0
+        while start < len(text) and len(chunks) < settings.EMBEDDING_MAX_CHUNKS:
+            end = min(start + chunk_size, len(text))
+            if end < len(text):
+                split_at = max(text.rfind(c, end - chunk_size // 5, end) for c in ' \n\t')
+                if split_at > start:
+                    end = split_at
+            chunks.append((start, end))
+            if end >= len(text):
+                break
+            start = max(start + 1, end - settings.EMBEDDING_CHUNK_OVERLAP)
+        
+        return chunks
+    
+    @property
+    def max_document_length(self) -> int:
+        """Characters of a document that can end up in an embedding chunk"""
+        stride = max(1, settings.EMBEDDING_CHUNK_SIZE - settings.EMBEDDING_CHUNK_OVERLAP)
+        return (settings.EMBEDDING_MAX_CHUNKS - 1) * stride + settings.EMBEDDING_CHUNK_SIZE
+    
+    def generate_document_embedding(self, text: str) -> Tuple[Optional[List[float]], List[dict]]:
+        """
+        Generate an embedding covering a whole document
+        
+        Args:
+            text: Document text
+        
+        Returns:
+            (document_embedding, chunks) tuple, see generate_document_embeddings
+        """
+        return self.generate_document_embeddings([text])[0]
+    
+    def generate_document_embeddings(self, texts: List[str]) -> List[Tuple[Optional[List[float]], List[dict]]]:
+        """
+        Generate whole-document embeddings for several documents
+        
+        Each document is split with chunk_text, the chunks of all documents
+        are encoded together in batches of EMBEDDING_BATCH_SIZE and each
+        document vector is the length-weighted mean of its chunk vectors,
+        normalized to unit length.
+        
+        Args:
+            texts: Document texts
+        
+        Returns:
+            One (document_embedding, chunks) tuple per text. chunks is a list
+            of dicts with index, start, end and embedding. Both are empty
+            (None, []) when the document is empty or encoding failed.
+        """
+        if not texts:
+            return []
+        
+        spans = [self.chunk_text(text) for text in texts]
+        chunk_texts = [text[start:end] for text, doc_spans in zip(texts, spans) for start, end in doc_spans]
+        
+        try:
+            vectors = self._encode(chunk_texts)
+        except Exception as e:
+            if len(texts) == 1:
+                logger.error(f"Error generating document embedding: {e}")
+                return [(None, [])]
+            # Isolate the failing document by falling back to one call per text
+            logger.error(f"Error generating batch embeddings, retrying one by one: {e}")
+            return [self.generate_document_embedding(text) for text in texts]
+        
+        results = []
+        offset = 0
+        for doc_spans in spans:
+            doc_vectors = vectors[offset:offset + len(doc_spans)]
+            offset += len(doc_spans)
+            
+            if not doc_spans:
+                results.append((None, []))
+                continue
+            
+            weights = np.array([end - start for start, end in doc_spans], dtype=np.float32)
+            pooled = (doc_vectors * weights[:, None]).sum(axis=0) / weights.sum()
+            norm = np.linalg.norm(pooled)
+            if norm > 0:
+                pooled = pooled / norm
+            
+            chunks = [
+                {'index': i, 'start': start, 'end': end, 'embedding': vector.tolist()}
+                for i, ((start, end), vector) in enumerate(zip(doc_spans, doc_vectors))
+            ]
+            results.append((pooled.tolist(), chunks))
+        
+        return results
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts, reusing cached embeddings where possible
+        
+        Only cache misses reach the model (loading it if needed); they are
+        encoded together, EMBEDDING_BATCH_SIZE at a time, and written back to
+        the cache.
+        
+        Args:
+            texts: Input texts
+        
+        Returns:
+            float32 matrix with one row per text
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        
+        if missing:
+            model = self.model
+            if model is None:
+                raise RuntimeError("Embedding model not available")
+            
+            # Identical texts within the call are encoded once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = model.encode(
+                unique_texts,
+                batch_size=settings.EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ).astype(np.float32, copy=False)
+            self.cache.put_many(unique_texts, encoded)
+            
+            by_text = dict(zip(unique_texts, encoded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+        
+        return np.stack(vectors)
+    
     def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
         Calculate cosine similarity between two embeddings
@@ -99,6 +361,9 @@ class EmbeddingService:
         """
         Find most similar embeddings to query
         
+        Candidates are scored together as one float32 matrix-vector product
+        (see app.services.vector_search) instead of pair by pair.
+        
         Args:
             query_embedding: Query embedding vector
             candidate_embeddings: List of (id, embedding) tuples
@@ -107,16 +372,7 @@ class EmbeddingService:
         Returns:
             List of (id, similarity_score) tuples, sorted by similarity
         """
-        similarities = []
-        
-        for item_id, embedding in candidate_embeddings:
-            similarity = self.calculate_similarity(query_embedding, embedding)
-            similarities.append((item_id, similarity))
-        
-        # Sort by similarity (descending)
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        
-        return similarities[:top_k]
+        return find_top_k(query_embedding, candidate_embeddings, top_k=top_k)
 
 
 # Global instance
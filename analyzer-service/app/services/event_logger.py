@@ -0,0 +1,223 @@
+"""
+Event Logger
+Buffered, batching writer for MongoDB event logs
+"""
+
+from collections import defaultdict, deque
+import os
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# What happens to an event logged while the queue is full
+OVERFLOW_DROP_NEW = "drop_new"  # keep what is queued, reject the new event
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # evict the oldest queued event
+
+OVERFLOW_POLICIES = (OVERFLOW_DROP_NEW, OVERFLOW_DROP_OLDEST)
+
+
+class EventLogger:
+    """
+    Queue events in memory and write them to MongoDB in batches
+    
+    log() only appends to a bounded in-memory queue. A background thread
+    writes queued events with insert_many(ordered=False), one call per
+    collection, once `batch_size` events are waiting or `flush_interval`
+    seconds have passed. When the queue is full the overflow policy decides
+    which event is dropped; logging never blocks the caller.
+    
+    Failed writes are counted and not retried: these are best-effort
+    operational logs, like the inline insert_one they replace.
+    
+    The background thread does not survive fork(). A forked process starts
+    with an empty queue and its own thread, so events are never written twice;
+    short-lived children (e.g. RQ work horses) should call flush() before
+    exiting.
+    """
+    
+    def __init__(
+        self,
+        get_db: Callable,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        overflow_policy: str = OVERFLOW_DROP_NEW
+    ):
+        """
+        Args:
+            get_db: Returns the MongoDB database to write to (called at flush time)
+            max_queue_size: Events held in memory before the overflow policy applies
+            batch_size: Queued events that trigger an early flush
+            flush_interval: Max seconds an event waits before being written
+            overflow_policy: OVERFLOW_DROP_NEW or OVERFLOW_DROP_OLDEST
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        
+        self.get_db = get_db
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        
+        self._reset()
+    
+    def _reset(self):
+        """Fresh queue, lock and thread state for the current process"""
+        self._queue: Deque[Tuple[str, dict]] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._pid = os.getpid()
+    
+    def _check_pid(self):
+        """
+        Reset per-process state in a forked child
+        
+        The inherited lock may have been held by a parent thread at fork
+        time, and the inherited queue holds the parent's events.
+        """
+        if self._pid != os.getpid():
+            self._reset()
+    
+    def log(self, collection: str, event: dict) -> bool:
+        """
+        Queue an event for writing
+        
+        Args:
+            collection: Collection name
+            event: Event document
+        
+        Returns:
+            False if an event was dropped because the queue was full
+        """
+        self._check_pid()
+        
+        with self._lock:
+            accepted = True
+            if len(self._queue) >= self.max_queue_size:
+                self.dropped += 1
+                if self.overflow_policy == OVERFLOW_DROP_NEW:
+                    return False
+                self._queue.popleft()
+                accepted = False
+            
+            self._queue.append((collection, event))
+            self.queued += 1
+            
+            if self._thread is None and not self._stopping:
+                self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.notify()
+            
+            return accepted
+    
+    def flush(self) -> int:
+        """
+        Write every queued event now, in the calling thread
+        
+        Returns:
+            Number of events written
+        """
+        self._check_pid()
+        
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+    
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the background thread and write what is left
+        
+        Args:
+            timeout: Seconds to wait for an in-progress write
+        """
+        self._check_pid()
+        with self._lock:
+            self._stopping = True
+            thread = self._thread
+            self._wakeup.notify()
+        
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+    
+    def stats(self) -> dict:
+        """Logging counters"""
+        self._check_pid()
+        with self._lock:
+            pending = len(self._queue)
+        return {
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "pending": pending,
+            "batches": self.batches,
+            "maxQueueSize": self.max_queue_size,
+            "overflowPolicy": self.overflow_policy
+        }
+    
+    def _run(self):
+        """Background loop: wait for a full batch or the flush interval"""
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                stopping = self._stopping
+            
+            self.flush()
+            if stopping:
+                return
+    
+    def _take(self, limit: int) -> List[Tuple[str, dict]]:
+        """Pop up to `limit` queued events"""
+        with self._lock:
+            count = min(limit, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+    
+    def _write(self, batch: List[Tuple[str, dict]]) -> int:
+        """Insert a batch, one unordered insert_many per collection"""
+        by_collection: Dict[str, List[dict]] = defaultdict(list)
+        for collection, event in batch:
+            by_collection[collection].append(event)
+        
+        written = 0
+        for collection, events in by_collection.items():
+            try:
+                self.get_db()[collection].insert_many(events, ordered=False)
+                inserted = len(events)
+            except BulkWriteError as e:
+                inserted = e.details.get("nInserted", 0)
+                logger.warning(f"Failed to log {len(events) - inserted} events to {collection}: {e}")
+            except Exception as e:
+                inserted = 0
+                logger.warning(f"Failed to log {len(events)} events to {collection}: {e}")
+            
+            with self._lock:
+                self.flushed += inserted
+                self.failed += len(events) - inserted
+                self.batches += 1
+            written += inserted
+        
+        return written
@@ -0,0 +1,157 @@
+"""
+File Processor
+Streams uploaded files to disk and analyzes stored files
+"""
+
+from fastapi import UploadFile
+from pathlib import Path
+from typing import Tuple
+import hashlib
+
+import aiofiles
+
+from app.services.keyword_index import TermCounter
+from app.services.minhash import MinHasher
+
+# Characters decoded per read when analyzing a stored file
+READ_CHUNK_CHARS = 256 * 1024
+
+# Characters str.splitlines() treats as line boundaries ('\r' excluded:
+# universal newlines mode never yields it)
+LINE_BOUNDARIES = '\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload grows past the allowed size"""
+
+
+async def save_upload(
+    file: UploadFile,
+    destination: Path,
+    max_size: int,
+    chunk_size: int
+) -> Tuple[int, str]:
+    """
+    Stream an upload to disk in fixed-size chunks
+    
+    The body is never held in memory as a whole: each chunk is hashed,
+    counted and written before the next one is read. A partially written
+    file is removed if the upload fails or crosses max_size.
+    
+    Args:
+        file: Uploaded file
+        destination: Path to write to
+        max_size: Maximum allowed size in bytes
+        chunk_size: Bytes read per iteration
+    
+    Returns:
+        (file_size, sha256_hex) tuple
+    
+    Raises:
+        FileTooLargeError: If the upload is larger than max_size
+    """
+    digest = hashlib.sha256()
+    file_size = 0
+    
+    try:
+        async with aiofiles.open(destination, 'wb') as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                
+                file_size += len(chunk)
+                if file_size > max_size:
+                    raise FileTooLargeError(f"Upload exceeds {max_size} bytes")
+                
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    
+    return file_size, digest.hexdigest()
+
+
+def analyze_file(
+    file_path: str,
+    preview_length: int = 500,
+    embedding_length: int = 2000,
+    minhash_permutations: int = 128
+) -> dict:
+    """
+    Compute the text metrics of a stored file in a single streaming pass
+    
+    The file is decoded and read READ_CHUNK_CHARS characters at a time, so
+    memory stays constant whatever the file size (apart from the distinct
+    terms). Counts are identical to reading the whole file and using
+    splitlines(), split(), len() and keyword_index.tokenize().
+    
+    Args:
+        file_path: Path to the stored file
+        preview_length: Number of characters kept as preview
+        embedding_length: Number of leading characters kept for embedding
+        minhash_permutations: Length of the MinHash signature
+    
+    Returns:
+        Dict with line_count, word_count, char_count, content_preview, the
+        text to embed (embedding_text), the keyword index statistics:
+        term_frequencies (Counter) and term_count, and the MinHash
+        signature of the terms (minhash, None for a file without terms)
+    
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+    
+    line_count = 0
+    word_count = 0
+    char_count = 0
+    head = []
+    head_length = 0
+    keep_length = max(preview_length, embedding_length)
+    last_char = ''
+    terms = TermCounter()
+    minhash = MinHasher(minhash_permutations)
+    
+    # Text mode with universal newlines: '\r' and '\r\n' arrive as '\n',
+    # and UTF-8 sequences split across reads are decoded correctly
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_CHARS)
+            if not chunk:
+                break
+            
+            char_count += len(chunk)
+            line_count += sum(chunk.count(boundary) for boundary in LINE_BOUNDARIES)
+            
+            # A word straddling the previous read was already counted
+            word_count += len(chunk.split())
+            if last_char and not last_char.isspace() and not chunk[0].isspace():
+                word_count -= 1
+            last_char = chunk[-1]
+            
+            minhash.update(terms.update(chunk))
+            
+            if head_length < keep_length:
+                head.append(chunk[:keep_length - head_length])
+                head_length += len(head[-1])
+    
+    # splitlines() also counts a final line without a trailing boundary
+    if last_char and last_char not in LINE_BOUNDARIES:
+        line_count += 1
+    
+    head_text = ''.join(head)
+    minhash.update(terms.finish())
+    
+    return {
+        'line_count': line_count,
+        'word_count': word_count,
+        'char_count': char_count,
+        'content_preview': head_text[:preview_length],
+        'embedding_text': head_text[:embedding_length],
+        'term_frequencies': terms.counts,
+        'term_count': terms.length,
+        'minhash': minhash.signature()
+    }
@@ -0,0 +1,253 @@
+"""
+Keyword Index Service
+Tokenization and BM25 scoring for keyword search
+
+Workers count the terms of each document while analyzing it and store
+one posting per (task, term) in task_terms, the inverted index. A query
+reads the postings of its terms only and scores them with BM25 in the
+database, using collection statistics (documents, average length) of the
+user.
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+import re
+import uuid
+
+from sqlalchemy import Float, Select, case, func, literal, select
+
+from app.models.task_term import TaskTerm
+
+# Longest term stored (task_terms.term is VARCHAR(64))
+MAX_TERM_LENGTH = 64
+
+# Rank offset of reciprocal rank fusion; 60 is the usual choice
+RRF_K = 60
+
+_TOKEN = re.compile(r"\w+")
+
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same she should so some such than
+that the their theirs them themselves then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms
+    
+    Words are lowercased; stop words, single characters and words longer
+    than MAX_TERM_LENGTH are dropped. Queries and documents use the same
+    rules, so there is no stemming on either side.
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        Terms in order of appearance
+    """
+    return [
+        token for token in _TOKEN.findall(text.lower())
+        if 1 < len(token) <= MAX_TERM_LENGTH and token not in STOP_WORDS
+    ]
+
+
+class TermCounter:
+    """
+    Term frequencies of a text read in pieces
+    
+    A word cut by a piece boundary is held back and joined with the start
+    of the next piece, so counts equal those of tokenize() on the whole text.
+    update() and finish() return the terms they counted, in order, for other
+    consumers of the term stream (MinHash shingles).
+    """
+    
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.length = 0
+        self._carry = ''
+    
+    def update(self, text: str) -> List[str]:
+        """
+        Count a piece of the text
+        
+        Returns:
+            Terms counted, in order (the held-back word is not among them)
+        """
+        text = self._carry + text
+        end = len(text)
+        while end and (text[end - 1].isalnum() or text[end - 1] == '_'):
+            end -= 1
+        self._carry = text[end:]
+        return self._add(text[:end])
+    
+    def finish(self) -> List[str]:
+        """
+        Count the held-back word
+        
+        Returns:
+            Its terms (counts and length are then complete)
+        """
+        terms = self._add(self._carry)
+        self._carry = ''
+        return terms
+    
+    def _add(self, text: str) -> List[str]:
+        terms = tokenize(text)
+        self.counts.update(terms)
+        self.length += len(terms)
+        return terms
+
+
+def document_frequencies_query(user_id: uuid.UUID, terms: Sequence[str]) -> Select:
+    """
+    Build the query counting a user's documents per term
+    
+    Returns:
+        SELECT of (term, df) rows for the terms that occur
+    """
+    return select(TaskTerm.term, func.count()).where(
+        TaskTerm.user_id == user_id,
+        TaskTerm.term.in_(terms)
+    ).group_by(TaskTerm.term)
+
+
+def inverse_document_frequency(df: int, documents: int) -> float:
+    """
+    BM25 idf, ln(1 + (N - df + 0.5) / (df + 0.5))
+    
+    Written as ln((N + 1) / (df + 0.5)), which stays defined when the
+    statistics lag the postings by a moment.
+    """
+    return math.log((documents + 1) / (df + 0.5))
+
+
+def bm25_query(
+    user_id: uuid.UUID,
+    idf: Dict[str, float],
+    average_length: float,
+    top_k: int,
+    k1: float = 1.2,
+    b: float = 0.75,
+    required: Optional[Sequence[str]] = None
+) -> Select:
+    """
+    Build the query ranking a user's documents by BM25
+    
+    Scoring runs in the database, next to the index: only the postings of
+    the query terms are read and only the top_k rows come back.
+    
+    Args:
+        user_id: Owner of the documents
+        idf: Inverse document frequency of each query term
+        average_length: Average document length in terms
+        top_k: Number of results to return
+        k1: Term frequency saturation
+        b: Document length normalization
+        required: If given, only documents containing one of these terms
+            are scored (see select_required_terms); the ranking is exact
+            only if pruned_ranking_is_exact holds for it
+    
+    Returns:
+        SELECT of (task_id, score) rows, best first
+    """
+    norm = 1 - b + b * TaskTerm.doc_length / literal(max(average_length, 1.0), Float)
+    weight = case(
+        {term: literal(value, Float) for term, value in idf.items()},
+        value=TaskTerm.term
+    )
+    postings = select(
+        TaskTerm.task_id,
+        (weight * TaskTerm.tf * (k1 + 1) / (TaskTerm.tf + k1 * norm)).label("weight")
+    ).where(
+        TaskTerm.user_id == user_id,
+        TaskTerm.term.in_(list(idf))
+    )
+    if required:
+        postings = postings.where(TaskTerm.task_id.in_(
+            select(TaskTerm.task_id).where(
+                TaskTerm.user_id == user_id,
+                TaskTerm.term.in_(required)
+            )
+        ))
+    postings = postings.subquery()
+    
+    score = func.sum(postings.c.weight).label("score")
+    return (
+        select(postings.c.task_id, score)
+        .group_by(postings.c.task_id)
+        .order_by(score.desc(), postings.c.task_id)
+        .limit(top_k)
+    )
+
+
+def select_required_terms(df: Dict[str, int], documents: int, common_ratio: float) -> Optional[List[str]]:
+    """
+    Pick the rare query terms a result must contain
+    
+    Postings of common terms are long and their idf is low. When a query
+    also has rarer terms, the ranking is first tried on documents
+    containing one of those, so the common terms' postings are only read
+    for them. A query of common terms only is scored in full.
+    
+    Args:
+        df: Document frequency of each query term
+        documents: Documents in the user's index
+        common_ratio: Terms in more than this share of documents are common
+    
+    Returns:
+        Rare terms to require, or None to score every matching document
+    """
+    rare = [term for term, count in df.items() if count <= common_ratio * documents]
+    if not rare or len(rare) == len(df):
+        return None
+    return rare
+
+
+def common_terms_bound(idf: Dict[str, float], required: Sequence[str], k1: float = 1.2) -> float:
+    """
+    Highest BM25 score of a document containing none of the required terms
+    
+    A term adds at most idf·(k1 + 1) to a score (its weight approaches
+    that as tf grows), so such a document scores below the sum of that
+    over the other query terms.
+    """
+    required = set(required)
+    return sum(max(value, 0.0) * (k1 + 1) for term, value in idf.items() if term not in required)
+
+
+def pruned_ranking_is_exact(ranked: Sequence[Tuple[str, float]], top_k: int, bound: float) -> bool:
+    """
+    Whether a ranking of the documents containing a required term is the
+    full BM25 ranking (MaxScore)
+    
+    It is when it has top_k results and the k-th score beats what any
+    other document can score (common_terms_bound). Otherwise the query
+    must be scored in full.
+    """
+    return len(ranked) >= top_k and ranked[top_k - 1][1] > bound
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[Tuple[str, float]]], top_k: int) -> List[Tuple[str, float]]:
+    """
+    Merge rankings by summing 1 / (RRF_K + rank) per document
+    
+    Only ranks are used, so BM25 and cosine scores need no normalization.
+    
+    Args:
+        rankings: Lists of (id, score) tuples, each best first
+        top_k: Number of results to return
+    
+    Returns:
+        List of (id, fused_score) tuples, best first
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (item_id, _) in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1 / (RRF_K + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
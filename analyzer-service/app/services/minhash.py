@@ -0,0 +1,174 @@
+"""
+MinHash Service
+MinHash signatures of documents and their LSH bands
+
+A document is reduced to the set of its shingles (runs of SHINGLE_SIZE
+consecutive index terms). Two signatures agree at a position with
+probability equal to the Jaccard similarity of the shingle sets, so the
+share of equal positions estimates it. Cutting signatures into bands
+(locality-sensitive hashing) finds the likely similar documents without
+comparing against all of them: documents sharing any whole band become
+candidates, and only candidates are compared.
+
+Signatures use one-permutation hashing: each shingle is hashed once, the
+top bits of the hash pick a bin and each bin keeps its minimum, instead of
+computing one hash per permutation and shingle. Bins no shingle fell into
+(short documents) borrow the value of the next non-empty bin, shifted by
+the distance, so all positions stay comparable.
+"""
+
+from typing import List, Optional, Sequence
+import hashlib
+import zlib
+
+import numpy as np
+
+# Index terms per shingle
+SHINGLE_SIZE = 3
+
+# Candidates verified per lookup, those sharing the most bands first
+MAX_CANDIDATES = 100
+
+_VALUE_BITS = 32
+_VALUE_MASK = np.uint64((1 << _VALUE_BITS) - 1)
+_EMPTY = np.uint64(1 << _VALUE_BITS)
+_COMBINE = np.uint64(0x100000001B3)
+
+
+class _TermHashes(dict):
+    """crc32 of each term, computed once per distinct term"""
+    
+    def __missing__(self, term: str) -> int:
+        value = self[term] = zlib.crc32(term.encode('utf-8'))
+        return value
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spread the bits of each hash (wrapping uint64)"""
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+class MinHasher:
+    """
+    MinHash signature of a document fed term by term
+    
+    Terms arrive in pieces (see keyword_index.TermCounter); the last
+    SHINGLE_SIZE - 1 terms are kept so shingles span piece boundaries.
+    Memory holds one minimum per bin and the hash of each distinct term.
+    """
+    
+    def __init__(self, permutations: int = 128, shingle_size: int = SHINGLE_SIZE):
+        if permutations < 2 or permutations & (permutations - 1):
+            raise ValueError("permutations must be a power of two")
+        self.permutations = permutations
+        self.shingle_size = shingle_size
+        self.shingles = 0
+        self._bin_shift = np.uint64(64 - (permutations.bit_length() - 1))
+        self._mins = np.full(permutations, _EMPTY, dtype=np.uint64)
+        self._tail = np.empty(0, dtype=np.uint64)
+        self._term_hashes = _TermHashes()
+    
+    def update(self, terms: Sequence[str]):
+        """Add the shingles ending in these terms"""
+        if not terms:
+            return
+        hashes = np.fromiter(map(self._term_hashes.__getitem__, terms), dtype=np.uint64, count=len(terms))
+        hashes = np.concatenate([self._tail, hashes])
+        self._tail = hashes[-(self.shingle_size - 1):] if self.shingle_size > 1 else hashes[:0]
+        
+        count = len(hashes) - self.shingle_size + 1
+        if count > 0:
+            shingles = hashes[:count].copy()
+            for offset in range(1, self.shingle_size):
+                shingles = shingles * _COMBINE + hashes[offset:offset + count]
+            self._add(_mix(shingles))
+    
+    def signature(self) -> Optional[np.ndarray]:
+        """
+        Finish the signature
+        
+        A document shorter than one shingle is hashed as a single shingle
+        of the terms it has.
+        
+        Returns:
+            uint64 array of `permutations` values, or None for a document
+            without terms
+        """
+        if not self.shingles:
+            if not len(self._tail):
+                return None
+            # Folded as a 1-element array: arrays wrap silently, scalars warn
+            shingle = self._tail[:1].copy()
+            for offset in range(1, len(self._tail)):
+                shingle = shingle * _COMBINE + self._tail[offset:offset + 1]
+            self._add(_mix(shingle))
+        
+        signature = self._mins.copy()
+        empty = np.flatnonzero(signature == _EMPTY)
+        if len(empty):
+            # Rotation densification: next non-empty bin, circularly
+            filled = np.flatnonzero(signature != _EMPTY)
+            source = filled[np.searchsorted(filled, empty) % len(filled)]
+            distance = ((source - empty) % self.permutations).astype(np.uint64)
+            signature[empty] = signature[source] + distance * _EMPTY
+        return signature
+    
+    def _add(self, shingles: np.ndarray):
+        # Minimum per bin: sort (bin, value) pairs and keep each bin's first
+        packed = np.sort(((shingles >> self._bin_shift) << np.uint64(_VALUE_BITS)) | (shingles & _VALUE_MASK))
+        bins = packed >> np.uint64(_VALUE_BITS)
+        first = np.flatnonzero(np.concatenate(([True], bins[1:] != bins[:-1])))
+        bins = bins[first].astype(np.intp)
+        self._mins[bins] = np.minimum(self._mins[bins], packed[first] & _VALUE_MASK)
+        self.shingles += len(shingles)
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    """Pack a signature for storage (little-endian uint64)"""
+    return signature.astype('<u8').tobytes()
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    """Unpack a stored signature"""
+    return np.frombuffer(data, dtype='<u8')
+
+
+def band_hashes(signature: np.ndarray, bands: int) -> List[str]:
+    """
+    Hash each band of a signature
+    
+    Args:
+        signature: MinHash signature
+        bands: Number of bands; must divide the signature length
+    
+    Returns:
+        One short hex digest per band
+    """
+    if len(signature) % bands:
+        raise ValueError("bands must divide the signature length")
+    return [
+        hashlib.blake2b(band.tobytes(), digest_size=8).hexdigest()
+        for band in np.split(signature.astype('<u8'), bands)
+    ]
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two documents' shingle sets"""
+    if len(a) != len(b):
+        return 0.0
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def candidate_probability(similarity: float, permutations: int, bands: int) -> float:
+    """
+    Probability that documents of a given Jaccard similarity share a band
+    
+    1 - (1 - s^r)^b with r = permutations / bands rows per band: the
+    recall of the LSH lookup at that similarity.
+    """
+    rows = permutations // bands
+    return 1 - (1 - similarity ** rows) ** bands
@@ -0,0 +1,103 @@
+"""
+Near-Duplicate Detection
+Blockwise all-pairs cosine similarity and clustering of the resulting pairs
+
+All pairs above a threshold are found by multiplying fixed-size blocks of
+the normalized embedding matrix, so memory stays at block_size² scores
+however many documents a user has; the N×N matrix is never built.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def similar_pairs(
+    vectors: np.ndarray,
+    threshold: float,
+    block_size: int = 2048,
+    queries: Optional[Sequence[int]] = None
+) -> Iterator[Tuple[int, int, float]]:
+    """
+    Find row pairs whose cosine similarity is at least `threshold`
+    
+    Args:
+        vectors: Row-normalized float32 matrix
+        threshold: Minimum cosine similarity
+        block_size: Rows per block; a block of scores is block_size² floats
+        queries: Only find pairs involving these rows (e.g. newly added
+            documents); all pairs if omitted
+    
+    Yields:
+        (i, j, score) with i != j, each pair once
+    """
+    count = len(vectors)
+    if count < 2:
+        return
+    
+    full = queries is None
+    queries = np.arange(count) if full else np.asarray(sorted(set(queries)), dtype=np.int64)
+    is_query = np.zeros(count, dtype=bool)
+    is_query[queries] = True
+    
+    for start in range(0, len(queries), block_size):
+        rows = queries[start:start + block_size]
+        block = vectors[rows]
+        for column_start in range(0, count, block_size):
+            if full and column_start + block_size <= rows[0]:
+                # Entirely below the diagonal: found from the other side
+                continue
+            scores = block @ vectors[column_start:column_start + block_size].T
+            hit_rows, hit_columns = np.nonzero(scores >= threshold)
+            if not len(hit_rows):
+                continue
+            
+            i = rows[hit_rows]
+            j = hit_columns + column_start
+            # Pairs of two query rows are reported by the lower row only
+            keep = (i != j) & (~is_query[j] | (j > i))
+            yield from zip(
+                i[keep].tolist(),
+                j[keep].tolist(),
+                scores[hit_rows[keep], hit_columns[keep]].tolist()
+            )
+
+
+def cluster_pairs(pairs: Iterable[Tuple[str, str, float]]) -> List[dict]:
+    """
+    Group pairs into connected components
+    
+    Args:
+        pairs: (id_a, id_b, score) tuples
+    
+    Returns:
+        Clusters, largest first: {"ids", "minScore", "maxScore"}
+    """
+    parent: Dict[str, str] = {}
+    
+    def find(node: str) -> str:
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+    
+    pairs = list(pairs)
+    for a, b, _ in pairs:
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+    
+    clusters: Dict[str, dict] = {}
+    for node in parent:
+        cluster = clusters.setdefault(find(node), {"ids": [], "minScore": 1.0, "maxScore": -1.0})
+        cluster["ids"].append(node)
+    for a, _, score in pairs:
+        cluster = clusters[find(a)]
+        cluster["minScore"] = min(cluster["minScore"], score)
+        cluster["maxScore"] = max(cluster["maxScore"], score)
+    
+    return sorted(clusters.values(), key=lambda cluster: (-len(cluster["ids"]), -cluster["maxScore"]))
@@ -0,0 +1,161 @@
+"""
+Query Encoder Service
+Embeds free-text search queries in the API process
+
+The API shares the process-wide EmbeddingService model, loaded once at
+startup (QUERY_ENCODER_PRELOAD) so no request pays for it. Encoding runs
+on one dedicated thread: the model already spreads a forward pass across
+cores, and the event loop stays free. Query vectors are kept in an LRU
+read from the event loop, and concurrent misses for the same query share
+one encode.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+import asyncio
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_service import EmbeddingService, embedding_service
+
+
+class QueryEncoder:
+    """
+    Cached, single-flight query embeddings on top of an EmbeddingService
+    
+    Used from the event loop only, except for the encode itself.
+    """
+    
+    def __init__(self, service: EmbeddingService, max_entries: int, max_length: int):
+        """
+        Args:
+            service: Service owning the model
+            max_entries: Query embeddings kept in memory (0 disables caching)
+            max_length: Characters of a query that are encoded
+        """
+        self.service = service
+        self.max_entries = max_entries
+        self.max_length = max_length
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-encoder")
+        
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.encodes = 0
+        self.encode_seconds = 0.0
+    
+    @property
+    def is_ready(self) -> bool:
+        """Whether the model is loaded, so queries encode without delay"""
+        return self.service.is_loaded
+    
+    def load_status(self) -> dict:
+        """Model load state, with the last error and retry delay after a failure"""
+        return self.service.load_status()
+    
+    def normalize(self, text: str) -> str:
+        """Query as encoded and cached: whitespace collapsed, truncated"""
+        return " ".join(text.split())[:self.max_length]
+    
+    async def warmup(self) -> float:
+        """
+        Load the model on the encoder thread
+        
+        If loading fails, a later encode retries it once the service's
+        backoff is over.
+        
+        Returns:
+            Seconds spent loading (0 if the model was already loaded)
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.service.warmup)
+    
+    async def encode(self, text: str) -> np.ndarray:
+        """
+        Get the embedding of a query
+        
+        Args:
+            text: Query text (normalized first)
+        
+        Returns:
+            float32 embedding vector
+        
+        Raises:
+            ValueError: If the query is empty
+            RuntimeError: If the model is not available
+        """
+        query = self.normalize(text)
+        if not query:
+            raise ValueError("Empty query")
+        
+        vector = self._entries.get(query)
+        if vector is not None:
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return vector
+        
+        future = self._in_flight.get(query)
+        if future is None:
+            self.misses += 1
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._encode, query)
+            self._in_flight[query] = future
+            future.add_done_callback(lambda done: self._finish(query, done))
+        else:
+            self.coalesced += 1
+        
+        # A cancelled request must not cancel the encode other requests await
+        return await asyncio.shield(future)
+    
+    def close(self):
+        """Stop the encoder thread, dropping queued encodes"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self) -> dict:
+        """Cache counters and encode latency"""
+        lookups = self.hits + self.misses
+        return {
+            "ready": self.is_ready,
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "encodes": self.encodes,
+            "avgEncodeMs": round(self.encode_seconds / self.encodes * 1000, 2) if self.encodes else None
+        }
+    
+    def _encode(self, query: str) -> np.ndarray:
+        """Encode on the encoder thread"""
+        start = time.perf_counter()
+        vector = self.service.encode_query(query)
+        self.encodes += 1
+        self.encode_seconds += time.perf_counter() - start
+        return vector
+    
+    def _finish(self, query: str, future: asyncio.Future):
+        """Cache a finished encode (failures are not cached)"""
+        del self._in_flight[query]
+        if future.cancelled() or future.exception() is not None:
+            return
+        if self.max_entries <= 0:
+            return
+        self._entries[query] = future.result()
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+# Global instance
+query_encoder = QueryEncoder(
+    embedding_service,
+    max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    max_length=settings.QUERY_MAX_LENGTH
+)
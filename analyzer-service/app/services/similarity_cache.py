@@ -0,0 +1,127 @@
+"""
+Similarity Cache Service
+Cached similarity search results with single-flight computation
+
+Results are kept per (user, task, search parameters) together with the
+user's embedding version they were computed at. Workers bump that version
+whenever a user's set of embeddings changes, so an entry from an older
+version is never served: it is recomputed on the next request. Concurrent
+identical searches that miss share one computation.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+
+from app.config import settings
+
+
+class _LeaderCancelled(Exception):
+    """The request computing a shared result was cancelled"""
+
+
+class SimilarityResultCache:
+    """
+    LRU of search results, validated against per-user embedding versions
+    
+    Used from the event loop only, so no locking is needed.
+    """
+    
+    def __init__(self, max_entries: int):
+        """
+        Args:
+            max_entries: Results kept in memory (0 disables caching, not coalescing)
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[Hashable, int], asyncio.Future] = {}
+        
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self.evictions = 0
+    
+    async def get_or_compute(self, key: Hashable, version: int, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a cached result, or compute it once for all concurrent callers
+        
+        Args:
+            key: Identifies the search (must include the user)
+            version: Current embedding version of the user
+            compute: Produces the result; exceptions reach every waiting caller
+        
+        Returns:
+            Result for `key` at `version`
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            # Computed before the user's embeddings changed
+            del self._entries[key]
+            self.invalidations += 1
+        self.misses += 1
+        
+        flight_key = (key, version)
+        while flight_key in self._in_flight:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(self._in_flight[flight_key])
+            except _LeaderCancelled:
+                # The caller computing it went away; take over
+                continue
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            self._store(key, version, result)
+            return result
+        finally:
+            del self._in_flight[flight_key]
+            if future.done():
+                # Mark a failure as retrieved even when nobody was waiting on it
+                future.exception()
+    
+    def stats(self) -> dict:
+        """Cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "coalesced": self.coalesced,
+            "inFlight": len(self._in_flight),
+            "evictions": self.evictions
+        }
+    
+    def _store(self, key: Hashable, version: int, result: Any):
+        if self.max_entries <= 0:
+            return
+        current = self._entries.get(key)
+        if current is not None and current[0] > version:
+            # A slower computation must not replace a newer result
+            return
+        self._entries[key] = (version, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+# Global instance
+similarity_cache = SimilarityResultCache(settings.SIMILARITY_CACHE_SIZE)
@@ -0,0 +1,198 @@
+"""
+Task Event Hub
+Fans task status transitions from Redis pub/sub out to streaming clients
+
+Workers and API processes publish every committed status change on its
+user's channel (task_events.publish_status_changes). Each API process
+holds a single pattern subscription to all of those channels, whatever
+the number of connected clients, and routes each message to the
+in-process subscribers of that user (optionally of one task).
+"""
+
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional, Set
+import asyncio
+import json
+import logging
+
+from app.config import settings
+from app.redis_client import TASK_EVENTS_PATTERN, create_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Queued to subscribers instead of an event
+RESYNC = "resync"  # the subscription was re-established: events may have been missed
+CLOSED = "closed"  # the hub is shutting down
+
+MAX_RECONNECT_BACKOFF = 30.0
+
+
+class Subscription:
+    """Events of one user (or one task) waiting to be streamed to a client"""
+    
+    def __init__(self, user_id: str, task_id: Optional[str], queue_size: int):
+        self.user_id = user_id
+        self.task_id = task_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    
+    def get(self):
+        """Wait for the next event dict, RESYNC or CLOSED"""
+        return self.queue.get()
+
+
+class TaskEventHub:
+    """
+    One Redis pattern subscription per process, shared by every client
+    
+    The subscription is opened with the first subscriber and kept open; it
+    is re-established with a growing delay if Redis drops it, after which
+    every subscriber receives RESYNC. A subscriber that falls behind loses
+    its oldest queued events rather than slowing the others down.
+    """
+    
+    def __init__(self, connect: Callable, pattern: str, queue_size: int = 100):
+        """
+        Args:
+            connect: Returns a new asyncio Redis client
+            pattern: Channel pattern to subscribe to
+            queue_size: Events buffered per subscriber
+        """
+        self.connect = connect
+        self.pattern = pattern
+        self.queue_size = queue_size
+        
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._reader: Optional[asyncio.Task] = None
+        self._listening = asyncio.Event()
+        
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.reconnects = 0
+    
+    @asynccontextmanager
+    async def subscribe(self, user_id: str, task_id: Optional[str] = None, timeout: float = 5.0):
+        """
+        Receive the events of a user's tasks, or of one of them
+        
+        Waits until the shared subscription is active (up to `timeout`), so
+        a status read after entering the block cannot miss a later event.
+        
+        Args:
+            user_id: User whose events to receive
+            task_id: Only receive the events of this task
+            timeout: Seconds to wait for the Redis subscription
+        
+        Yields:
+            Subscription to read events from
+        """
+        subscription = Subscription(user_id, task_id, self.queue_size)
+        self._subscribers[user_id].add(subscription)
+        try:
+            self._ensure_reader()
+            try:
+                await asyncio.wait_for(self._listening.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Task event subscription not ready, events may be late")
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[user_id]
+    
+    async def close(self):
+        """Stop the subscription and end every subscriber's stream"""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                self._put(subscription, CLOSED)
+    
+    def stats(self) -> dict:
+        """Subscription counters"""
+        return {
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "listening": self._listening.is_set(),
+            "received": self.received,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects
+        }
+    
+    def _ensure_reader(self):
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.get_running_loop().create_task(self._run())
+    
+    async def _run(self):
+        """Keep the pattern subscription open and dispatch its messages"""
+        backoff = 0.0
+        first = True
+        while True:
+            client = self.connect()
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(self.pattern)
+                self._listening.set()
+                backoff = 0.0
+                if not first:
+                    self.reconnects += 1
+                    self._broadcast(RESYNC)
+                first = False
+                
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Task event subscription lost: {e}")
+            finally:
+                self._listening.clear()
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+            
+            backoff = min(MAX_RECONNECT_BACKOFF, max(1.0, backoff * 2))
+            await asyncio.sleep(backoff)
+    
+    def _dispatch(self, data: str):
+        """Hand a published message to the subscribers it concerns"""
+        self.received += 1
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return
+        
+        for subscription in self._subscribers.get(event.get("userId"), ()):
+            if subscription.task_id is None or subscription.task_id == event.get("taskId"):
+                self._put(subscription, event)
+                self.delivered += 1
+    
+    def _broadcast(self, item):
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                self._put(subscription, item)
+    
+    def _put(self, subscription: Subscription, item):
+        """Queue an item, evicting the oldest one if the subscriber is behind"""
+        if subscription.queue.full():
+            subscription.queue.get_nowait()
+            self.dropped += 1
+        subscription.queue.put_nowait(item)
+
+
+task_event_hub = TaskEventHub(
+    connect=create_async_redis,
+    pattern=TASK_EVENTS_PATTERN,
+    queue_size=settings.TASK_EVENTS_QUEUE_SIZE
+)
@@ -0,0 +1,193 @@
+"""
+Task Events
+Session hooks that report task status transitions after each commit
+
+Every status change goes through the ORM, whether from an upload, a
+deduplicated clone or a worker. Instead of updating derived state at each
+of those call sites, the changes are collected when the session flushes
+and handed to the registered handlers once the transaction commits. A
+rolled-back transaction reports nothing.
+
+Handlers make Redis round-trips. Commits of an AsyncSession run on the
+event loop, so their changes are handed to one dispatcher thread instead
+of blocking every request on Redis; sync sessions (workers) run the
+handlers inline.
+
+Entry points import this module once (app.main, app.workers.file_worker)
+to install the hooks.
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import asyncio
+import json
+from typing import Callable, List, NamedTuple, Optional
+import logging
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.task import Task
+from app.redis_client import (
+    increment_task_counts, set_task_statuses, publish_task_events,
+    claim_duplicate_updates, enqueue_task, FIND_NEAR_DUPLICATES_FUNC
+)
+from app.services.task_service import task_status_fields
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "task_status_changes"
+
+
+class StatusChange(NamedTuple):
+    """A task entering, leaving or changing status"""
+    task_id: str
+    user_id: str
+    old_status: Optional[str]  # None for a new task
+    new_status: Optional[str]  # None for a deleted task
+    # Timestamps as flushed with the change (None when unset or not loaded)
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+def _status_change(task: Task, old_status: Optional[str], new_status: Optional[str]) -> StatusChange:
+    # Read the instance dict directly: nothing may be loaded during a flush
+    state = inspect(task).dict
+    return StatusChange(
+        str(task.id), str(task.user_id), old_status, new_status,
+        state.get("created_at"), state.get("started_at"), state.get("completed_at")
+    )
+
+
+_handlers: List[Callable[[List[StatusChange]], None]] = []
+
+
+def on_status_change(handler: Callable[[List[StatusChange]], None]):
+    """
+    Register a handler called with the status changes of each commit
+    
+    Handlers run after the commit, in the committing thread or, for
+    commits made on an event loop, in the dispatcher thread; exceptions are
+    logged and do not affect the transaction or the other handlers.
+    """
+    _handlers.append(handler)
+    return handler
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_status_changes(session: Session, flush_context):
+    """Record status transitions while attribute history is still available"""
+    changes = session.info.setdefault(_PENDING_KEY, [])
+    
+    for obj in session.new:
+        if isinstance(obj, Task):
+            changes.append(_status_change(obj, None, obj.status))
+    
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            history = inspect(obj).attrs.status.history
+            if history.has_changes():
+                old = history.deleted[0] if history.deleted else None
+                changes.append(_status_change(obj, old, obj.status))
+    
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            changes.append(_status_change(obj, obj.status, None))
+
+
+# One thread, so the changes of successive commits are handled in order
+_dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-events")
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_status_changes(session: Session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        _run_handlers(changes)
+        return
+    # An AsyncSession commit: keep the handlers' Redis calls off the loop
+    _dispatcher.submit(_run_handlers, changes)
+
+
+def _run_handlers(changes: List[StatusChange]):
+    for handler in _handlers:
+        try:
+            handler(changes)
+        except Exception as e:
+            logger.error(f"Task status handler {handler.__name__} failed: {e}")
+
+
+def close():
+    """Wait for the handlers of commits already made (call at shutdown)"""
+    _dispatcher.shutdown(wait=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_status_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@on_status_change
+def update_task_counts(changes: List[StatusChange]):
+    """Keep the per-user counters in Redis in step with PostgreSQL"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for change in changes:
+        counts = deltas[change.user_id]
+        if change.old_status is None:
+            counts["total"] += 1
+        else:
+            counts[change.old_status] -= 1
+        if change.new_status is None:
+            counts["total"] -= 1
+        else:
+            counts[change.new_status] += 1
+    increment_task_counts(deltas)
+
+
+@on_status_change
+def update_status_cache(changes: List[StatusChange]):
+    """Write each task's latest status and timestamps to its Redis hash"""
+    set_task_statuses({
+        change.task_id: None if change.new_status is None else task_status_fields(
+            change.user_id, change.new_status,
+            change.created_at, change.started_at, change.completed_at
+        )
+        for change in changes
+    })
+
+
+@on_status_change
+def publish_status_changes(changes: List[StatusChange]):
+    """Announce each transition on its user's pub/sub channel"""
+    publish_task_events([
+        (change.user_id, json.dumps(task_event_message(change)))
+        for change in changes
+    ])
+
+
+def task_event_message(change: StatusChange) -> dict:
+    """
+    Pub/sub message of a transition
+    
+    `status` is None when the task was deleted.
+    """
+    message = task_status_fields(
+        change.user_id, change.new_status,
+        change.created_at, change.started_at, change.completed_at
+    )
+    message.update(taskId=change.task_id, previousStatus=change.old_status)
+    return message
+
+
+@on_status_change
+def schedule_duplicate_updates(changes: List[StatusChange]):
+    """Queue a near-duplicate update for users with a scan and new completed tasks"""
+    users = {change.user_id for change in changes if change.new_status == "completed"}
+    for user_id in claim_duplicate_updates(users):
+        enqueue_task(FIND_NEAR_DUPLICATES_FUNC, user_id, user_id=user_id)
@@ -0,0 +1,313 @@
+"""
+Task Service
+Shared task operations used by the routes and the worker
+"""
+
+from sqlalchemy import select, func, insert, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import base64
+import uuid
+
+from app.config import settings
+from app.models.task import Task
+from app.models.task_term import TaskTerm
+from app.redis_client import (
+    get_task_counts, init_task_counts, get_task_statuses, fill_task_statuses, add_minhash_signatures
+)
+from app.services.minhash import band_hashes, signature_from_bytes
+
+TASK_STATUSES = ("queued", "processing", "completed", "failed")
+
+
+async def find_completed_by_hash(db: AsyncSession, user_id: uuid.UUID, content_hash: str) -> Optional[Task]:
+    """
+    Find a completed task of a user whose file had the given content hash
+    
+    Only the uploader's own tasks are considered: reusing another user's
+    task would reveal that they uploaded the same file.
+    
+    Args:
+        db: Async database session
+        user_id: Uploading user
+        content_hash: SHA-256 hex digest of the file content
+    
+    Returns:
+        Most recently completed matching task, or None
+    """
+    return await db.scalar(
+        select(Task).where(
+            Task.user_id == user_id,
+            Task.content_hash == content_hash,
+            Task.status == "completed"
+        ).order_by(Task.completed_at.desc()).limit(1)
+    )
+
+
+async def find_completed_by_hashes(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    content_hashes: Iterable[str]
+) -> Dict[str, Task]:
+    """
+    Find a user's completed tasks for many content hashes in one query
+    
+    The database picks the most recently completed task per hash (a
+    row_number window), so only one row per hash is loaded however many
+    copies of a file the user has.
+    
+    Args:
+        db: Async database session
+        user_id: Uploading user (other users' tasks are never matched)
+        content_hashes: SHA-256 hex digests
+    
+    Returns:
+        Most recently completed matching task per hash; hashes without a
+        match are left out
+    """
+    content_hashes = list(set(content_hashes))
+    if not content_hashes:
+        return {}
+    
+    ranked = select(
+        Task.id,
+        func.row_number().over(
+            partition_by=Task.content_hash,
+            order_by=(Task.completed_at.desc(), Task.id.desc())
+        ).label("position")
+    ).where(
+        Task.user_id == user_id,
+        Task.content_hash.in_(content_hashes),
+        Task.status == "completed"
+    ).subquery()
+    
+    tasks = (await db.scalars(
+        select(Task).join(ranked, Task.id == ranked.c.id).where(ranked.c.position == 1)
+    )).all()
+    return {task.content_hash: task for task in tasks}
+
+
+def clone_completed_task(
+    original: Task,
+    task_id: uuid.UUID,
+    user_id: uuid.UUID,
+    filename: str,
+    file_size: int
+) -> Task:
+    """
+    Build a completed task that reuses the analysis of an identical file
+    
+    The new task points at the original stored file and copies its result,
+    embedding, preview, term count and MinHash signature, so no job is
+    enqueued and no model is loaded. Its keyword postings are copied by
+    copy_task_terms, its LSH entries added by index_minhash_signatures.
+    
+    Args:
+        original: Completed task with the same content hash
+        task_id: ID of the new task
+        user_id: Owner of the new task
+        filename: Uploaded filename
+        file_size: Uploaded size in bytes
+    
+    Returns:
+        New (unsaved) Task
+    """
+    now = datetime.utcnow()
+    result = dict(original.result or {})
+    result['deduplicatedFrom'] = str(original.id)
+    result['analyzedAt'] = now.isoformat()
+    
+    task = Task(
+        id=task_id,
+        user_id=user_id,
+        filename=filename,
+        file_path=original.file_path,
+        file_size=file_size,
+        content_hash=original.content_hash,
+        status="completed",
+        result=result,
+        content_preview=original.content_preview,
+        term_count=original.term_count,
+        minhash_signature=original.minhash_signature,
+        started_at=now,
+        completed_at=now
+    )
+    task.copy_embedding_from(original)
+    return task
+
+
+async def copy_task_terms(db: AsyncSession, original_id: uuid.UUID, task: Task):
+    """
+    Index a cloned task under the keyword postings of its original
+    
+    The copy runs in the database (INSERT ... SELECT). The session is
+    flushed first so the new task row exists.
+    
+    Args:
+        db: Async database session
+        original_id: Task the clone was made from
+        task: Clone built by clone_completed_task
+    """
+    if task.term_count is None:
+        return
+    await db.flush()
+    await db.execute(
+        insert(TaskTerm).from_select(
+            ["task_id", "user_id", "term", "tf", "doc_length"],
+            select(
+                literal(task.id, TaskTerm.task_id.type),
+                literal(task.user_id, TaskTerm.user_id.type),
+                TaskTerm.term, TaskTerm.tf, TaskTerm.doc_length
+            ).where(TaskTerm.task_id == original_id)
+        )
+    )
+
+
+def index_minhash_signatures(tasks: Iterable[Task]):
+    """
+    Add tasks to the LSH band index of their users
+    
+    Call after the commit, so a task only becomes a near-duplicate
+    candidate once its signature can be read from PostgreSQL.
+    
+    Args:
+        tasks: Tasks; those without a MinHash signature are skipped
+    """
+    entries = [
+        (
+            str(task.user_id),
+            str(task.id),
+            band_hashes(signature_from_bytes(task.minhash_signature), settings.MINHASH_BANDS)
+        )
+        for task in tasks
+        if task.minhash_signature is not None
+    ]
+    if entries:
+        add_minhash_signatures(entries)
+
+
+def task_status_fields(
+    user_id,
+    status: Optional[str],
+    created_at: Optional[datetime],
+    started_at: Optional[datetime],
+    completed_at: Optional[datetime]
+) -> Dict[str, str]:
+    """
+    Status cache entry of a task
+    
+    Returns:
+        userId, status and the ISO timestamps that are set
+    """
+    fields = {"userId": str(user_id), "status": status}
+    for name, value in (("createdAt", created_at), ("startedAt", started_at), ("completedAt", completed_at)):
+        if value is not None:
+            fields[name] = value.isoformat()
+    return fields
+
+
+async def get_task_status_entries(db: AsyncSession, task_uuids: List[uuid.UUID]) -> Dict[str, Dict[str, str]]:
+    """
+    Status cache entries of many tasks
+    
+    Entries come from Redis; tasks missing there are read with one IN
+    query and cached without overwriting newer transitions.
+    
+    Args:
+        db: Async database session
+        task_uuids: Task UUIDs
+    
+    Returns:
+        Mapping of task ID to task_status_fields() for the tasks that
+        exist; callers check userId for authorization
+    """
+    entries = {
+        task_id: entry
+        for task_id, entry in get_task_statuses([str(task_uuid) for task_uuid in task_uuids]).items()
+        # Entries only written by a transition miss their creation time
+        if "createdAt" in entry
+    }
+    
+    misses = [task_uuid for task_uuid in task_uuids if str(task_uuid) not in entries]
+    if misses:
+        rows = (await db.execute(
+            select(
+                Task.id, Task.user_id, Task.status, Task.created_at, Task.started_at, Task.completed_at
+            ).where(Task.id.in_(misses))
+        )).all()
+        loaded = {
+            str(row.id): task_status_fields(
+                row.user_id, row.status, row.created_at, row.started_at, row.completed_at
+            )
+            for row in rows
+        }
+        fill_task_statuses(loaded)
+        entries.update(loaded)
+    
+    return entries
+
+
+def encode_cursor(task: Task) -> str:
+    """
+    Opaque pagination cursor pointing just after a task
+    
+    Args:
+        task: Last task (or row with created_at and id) of the current page
+    
+    Returns:
+        URL-safe cursor token
+    """
+    raw = f"{task.created_at.isoformat()}|{task.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor from encode_cursor
+    
+    Args:
+        cursor: Cursor token
+    
+    Returns:
+        (created_at, task_id) of the last task of the previous page
+    
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode('utf-8')
+        created_at, task_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(task_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def count_user_tasks(db: AsyncSession, user_uuid: uuid.UUID) -> dict:
+    """
+    Get a user's task totals
+    
+    Counts are served from the Redis counters that app.services.task_events
+    keeps up to date. When they are not cached they are rebuilt with one
+    GROUP BY query and cached for the next requests.
+    
+    Args:
+        db: Async database session
+        user_uuid: User UUID
+    
+    Returns:
+        Mapping with "total" and one count per status
+    """
+    counts = get_task_counts(str(user_uuid))
+    
+    if counts is None:
+        rows = (await db.execute(
+            select(Task.status, func.count()).where(
+                Task.user_id == user_uuid
+            ).group_by(Task.status)
+        )).all()
+        counts = {status: count for status, count in rows}
+        counts["total"] = sum(counts.values())
+        init_task_counts(str(user_uuid), {**{status: 0 for status in TASK_STATUSES}, **counts})
+    
+    return {"total": counts.get("total", 0), **{status: counts.get(status, 0) for status in TASK_STATUSES}}
@@ -0,0 +1,185 @@
+"""
+Vector Search
+Batched cosine-similarity scoring over stacked float32 embedding matrices
+"""
+
+import numpy as np
+from typing import List, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# float32 scores are within ~1e-6 of the float64 ones; rows this close to the
+# top-k cut-off are re-scored exactly before ranking
+RESCORE_MARGIN = 1e-5
+
+
+def stack_embeddings(embeddings: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack embeddings into a single row-normalized float32 matrix
+    
+    Args:
+        embeddings: Sequence of equally sized embedding vectors
+    
+    Returns:
+        (matrix, valid) tuple. `valid` is a boolean mask of rows with a
+        non-zero norm; zero rows are kept as zeros in the matrix.
+    """
+    matrix = np.array(embeddings, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(embeddings), -1)
+    return normalize_rows(matrix)
+
+
+def normalize_rows(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    L2-normalize the rows of a float32 matrix in place
+    
+    Args:
+        matrix: 2D float32 array
+    
+    Returns:
+        (matrix, valid) tuple, see stack_embeddings
+    """
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = norms > 0
+    matrix[valid] /= norms[valid, None]
+    return matrix, valid
+
+
+def cosine_scores(query: Sequence[float], matrix: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Score every row of a normalized matrix against a query
+    
+    Args:
+        query: Query embedding vector
+        matrix: Row-normalized float32 matrix from stack_embeddings
+        valid: Mask of non-zero rows from stack_embeddings
+    
+    Returns:
+        float32 array of similarities scaled to 0-1 as (cos + 1) / 2.
+        Rows with a zero norm (or a zero query) score 0.0, matching
+        EmbeddingService.calculate_similarity.
+    """
+    query_vec = np.asarray(query, dtype=np.float32)
+    query_norm = np.linalg.norm(query_vec)
+    
+    scores = np.zeros(matrix.shape[0], dtype=np.float32)
+    if query_norm == 0:
+        return scores
+    
+    cos = matrix @ (query_vec / query_norm)
+    scores[valid] = (cos[valid] + 1) / 2
+    return scores
+
+
+def exact_scores(query: Sequence[float], embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Score a few embeddings in float64 with the per-pair formula
+    
+    Each row is scored on its own with np.dot, exactly as
+    EmbeddingService.calculate_similarity does: a batched product can give
+    bit-identical vectors scores differing in the last bit, which would
+    reorder ties that the per-pair loop breaks by position.
+    
+    Args:
+        query: Query embedding vector
+        embeddings: Embedding vectors to score
+    
+    Returns:
+        float64 array of (cos + 1) / 2 scores, 0.0 for zero-norm vectors
+    """
+    query_vec = np.asarray(query, dtype=np.float64)
+    query_norm = np.linalg.norm(query_vec)
+    
+    scores = np.zeros(len(embeddings), dtype=np.float64)
+    for i, embedding in enumerate(embeddings):
+        vec = np.asarray(embedding, dtype=np.float64)
+        norm = np.linalg.norm(vec)
+        if norm == 0 or query_norm == 0:
+            continue
+        scores[i] = (np.dot(vec, query_vec) / (norm * query_norm) + 1) / 2
+    return scores
+
+
+def candidate_pool(scores: np.ndarray, top_k: int, margin: float = 0.0) -> np.ndarray:
+    """
+    Indices of every score that can make the top_k, in position order
+    
+    Uses argpartition to find the k-th best score without sorting the whole
+    array, then keeps every row within `margin` of it so rows tied at the
+    cut-off are all considered.
+    
+    Args:
+        scores: 1D array of scores
+        top_k: Number of results wanted
+        margin: Extra slack below the k-th best score
+    
+    Returns:
+        Array of at least min(top_k, len(scores)) indices
+    """
+    n = scores.shape[0]
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if top_k >= n:
+        return np.arange(n)
+    
+    kth_value = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+    return np.flatnonzero(scores >= kth_value - margin)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first
+    
+    Ties are broken by position so the result is identical to a stable
+    descending sort.
+    
+    Args:
+        scores: 1D array of scores
+        top_k: Number of indices to return
+    
+    Returns:
+        Array of at most top_k indices
+    """
+    candidates = candidate_pool(scores, top_k)
+    # lexsort uses the last key as primary: score descending, then position
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:top_k]]
+
+
+def find_top_k(
+    query_embedding: Sequence[float],
+    candidate_embeddings: List[tuple],
+    top_k: int = 5
+) -> List[tuple]:
+    """
+    Find the candidates most similar to a query in one batched pass
+    
+    All candidates are scored with a single float32 matrix-vector product.
+    The handful of rows that can make the top_k are then re-scored in
+    float64, so rankings and scores match the per-pair calculation even for
+    near-ties that float32 cannot separate.
+    
+    Args:
+        query_embedding: Query embedding vector
+        candidate_embeddings: List of (id, embedding) tuples
+        top_k: Number of top results to return
+    
+    Returns:
+        List of (id, similarity_score) tuples, sorted by similarity
+    """
+    if not candidate_embeddings or top_k <= 0:
+        return []
+    
+    try:
+        matrix, valid = stack_embeddings([embedding for _, embedding in candidate_embeddings])
+        pool = candidate_pool(cosine_scores(query_embedding, matrix, valid), top_k, margin=RESCORE_MARGIN)
+        scores = exact_scores(query_embedding, [candidate_embeddings[i][1] for i in pool])
+    except Exception as e:
+        logger.error(f"Error scoring candidate embeddings: {e}")
+        pool = np.arange(min(top_k, len(candidate_embeddings)))
+        scores = np.zeros(len(pool), dtype=np.float64)
+    
+    order = np.lexsort((pool, -scores))[:top_k]
+    return [(candidate_embeddings[pool[i]][0], float(scores[i])) for i in order]
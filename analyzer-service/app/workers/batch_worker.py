@@ -0,0 +1,132 @@
+"""
+Batch Worker
+RQ worker that drains several file jobs and processes them together
+"""
+
+import time
+import traceback
+from typing import List, Optional, Tuple
+
+from rq import Queue
+from rq.job import Job
+from rq.timeouts import JobTimeoutException
+from rq.utils import utcnow
+from rq.worker import SimpleWorker, WorkerStatus
+
+from app.redis_client import PROCESS_FILE_FUNC, release_jobs
+from app.workers.file_worker import process_files_batch
+from app.workers.fair_share import FairShareMixin
+from app.workers.lanes import WeightedLanesMixin
+
+# Delay between queue polls while filling a batch
+POLL_INTERVAL = 0.01
+
+
+class BatchWorker(FairShareMixin, WeightedLanesMixin, SimpleWorker):
+    """
+    Worker that embeds many files per model call
+    
+    After blocking for the first job like a regular worker, it keeps popping
+    jobs until it has `batch_size` of them or `batch_wait_ms` has passed,
+    then runs all file_processing jobs through process_files_batch. Each job
+    still gets its own started/finished/failed bookkeeping in RQ.
+    
+    Jobs of PROCESS_FILE_FUNC are batched, anything else runs on its own.
+    Jobs run in the worker process (no fork per job), so the embedding model
+    is loaded once and stays warm across batches. Every pop, including
+    those filling a batch, follows the weighted lane order, and held
+    fair-share jobs are released while the batch fills.
+    """
+    
+    def __init__(self, *args, batch_size: int = 16, batch_wait_ms: int = 200, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self._batch: List[Tuple[Job, Queue]] = []
+    
+    def dequeue_job_and_maintain_ttl(self, timeout: Optional[int], max_idle_time: Optional[int] = None):
+        """Dequeue the first job as usual, then fill the batch"""
+        result = super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+        self._batch = [result] + self._drain() if result else []
+        return result
+    
+    def execute_job(self, job: Job, queue: Queue):
+        """Execute the whole pending batch in this process"""
+        batch, self._batch = self._batch or [(job, queue)], []
+        
+        self.set_state(WorkerStatus.BUSY)
+        try:
+            self.perform_batch(batch)
+        finally:
+            self.set_state(WorkerStatus.IDLE)
+    
+    def perform_batch(self, batch: List[Tuple[Job, Queue]]):
+        """
+        Perform a batch of jobs
+        
+        Args:
+            batch: (job, queue) tuples
+        """
+        file_jobs = []
+        for job, queue in batch:
+            if job.func_name == PROCESS_FILE_FUNC and len(job.args) == 2 and not job.kwargs:
+                file_jobs.append((job, queue))
+            else:
+                self.perform_job(job, queue)
+        
+        if not file_jobs:
+            return
+        
+        remove_from_intermediate_queue = len(self.queues) == 1
+        for job, _ in file_jobs:
+            self.prepare_job_execution(job, remove_from_intermediate_queue)
+            job.started_at = utcnow()
+        
+        timeout = max(job.timeout or self.queue_class.DEFAULT_TIMEOUT for job, _ in file_jobs)
+        try:
+            with self.death_penalty_class(timeout, JobTimeoutException, job_id=file_jobs[0][0].id):
+                errors = process_files_batch([tuple(job.args) for job, _ in file_jobs])
+        except Exception:
+            exc_string = traceback.format_exc()
+            errors = {job.args[0]: exc_string for job, _ in file_jobs}
+        
+        for job, queue in file_jobs:
+            job.ended_at = utcnow()
+            error = errors.get(job.args[0], "Task missing from batch result")
+            if error is None:
+                job._result = None
+                self.handle_job_success(job=job, queue=queue, started_job_registry=queue.started_job_registry)
+                self.log.info('%s: Job OK (%s)', queue.name, job.id)
+            else:
+                self.handle_job_failure(
+                    job=job, queue=queue, started_job_registry=queue.started_job_registry, exc_string=error
+                )
+    
+    def _drain(self) -> List[Tuple[Job, Queue]]:
+        """Pop up to batch_size - 1 more jobs, waiting at most batch_wait_ms"""
+        extra = []
+        deadline = time.monotonic() + self.batch_wait_ms / 1000
+        
+        while len(extra) + 1 < self.batch_size:
+            result = self.queue_class.dequeue_any(
+                self._ordered_queues,
+                None,
+                connection=self.connection,
+                job_class=self.job_class,
+                serializer=self.serializer,
+                death_penalty_class=self.death_penalty_class,
+            )
+            if result is not None:
+                self.reorder_queues(reference_queue=result[1])
+                extra.append(result)
+                continue
+            if release_jobs():
+                continue
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(POLL_INTERVAL, remaining))
+        
+        self.record_waits(extra)
+        return extra
@@ -0,0 +1,135 @@
+"""
+Near-Duplicate Worker
+Finds a user's pairs of near-identical documents and stores them
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+import uuid
+
+from sqlalchemy import delete, func, insert, or_, select
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.near_duplicate import NearDuplicatePair
+from app.models.task import Task
+from app.redis_client import get_duplicate_scan, set_duplicate_scan, release_duplicate_update
+from app.services.embedding_codec import decode_embedding, decode_embeddings
+from app.services.near_duplicates import similar_pairs
+from app.services.vector_search import normalize_rows
+
+# Tasks completed this long before the watermark are compared again on an
+# incremental update, covering workers that commit out of completion order
+UPDATE_SLACK = timedelta(minutes=5)
+
+# Rows per insert/delete statement
+WRITE_BATCH_SIZE = 1000
+
+
+def find_near_duplicates(user_id: str, full: bool = False, threshold: Optional[float] = None) -> dict:
+    """
+    Find and store the near-duplicate pairs of a user's documents
+    
+    A full scan compares every pair of the user's embeddings. Afterwards,
+    updates only compare the documents completed since the last run against
+    the whole corpus; pairs of deleted tasks go away with their rows.
+    
+    Args:
+        user_id: User whose documents to scan
+        full: Rescan everything instead of updating incrementally
+        threshold: Minimum cosine similarity (default: that of the last scan,
+            else NEAR_DUPLICATE_THRESHOLD); changing it forces a full scan
+    
+    Returns:
+        Scan state written to Redis
+    """
+    # Completions from now on must schedule another update
+    release_duplicate_update(user_id)
+    
+    state = get_duplicate_scan(user_id) or {}
+    last_threshold = float(state["threshold"]) if "threshold" in state else None
+    threshold = threshold or last_threshold or settings.NEAR_DUPLICATE_THRESHOLD
+    watermark = datetime.fromisoformat(state["watermark"]) if state.get("watermark") else None
+    full = full or watermark is None or threshold != last_threshold
+    
+    set_duplicate_scan(user_id, {"status": "running", "threshold": threshold})
+    started = time.perf_counter()
+    user_uuid = uuid.UUID(user_id)
+    db = SessionLocal()
+    
+    try:
+        rows = db.execute(
+            select(
+                Task.id, Task.embedding_data, Task.embedding_format, Task.embedding_scale, Task.completed_at
+            ).where(
+                Task.user_id == user_uuid,
+                Task.status == "completed",
+                Task.embedding_data.isnot(None)
+            )
+        ).all()
+        
+        ids = [row.id for row in rows]
+        if full:
+            queries = None
+            db.execute(delete(NearDuplicatePair).where(NearDuplicatePair.user_id == user_uuid))
+        else:
+            since = watermark - UPDATE_SLACK
+            queries = [i for i, row in enumerate(rows) if row.completed_at and row.completed_at >= since]
+            # Pairs of re-checked documents are found again below
+            changed = [ids[i] for i in queries]
+            for start in range(0, len(changed), WRITE_BATCH_SIZE):
+                batch = changed[start:start + WRITE_BATCH_SIZE]
+                db.execute(delete(NearDuplicatePair).where(or_(
+                    NearDuplicatePair.task_id_a.in_(batch),
+                    NearDuplicatePair.task_id_b.in_(batch)
+                )))
+        
+        found = 0
+        if rows and (full or queries):
+            packed = [(row.embedding_data, row.embedding_format, row.embedding_scale) for row in rows]
+            vectors, _ = normalize_rows(decode_embeddings(packed, len(decode_embedding(*packed[0]))))
+            batch = []
+            for i, j, score in similar_pairs(vectors, threshold, settings.NEAR_DUPLICATE_BLOCK_SIZE, queries):
+                batch.append({"task_id_a": ids[i], "task_id_b": ids[j], "user_id": user_uuid, "score": score})
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    db.execute(insert(NearDuplicatePair), batch)
+                    found += len(batch)
+                    batch = []
+            if batch:
+                db.execute(insert(NearDuplicatePair), batch)
+                found += len(batch)
+        
+        db.commit()
+        total = db.scalar(
+            select(func.count()).select_from(NearDuplicatePair).where(NearDuplicatePair.user_id == user_uuid)
+        )
+        
+        completed = [row.completed_at for row in rows if row.completed_at]
+        new_watermark = max(completed + ([watermark] if watermark else [])) if completed else watermark
+        
+        scan = {
+            "status": "ready",
+            "mode": "full" if full else "incremental",
+            "threshold": threshold,
+            "watermark": new_watermark.isoformat() if new_watermark else "",
+            "documents": len(rows),
+            "compared": len(rows) if full else len(queries),
+            "pairsFound": found,
+            "pairs": total,
+            "durationMs": round((time.perf_counter() - started) * 1000, 1),
+            "updatedAt": datetime.utcnow().isoformat(),
+            "error": ""
+        }
+        set_duplicate_scan(user_id, scan)
+        print(f"✓ Near-duplicate {scan['mode']} scan of user {user_id}: {len(rows)} documents, "
+              f"{total} pairs in {scan['durationMs']:.0f}ms")
+        return scan
+    
+    except Exception as e:
+        db.rollback()
+        set_duplicate_scan(user_id, {"status": "failed", "error": str(e)[:500]})
+        raise
+    
+    finally:
+        db.close()
@@ -0,0 +1,57 @@
+"""
+Fair Share
+Worker side of the per-user fair-share scheduler (see app.redis_client)
+"""
+
+import math
+import time
+from typing import Optional
+
+from rq import Queue
+from rq.job import Job
+
+from app.config import settings
+from app.redis_client import job_finished, release_jobs
+
+
+class FairShareMixin:
+    """
+    Worker mixin releasing the jobs held in per-user sub-queues
+    
+    Before each dequeue the worker tops up the lane queues with held jobs,
+    one user per turn, so a worker never sits on empty queues while jobs are
+    held. While idle it blocks for at most FAIR_SHARE_RELEASE_INTERVAL
+    seconds at a time and releases again in between: a capped user's held
+    jobs become releasable when a slot expires, with no enqueue or job end
+    to trigger the release. When per-user caps are on, a job that ends frees
+    its user's running slot and releases that user's next job.
+    """
+    
+    def dequeue_job_and_maintain_ttl(self, timeout: Optional[int], max_idle_time: Optional[int] = None):
+        """Release held jobs, then dequeue, releasing again every interval while idle"""
+        if timeout is None:
+            # Burst mode does not block
+            release_jobs()
+            return super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+        
+        idle_since = time.monotonic()
+        while True:
+            release_jobs()
+            wait = max(1, min(timeout, settings.FAIR_SHARE_RELEASE_INTERVAL))
+            if max_idle_time is not None:
+                idle_time_left = math.ceil(max_idle_time - (time.monotonic() - idle_since))
+                if idle_time_left <= 0:
+                    return None
+                wait = min(wait, idle_time_left)
+            # RQ gives up after max_idle_time; here that ends one interval
+            result = super().dequeue_job_and_maintain_ttl(wait, max_idle_time=wait)
+            if result is not None:
+                return result
+    
+    def handle_job_success(self, job: Job, queue: Queue, started_job_registry):
+        super().handle_job_success(job, queue, started_job_registry)
+        job_finished(job)
+    
+    def handle_job_failure(self, job: Job, queue: Queue, started_job_registry=None, exc_string=''):
+        super().handle_job_failure(job, queue, started_job_registry=started_job_registry, exc_string=exc_string)
+        job_finished(job)
@@ -5,17 +5,217 @@ Background worker that processes files from Redis queue
 
 import time
 from datetime import datetime
-from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import uuid
 
 from rq import Worker, Queue
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.database import SessionLocal, log_event
+from app.database import SessionLocal, log_event, event_logger
 from app.models.task import Task
-from app.redis_client import redis_conn
+from app.models.task_chunk import TaskChunk
+from app.models.task_term import TaskTerm
+from app.redis_client import (
+    redis_conn, bump_embedding_version, bump_keyword_version, find_minhash_candidates, add_minhash_signatures,
+    lane_queues, lane_weights
+)
 from app.services.embedding_service import embedding_service
+from app.services.file_processor import analyze_file
+from app.services.minhash import (
+    MAX_CANDIDATES, band_hashes, estimate_jaccard, signature_from_bytes, signature_to_bytes
+)
+from app.services import task_events  # noqa: F401  (installs task status hooks)
+from app.workers.lanes import WeightedWorker
+
+
+def build_result(
+    task: Task,
+    analysis: dict,
+    embedding,
+    chunks: list,
+    processing_time: float,
+    near_duplicate: Optional[Tuple[Task, float]] = None,
+    embedding_reused: bool = False
+) -> dict:
+    """
+    Build the stored analysis result of a task
+    
+    Args:
+        task: Task being processed
+        analysis: Output of analyze_file
+        embedding: Generated document embedding or None
+        chunks: Chunk records the embedding was pooled from
+        processing_time: Seconds spent on the task
+        near_duplicate: (task, similarity) of the earlier task it was linked to
+        embedding_reused: Whether the embedding was copied from that task
+    
+    Returns:
+        Result dictionary
+    """
+    result = {
+        'fileSize': task.file_size,
+        'lineCount': analysis['line_count'],
+        'wordCount': analysis['word_count'],
+        'characterCount': analysis['char_count'],
+        'hasEmbedding': embedding is not None,
+        'embeddingDimensions': len(embedding) if embedding else 0,
+        'embeddingChunks': len(chunks),
+        'processingTime': f"{processing_time:.2f}s",
+        'analyzedAt': datetime.utcnow().isoformat()
+    }
+    if near_duplicate:
+        original, similarity = near_duplicate
+        result['nearDuplicateOf'] = str(original.id)
+        result['nearDuplicateSimilarity'] = round(similarity, 4)
+        result['embeddingReused'] = embedding_reused
+    return result
+
+
+def build_chunk_rows(task_id: uuid.UUID, chunks: list) -> List[TaskChunk]:
+    """
+    Build the rows persisting a task's chunk embeddings
+    
+    Args:
+        task_id: Task UUID
+        chunks: Chunk records from EmbeddingService.generate_document_embedding
+    
+    Returns:
+        List of TaskChunk rows
+    """
+    rows = []
+    for chunk in chunks:
+        row = TaskChunk(
+            task_id=task_id,
+            chunk_index=chunk['index'],
+            start_char=chunk['start'],
+            end_char=chunk['end']
+        )
+        row.set_embedding(chunk['embedding'])
+        rows.append(row)
+    return rows
+
+
+def build_term_rows(task: Task, analysis: dict) -> List[dict]:
+    """
+    Build the keyword index postings of a task
+    
+    Only the KEYWORD_MAX_TERMS_PER_DOCUMENT most frequent terms are kept;
+    the document length still counts every term.
+    
+    Args:
+        task: Task being processed
+        analysis: Output of analyze_file
+    
+    Returns:
+        List of task_terms row dicts
+    """
+    return [
+        {
+            'task_id': task.id,
+            'user_id': task.user_id,
+            'term': term,
+            'tf': tf,
+            'doc_length': analysis['term_count']
+        }
+        for term, tf in analysis['term_frequencies'].most_common(settings.KEYWORD_MAX_TERMS_PER_DOCUMENT)
+    ]
+
+
+def index_task_terms(db: Session, task: Task, analysis: dict):
+    """
+    Replace a task's postings in the keyword index
+    
+    Runs in the transaction that completes the task, so a task is searchable
+    by keyword exactly when it is completed.
+    
+    Args:
+        db: Database session
+        task: Task being processed
+        analysis: Output of analyze_file
+    """
+    db.execute(delete(TaskTerm).where(TaskTerm.task_id == task.id))
+    rows = build_term_rows(task, analysis)
+    if rows:
+        db.execute(insert(TaskTerm), rows)
+    task.term_count = analysis['term_count']
+
+
+def find_near_duplicate(db: Session, task: Task, signature) -> Optional[Tuple[Task, float]]:
+    """
+    Find the earlier task of the same user most similar to a new one
+    
+    Candidates share an LSH band with the signature (Redis); their stored
+    signatures give the estimated Jaccard similarity of the shingle sets.
+    Only the best candidate at or above MINHASH_JACCARD_THRESHOLD counts.
+    
+    Args:
+        db: Database session
+        task: Task being processed
+        signature: MinHash signature from analyze_file, or None
+    
+    Returns:
+        (task, similarity) tuple, or None
+    """
+    if signature is None:
+        return None
+    
+    candidates = find_minhash_candidates(
+        str(task.user_id), band_hashes(signature, settings.MINHASH_BANDS), MAX_CANDIDATES
+    )
+    candidate_ids = [uuid.UUID(candidate) for candidate in candidates if candidate != str(task.id)]
+    if not candidate_ids:
+        return None
+    
+    best_id, best_similarity = None, 0.0
+    for candidate_id, stored in db.query(Task.id, Task.minhash_signature).filter(
+        Task.id.in_(candidate_ids),
+        Task.user_id == task.user_id,
+        Task.status == "completed",
+        Task.minhash_signature.isnot(None)
+    ).all():
+        similarity = estimate_jaccard(signature, signature_from_bytes(stored))
+        if similarity > best_similarity:
+            best_id, best_similarity = candidate_id, similarity
+    
+    if best_id is None or best_similarity < settings.MINHASH_JACCARD_THRESHOLD:
+        return None
+    return db.get(Task, best_id), best_similarity
+
+
+def near_duplicate_embedding(near_duplicate: Optional[Tuple[Task, float]]) -> Optional[List[float]]:
+    """Embedding of the linked task to reuse, if MINHASH_REUSE_EMBEDDING allows"""
+    if near_duplicate is None or not settings.MINHASH_REUSE_EMBEDDING or not near_duplicate[0].has_embedding:
+        return None
+    return near_duplicate[0].embedding_vector.tolist()
+
+
+def record_minhash(
+    task: Task,
+    analysis: dict,
+    near_duplicate: Optional[Tuple[Task, float]]
+) -> Optional[Tuple[str, str, List[str]]]:
+    """
+    Store a task's MinHash signature and its near-duplicate link
+    
+    Args:
+        task: Task being processed
+        analysis: Output of analyze_file
+        near_duplicate: Result of find_near_duplicate
+    
+    Returns:
+        The task's LSH band index entry, to pass to add_minhash_signatures
+        after the commit (so a task only becomes a candidate once its
+        signature can be read from PostgreSQL), or None without signature
+    """
+    signature = analysis['minhash']
+    task.near_duplicate_of = near_duplicate[0].id if near_duplicate else None
+    if signature is None:
+        task.minhash_signature = None
+        return None
+    task.minhash_signature = signature_to_bytes(signature)
+    return str(task.user_id), str(task.id), band_hashes(signature, settings.MINHASH_BANDS)
 
 
 def process_file(task_id: str, file_path: str):
@@ -29,10 +229,11 @@ def process_file(task_id: str, file_path: str):
     This function:
     1. Reading the file
     2. Counting lines, words, characters
-    3. Generating semantic embedding
-    4. Calculating processing time
-    5. Storing results in PostgreSQL
-    6. Logging to MongoDB
+    3. Linking a near-duplicate earlier upload (MinHash)
+    4. Generating semantic embedding, or reusing that upload's
+    5. Calculating processing time
+    6. Storing results in PostgreSQL
+    7. Logging to MongoDB
     """
     
     print(f"📝 Processing task: {task_id}")
@@ -59,29 +260,24 @@ def process_file(task_id: str, file_path: str):
             'timestamp': datetime.utcnow()
         })
         
-        # Simulate file analysis
-        print(f"   Reading file: {file_path}")
-        
-        file_obj = Path(file_path)
-        
-        if not file_obj.exists():
-            raise Exception(f"File not found: {file_path}")
-        
         # Read and analyze file
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        # Calculate metrics
-        line_count = len(content.splitlines())
-        word_count = len(content.split())
-        char_count = len(content)
-        
-        # Generate embedding (NEW!)
-        print(f"   Generating embedding...")
-        embedding = embedding_service.generate_embedding(content, max_length=2000)
+        print(f"   Reading file: {file_path}")
+        analysis = analyze_file(
+            file_path,
+            embedding_length=embedding_service.max_document_length,
+            minhash_permutations=settings.MINHASH_PERMUTATIONS
+        )
         
-        # Store preview
-        content_preview = content[:500] if len(content) > 500 else content
+        # Near-copies of an earlier upload reuse its embedding
+        near_duplicate = find_near_duplicate(db, task, analysis['minhash'])
+        reused_embedding = near_duplicate_embedding(near_duplicate)
+        if reused_embedding is not None:
+            print(f"   Near-duplicate of {near_duplicate[0].id}, reusing its embedding")
+            embedding, chunks = reused_embedding, []
+        else:
+            # Generate embedding (NEW!)
+            print(f"   Generating embedding...")
+            embedding, chunks = embedding_service.generate_document_embedding(analysis['embedding_text'])
         
         # Simulate processing delay (remove in production)
         time.sleep(2)
@@ -89,29 +285,33 @@ def process_file(task_id: str, file_path: str):
         processing_time = time.time() - start_time
         
         # Prepare result
-        result = {
-            'fileSize': task.file_size,
-            'lineCount': line_count,
-            'wordCount': word_count,
-            'characterCount': char_count,
-            'hasEmbedding': embedding is not None,
-            'embeddingDimensions': len(embedding) if embedding else 0,
-            'processingTime': f"{processing_time:.2f}s",
-            'analyzedAt': datetime.utcnow().isoformat()
-        }
+        result = build_result(
+            task, analysis, embedding, chunks, processing_time,
+            near_duplicate, embedding_reused=reused_embedding is not None
+        )
         
         # Update task with result
         task.status = "completed"
         task.result = result
-        task.embedding = embedding
-        task.content_preview = content_preview
+        task.set_embedding(embedding)
+        task.content_preview = analysis['content_preview']
         task.completed_at = datetime.utcnow()
+        db.add_all(build_chunk_rows(task.id, chunks))
+        index_task_terms(db, task, analysis)
+        minhash_entry = record_minhash(task, analysis, near_duplicate)
         db.commit()
         
+        # Let API processes pick the new embedding and terms up
+        if embedding:
+            bump_embedding_version(str(task.user_id))
+        bump_keyword_version(str(task.user_id))
+        if minhash_entry:
+            add_minhash_signatures([minhash_entry])
+        
         print(f"✅ Task {task_id} completed successfully")
-        print(f"   Lines: {line_count}, Words: {word_count}, Chars: {char_count}")
+        print(f"   Lines: {analysis['line_count']}, Words: {analysis['word_count']}, Chars: {analysis['char_count']}")
         if embedding:
-            print(f"   Embedding: {len(embedding)} dimensions")
+            print(f"   Embedding: {len(embedding)} dimensions from {len(chunks)} chunks")
         
         # Log completion
         log_event('task_processing', {
@@ -150,27 +350,256 @@ def process_file(task_id: str, file_path: str):
         db.close()
 
 
+def process_files_batch(jobs: List[Tuple[str, str]]) -> Dict[str, Optional[str]]:
+    """
+    Process several uploaded files together
+    
+    Files are read and analyzed one by one, embedded with a single model
+    call (except near-duplicates reusing an earlier embedding) and all task
+    updates are written in one transaction. Tasks of the batch are only
+    matched against earlier uploads, not against each other. A file that
+    cannot be read fails on its own without affecting the others. If the
+    batch itself fails (e.g. the commit), every job is retried through
+    process_file so failures stay isolated per task.
+    
+    Args:
+        jobs: (task_id, file_path) tuples
+    
+    Returns:
+        Mapping of task_id to error message, None for completed tasks
+    """
+    
+    print(f"📦 Processing batch of {len(jobs)} tasks")
+    
+    db = SessionLocal()
+    start_time = time.time()
+    errors: Dict[str, Optional[str]] = {}
+    
+    try:
+        # Get all tasks in one query
+        tasks = {
+            str(task.id): task
+            for task in db.query(Task).filter(
+                Task.id.in_([uuid.UUID(task_id) for task_id, _ in jobs])
+            ).all()
+        }
+        
+        # Update status to processing
+        started_at = datetime.utcnow()
+        for task_id, _ in jobs:
+            if task_id in tasks:
+                tasks[task_id].status = "processing"
+                tasks[task_id].started_at = started_at
+            else:
+                errors[task_id] = f"Task {task_id} not found"
+        db.commit()
+        
+        for task_id in tasks:
+            log_event('task_processing', {
+                'task_id': task_id,
+                'status': 'started',
+                'timestamp': datetime.utcnow()
+            })
+        
+        # Read and analyze files, isolating failures per file
+        analyses = {}
+        for task_id, file_path in jobs:
+            if task_id in errors:
+                continue
+            try:
+                analyses[task_id] = analyze_file(
+                    file_path,
+                    embedding_length=embedding_service.max_document_length,
+                    minhash_permutations=settings.MINHASH_PERMUTATIONS
+                )
+            except Exception as e:
+                errors[task_id] = str(e)
+        
+        # Near-copies of earlier uploads reuse their embeddings
+        near_duplicates = {
+            task_id: find_near_duplicate(db, tasks[task_id], analysis['minhash'])
+            for task_id, analysis in analyses.items()
+        }
+        embeddings = {}
+        for task_id, near_duplicate in near_duplicates.items():
+            reused_embedding = near_duplicate_embedding(near_duplicate)
+            if reused_embedding is not None:
+                embeddings[task_id] = (reused_embedding, [])
+        
+        # Generate the other embeddings with one model call
+        analyzed_ids = [task_id for task_id in analyses if task_id not in embeddings]
+        print(f"   Generating {len(analyzed_ids)} embeddings ({len(embeddings)} reused)...")
+        embeddings.update(zip(analyzed_ids, embedding_service.generate_document_embeddings(
+            [analyses[task_id]['embedding_text'] for task_id in analyzed_ids]
+        )))
+        
+        processing_time = time.time() - start_time
+        completed_at = datetime.utcnow()
+        
+        # Write every task update in a single transaction
+        results = {}
+        minhash_entries = []
+        for task_id, task in tasks.items():
+            if task_id in errors:
+                task.status = "failed"
+                task.error = errors[task_id]
+                task.completed_at = completed_at
+                continue
+            
+            analysis = analyses[task_id]
+            embedding, chunks = embeddings[task_id]
+            results[task_id] = build_result(
+                task, analysis, embedding, chunks, processing_time,
+                near_duplicates[task_id], embedding_reused=task_id not in analyzed_ids
+            )
+            
+            task.status = "completed"
+            task.result = results[task_id]
+            task.set_embedding(embedding)
+            task.content_preview = analysis['content_preview']
+            task.completed_at = completed_at
+            db.add_all(build_chunk_rows(task.id, chunks))
+            index_task_terms(db, task, analysis)
+            minhash_entries.append(record_minhash(task, analysis, near_duplicates[task_id]))
+            errors[task_id] = None
+        db.commit()
+    
+    except Exception as e:
+        print(f"❌ Batch failed, processing tasks one by one: {e}")
+        db.rollback()
+        db.close()
+        return _process_files_individually(jobs)
+    
+    # Let API processes pick the new embeddings and terms up
+    for user_id in {str(tasks[task_id].user_id) for task_id in results if embeddings[task_id][0]}:
+        bump_embedding_version(user_id)
+    for user_id in {str(tasks[task_id].user_id) for task_id in results}:
+        bump_keyword_version(user_id)
+    add_minhash_signatures([entry for entry in minhash_entries if entry])
+    
+    db.close()
+    
+    completed = len(results)
+    print(f"✅ Batch done: {completed} completed, {len(jobs) - completed} failed")
+    print(f"   Embedding cache: {embedding_service.cache.stats()}")
+    
+    for task_id, error in errors.items():
+        event = {
+            'task_id': task_id,
+            'status': 'completed' if error is None else 'failed',
+            'timestamp': datetime.utcnow()
+        }
+        if error is None:
+            event['result'] = results[task_id]
+        else:
+            event['error'] = error
+        log_event('task_processing', event)
+    
+    return errors
+
+
+def _process_files_individually(jobs: List[Tuple[str, str]]) -> Dict[str, Optional[str]]:
+    """Fallback for process_files_batch: run process_file for each job"""
+    errors = {}
+    for task_id, file_path in jobs:
+        try:
+            process_file(task_id, file_path)
+            errors[task_id] = None
+        except Exception as e:
+            errors[task_id] = str(e)
+    return errors
+
+
+class FileWorker(WeightedWorker):
+    """
+    Fork-per-job worker whose work horses write their buffered events
+    
+    A work horse leaves with os._exit right after its job, before the event
+    logger's background thread would write what the job logged, so the
+    horse flushes it. Processes that keep running (the worker itself, batch
+    and simple workers) leave it to the background thread.
+    """
+    
+    def perform_job(self, job, queue):
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            if self.is_horse:
+                event_logger.flush()
+
+
+def create_worker(queues: List[Queue]) -> Worker:
+    """Build the RQ worker for the configured WORKER_MODE, taking the lanes in weighted turns"""
+    if settings.WORKER_MODE == "batch":
+        from app.workers.batch_worker import BatchWorker
+        return BatchWorker(
+            queues,
+            connection=redis_conn,
+            batch_size=settings.WORKER_BATCH_SIZE,
+            batch_wait_ms=settings.WORKER_BATCH_WAIT_MS,
+            lane_weights=lane_weights()
+        )
+    return FileWorker(queues, connection=redis_conn, lane_weights=lane_weights())
+
+
 def run_worker():
     """
     Start RQ worker to process tasks from queue
+    
+    With WORKER_CONCURRENCY > 1 this process becomes a pool supervisor that
+    forks that many workers after loading the model (see WorkerPool). The
+    first WORKER_FAST_LANE_WORKERS of them only take "high" lane jobs, so
+    small files keep a share of the pool during bursts of large ones.
     """
     print("=" * 60)
     print("  File Processing Worker")
     print("=" * 60)
     print(f"  Environment: {settings.ENVIRONMENT}")
     print(f"  Redis: {settings.REDIS_HOST}:{settings.REDIS_PORT}")
-    print(f"  Queue: file_processing")
+    weights = lane_weights()
+    print(f"  Queues: {', '.join(f'{queue.name} ({weights[lane]})' for lane, queue in lane_queues.items())}")
+    print(f"  Mode: {settings.WORKER_MODE}")
+    print(f"  Concurrency: {settings.WORKER_CONCURRENCY}")
     print("=" * 60)
     print()
+    
+    # Load the model before taking jobs (and before forking a pool), so the
+    # first job is not slowed down and pool workers share one copy
+    print("⏳ Loading embedding model...")
+    load_time = embedding_service.warmup()
+    if embedding_service.is_loaded:
+        print(f"✓ Embedding model ready in {load_time:.1f}s")
+    else:
+        print("⚠️  Embedding model unavailable, tasks will complete without embeddings")
+    
+    if settings.WORKER_MODE == "batch":
+        print(f"📦 Batch mode: up to {settings.WORKER_BATCH_SIZE} files or {settings.WORKER_BATCH_WAIT_MS}ms per batch")
+    
     print("🚀 Worker started, waiting for jobs...")
     print()
     
-    # Create queue
-    queue = Queue('file_processing', connection=redis_conn)
+    # Lanes in priority order
+    queues = list(lane_queues.values())
+    
+    # Create and start worker(s)
+    if settings.WORKER_CONCURRENCY > 1:
+        from app.workers.worker_pool import WorkerPool
+        # At least one worker keeps taking every lane
+        fast_lane_workers = min(settings.WORKER_FAST_LANE_WORKERS, settings.WORKER_CONCURRENCY - 1)
+        if fast_lane_workers:
+            print(f"⚡ {fast_lane_workers} of {settings.WORKER_CONCURRENCY} workers only take the high lane")
+        WorkerPool(
+            settings.WORKER_CONCURRENCY,
+            make_worker=lambda slot: create_worker(
+                [lane_queues["high"]] if slot < fast_lane_workers else queues
+            ),
+            shutdown_timeout=settings.WORKER_SHUTDOWN_TIMEOUT
+        ).run()
+    else:
+        create_worker(queues).work(with_scheduler=True)
     
-    # Create and start worker
-    worker = Worker([queue], connection=redis_conn)
-    worker.work(with_scheduler=True)
+    # Write events still buffered by this process
+    event_logger.close()
 
 
 if __name__ == "__main__":
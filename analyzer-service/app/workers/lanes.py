@@ -0,0 +1,100 @@
+"""
+Queue Lanes
+Weighted consumption of the processing lanes by RQ workers
+"""
+
+from typing import Dict, List, Optional
+
+from rq import Queue, Worker
+from rq.utils import utcnow
+
+from app.redis_client import LANE_QUEUE_NAMES, record_lane_waits
+from app.workers.fair_share import FairShareMixin
+
+# Lane of each queue name
+QUEUE_LANES = {name: lane for lane, name in LANE_QUEUE_NAMES.items()}
+
+
+class LaneScheduler:
+    """
+    Smooth weighted round-robin over queues
+    
+    Every turn each queue gains its weight in credit; the queue with the
+    most credit goes first and pays the total weight back. Over a round of
+    sum(weights) turns each queue goes first `weight` times, spread out
+    rather than in runs (6/3/1 gives H N H H N H L H N H, not HHHHHH NNN L).
+    
+    The other queues follow in their original (priority) order, so a
+    worker whose first queue is empty takes the next job available:
+    weights only decide whose turn it is when several lanes have work.
+    """
+    
+    def __init__(self, queue_names: List[str], weights: Dict[str, int]):
+        """
+        Args:
+            queue_names: Queues in priority order
+            weights: Turns per round of each queue (missing or 0: never
+                first, only taken when the others are empty)
+        """
+        self.priority = {name: position for position, name in enumerate(queue_names)}
+        self.weights = {name: weights.get(name, 0) for name in queue_names if weights.get(name, 0) > 0}
+        self.total = sum(self.weights.values())
+        self.credit = {name: 0 for name in self.weights}
+    
+    def next_first(self) -> Optional[str]:
+        """Queue whose turn it is, or None without weights"""
+        if not self.weights:
+            return None
+        for name, weight in self.weights.items():
+            self.credit[name] += weight
+        first = max(self.credit, key=lambda name: (self.credit[name], -self.priority[name]))
+        self.credit[first] -= self.total
+        return first
+    
+    def order(self, queues: List[Queue]) -> List[Queue]:
+        """Queues for the next dequeue: this turn's queue first, then by priority"""
+        first = self.next_first()
+        return sorted(queues, key=lambda queue: (queue.name != first, self.priority.get(queue.name, len(queues))))
+
+
+class WeightedLanesMixin:
+    """
+    Worker mixin taking jobs from the lanes in weighted turns
+    
+    RQ reorders the worker's queues after every dequeue; this replaces its
+    strategies with a LaneScheduler over `lane_weights` (lane -> weight).
+    Strict priority would starve the "low" lane while small files keep
+    arriving; a weighted turn bounds how long a large file can wait.
+    
+    It also records how long each dequeued job waited in its lane.
+    """
+    
+    def __init__(self, *args, lane_weights: Optional[Dict[str, int]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        weights = {LANE_QUEUE_NAMES[lane]: weight for lane, weight in (lane_weights or {}).items()}
+        self.lane_scheduler = LaneScheduler([queue.name for queue in self.queues], weights)
+        self._ordered_queues = self.lane_scheduler.order(self.queues)
+    
+    def reorder_queues(self, reference_queue: Queue):
+        """Put the lane whose turn is next first"""
+        self._ordered_queues = self.lane_scheduler.order(self.queues)
+    
+    def dequeue_job_and_maintain_ttl(self, timeout: Optional[int], max_idle_time: Optional[int] = None):
+        """Dequeue as usual and record the job's wait"""
+        result = super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+        if result:
+            self.record_waits([result])
+        return result
+    
+    def record_waits(self, results):
+        """Record the queue wait of dequeued (job, queue) pairs per lane"""
+        now = utcnow()
+        record_lane_waits([
+            (QUEUE_LANES[queue.name], (now - job.enqueued_at).total_seconds() * 1000)
+            for job, queue in results
+            if queue.name in QUEUE_LANES and job.enqueued_at
+        ])
+
+
+class WeightedWorker(FairShareMixin, WeightedLanesMixin, Worker):
+    """Regular (fork per job) RQ worker taking the lanes in weighted turns, fair-share scheduled"""
@@ -0,0 +1,186 @@
+"""
+Worker Pool
+Prefork supervisor running several RQ workers that share one loaded model
+"""
+
+import gc
+import os
+import signal
+import sys
+import time
+import traceback
+from typing import Callable, Dict
+
+from rq import Worker
+
+from app.database import engine, event_logger
+
+# Seconds between checks for exited children
+POLL_INTERVAL = 0.5
+
+# Children that die sooner than this after starting count as crash-looping
+MIN_HEALTHY_UPTIME = 10.0
+
+MAX_RESTART_BACKOFF = 30.0
+
+
+class WorkerPool:
+    """
+    Supervisor forking `concurrency` worker processes
+    
+    The caller loads the embedding model before run(). Children are forked
+    from that process, so the model weights are shared copy-on-write
+    instead of being loaded once per worker: host memory stays roughly flat
+    as concurrency grows. gc.freeze() keeps the collector from touching (and
+    so copying) the pages of objects that exist at fork time.
+    
+    Children that exit are restarted, with a growing delay when they keep
+    dying right after starting. SIGTERM/SIGINT are forwarded to every child,
+    which RQ treats as a warm shutdown: the current job finishes, then the
+    worker exits. A second signal is forwarded too (cold shutdown), and
+    children still running after `shutdown_timeout` are killed.
+    """
+    
+    def __init__(
+        self,
+        concurrency: int,
+        make_worker: Callable[[int], Worker],
+        shutdown_timeout: float = 60.0
+    ):
+        """
+        Args:
+            concurrency: Number of worker processes
+            make_worker: Builds the worker of a slot (0 to concurrency - 1);
+                called in each child after fork
+            shutdown_timeout: Seconds children get to finish their job on shutdown
+        """
+        self.concurrency = concurrency
+        self.make_worker = make_worker
+        self.shutdown_timeout = shutdown_timeout
+        
+        self.children: Dict[int, int] = {}  # pid -> slot
+        self._started_at: Dict[int, float] = {}  # slot -> start time
+        self._backoff: Dict[int, float] = {}  # slot -> next restart delay
+        self._stopping = False
+        self._stop_deadline = None
+        self.restarts = 0
+    
+    def run(self):
+        """Fork the workers and supervise them until shutdown"""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        
+        # Nothing from the parent's pools may be shared with the children
+        engine.dispose()
+        gc.freeze()
+        
+        for slot in range(self.concurrency):
+            self._spawn(slot)
+        print(f"👷 Worker pool started: {self.concurrency} workers (supervisor pid {os.getpid()})")
+        
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if self._stopping and time.monotonic() > self._stop_deadline:
+                    self._kill_all()
+                time.sleep(POLL_INTERVAL)
+                continue
+            
+            slot = self.children.pop(pid, None)
+            if slot is None:
+                continue
+            
+            if self._stopping:
+                print(f"   Worker {slot} (pid {pid}) stopped")
+                continue
+            
+            print(f"⚠️  Worker {slot} (pid {pid}) exited with {self._describe(status)}, restarting")
+            self._restart_later(slot)
+            if not self._stopping:
+                self._spawn(slot)
+                self.restarts += 1
+        
+        print(f"✓ Worker pool stopped ({self.restarts} restarts)")
+    
+    def _spawn(self, slot: int):
+        """Fork one worker process for `slot`"""
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            self._started_at[slot] = time.monotonic()
+            return
+        
+        # Child: own process group so a terminal Ctrl+C only reaches the
+        # supervisor, which forwards it; RQ installs its handlers in work()
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            limit_torch_threads(self.concurrency)
+            worker = self.make_worker(slot)
+            # One scheduler per pool is enough
+            worker.work(with_scheduler=slot == 0)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            # os._exit skips the event logger's background thread
+            event_logger.close()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+    
+    def _restart_later(self, slot: int):
+        """Wait before restarting a slot whose worker keeps crashing"""
+        uptime = time.monotonic() - self._started_at.get(slot, 0)
+        if uptime >= MIN_HEALTHY_UPTIME:
+            self._backoff[slot] = 0.0
+            return
+        
+        delay = min(MAX_RESTART_BACKOFF, max(1.0, 2 * self._backoff.get(slot, 0.0)))
+        self._backoff[slot] = delay
+        print(f"   Worker {slot} is crash-looping, waiting {delay:.0f}s")
+        deadline = time.monotonic() + delay
+        while not self._stopping and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+    
+    def _handle_stop(self, signum, frame):
+        """Forward shutdown signals to the children"""
+        if not self._stopping:
+            print(f"🛑 Received {signal.Signals(signum).name}, draining {len(self.children)} workers...")
+            self._stopping = True
+            self._stop_deadline = time.monotonic() + self.shutdown_timeout
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def _kill_all(self):
+        """Kill children that did not drain in time"""
+        for pid, slot in list(self.children.items()):
+            print(f"   Worker {slot} (pid {pid}) did not stop in {self.shutdown_timeout:.0f}s, killing")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._stop_deadline = float("inf")
+    
+    @staticmethod
+    def _describe(status: int) -> str:
+        if os.WIFSIGNALED(status):
+            return f"signal {signal.Signals(os.WTERMSIG(status)).name}"
+        return f"code {os.WEXITSTATUS(status)}"
+
+
+def limit_torch_threads(concurrency: int):
+    """
+    Split the CPU cores between the pool's workers
+    
+    Each torch process otherwise starts one compute thread per core, and N
+    workers running N threads each just contend for the same cores.
+    """
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // concurrency))
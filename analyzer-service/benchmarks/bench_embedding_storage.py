@@ -0,0 +1,77 @@
+"""
+Embedding Storage Benchmark
+Size and decode cost of float arrays against the packed binary formats
+
+Compares what loading a user's index costs per storage format: the legacy
+float8[] arrays arrive as Python lists of floats, the packed formats as
+bytes decoded by app.services.embedding_codec. Also reports the ranking
+agreement of int8 vectors with float32 ones.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_embedding_storage
+    python -m benchmarks.bench_embedding_storage --sizes 1000 10000 --dimensions 384
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.embedding_codec import (
+    FORMAT_FLOAT32, FORMAT_INT8, encode_embedding, decode_embedding, decode_embeddings
+)
+from app.services.vector_search import stack_embeddings, top_k_indices
+
+
+def timed(func, repeat: int = 3) -> float:
+    """Best wall time of `repeat` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def recall_at_k(vectors: np.ndarray, decoded: np.ndarray, queries: int, top_k: int, rng) -> float:
+    """Share of the float32 top-k that int8 vectors also return"""
+    exact, _ = stack_embeddings(vectors)
+    approx, _ = stack_embeddings(decoded)
+    hits = 0
+    for i in rng.choice(len(vectors), queries, replace=False):
+        expected = set(top_k_indices(exact @ exact[i], top_k))
+        hits += len(expected & set(top_k_indices(approx @ exact[i], top_k)))
+    return hits / (queries * top_k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dimensions", type=int, default=384)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>8} {'format':>8} {'bytes/row':>10} {'decode ms':>10}")
+    
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, args.dimensions)).astype(np.float32)
+        
+        # What the driver hands back for float8[]: a list of Python floats per row
+        lists = vectors.astype(np.float64).tolist()
+        print(f"{size:>8} {'float8[]':>8} {8 * args.dimensions:>10} "
+              f"{timed(lambda: np.array(lists, dtype=np.float32)):>10.1f}")
+        
+        for storage_format in (FORMAT_FLOAT32, FORMAT_INT8):
+            rows = [(data, storage_format, scale)
+                    for data, scale in (encode_embedding(vector, storage_format) for vector in vectors)]
+            print(f"{size:>8} {storage_format:>8} {len(rows[0][0]):>10} "
+                  f"{timed(lambda: decode_embeddings(rows, args.dimensions)):>10.1f}"
+                  f"  (row by row {timed(lambda: [decode_embedding(*row) for row in rows]):.1f})")
+        
+        decoded = decode_embeddings(rows, args.dimensions)
+        print(f"{'':>8} int8 recall@10 vs float32: "
+              f"{recall_at_k(vectors, decoded, queries=min(50, size), top_k=10, rng=rng):.3f}")
+
+
+if __name__ == "__main__":
+    main()
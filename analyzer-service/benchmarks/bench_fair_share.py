@@ -0,0 +1,164 @@
+"""
+Fair Share Benchmark
+Latency of light users' jobs while one user has a large backlog
+
+Simulates a worker pool (no Redis, no model) on one lane. One heavy user
+uploads a large backlog at once while light users keep uploading a file
+now and then, and compares:
+
+- fifo: every job in the lane queue, the setup without fair share
+- fair: jobs held in per-user sub-queues and released to the lane queue
+  one user per turn, at most --depth ahead (the scheduler in
+  app.redis_client, modelled step by step)
+- fair+cap: fair, with at most --cap released and unfinished jobs per user
+  (FAIR_SHARE_MAX_RUNNING_PER_USER)
+
+For each setup it reports the light users' time to completion (queue wait
+plus processing) percentiles, without and with the backlog, and when the
+heavy user's last job finished.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_fair_share
+    python -m benchmarks.bench_fair_share --backlog 50000 --workers 16 --duration 3600
+"""
+
+import argparse
+import heapq
+import random
+from collections import deque
+
+HEAVY = "heavy"
+
+
+class FairShareModel:
+    """In-process model of the fair-share release (_RELEASE_JOBS)"""
+    
+    def __init__(self, depth: int, cap: int):
+        self.depth = depth
+        self.cap = cap
+        self.queue = deque()  # The lane's RQ queue
+        self.pending = {}  # User -> held jobs
+        self.users = deque()  # Users with held jobs, in turn order
+        self.running = {}  # User -> released, unfinished jobs
+    
+    def hold(self, user, job):
+        if not self.pending.get(user):
+            self.pending[user] = deque()
+            self.users.append(user)
+        self.pending[user].append(job)
+    
+    def release(self):
+        passed = 0
+        while len(self.queue) < self.depth and passed < len(self.users):
+            user = self.users[0]
+            if self.cap and self.running.get(user, 0) >= self.cap:
+                self.users.rotate(-1)
+                passed += 1
+                continue
+            self.queue.append(self.pending[user].popleft())
+            self.running[user] = self.running.get(user, 0) + 1
+            passed = 0
+            if self.pending[user]:
+                self.users.rotate(-1)
+            else:
+                self.users.popleft()
+    
+    def finished(self, user):
+        self.running[user] -= 1
+        if self.cap:
+            self.release()
+
+
+def make_jobs(rng, args, backlog: bool) -> list:
+    """(arrival, service seconds, user) of every job, by arrival"""
+    jobs = []
+    t = 0.0
+    while t < args.duration:
+        t += rng.expovariate(args.light_rate)
+        jobs.append((t, rng.lognormvariate(0, 0.5) * args.job_seconds, f"light{rng.randrange(args.light_users)}"))
+    if backlog:
+        jobs += [(0.0, rng.lognormvariate(0, 0.5) * args.job_seconds, HEAVY) for _ in range(args.backlog)]
+    return sorted(jobs, key=lambda job: job[0])
+
+
+def simulate(jobs: list, workers: int, fair: bool, depth: int, cap: int) -> list:
+    """
+    Run the jobs through the pool
+    
+    Returns:
+        (user, arrival, completion) of every job
+    """
+    model = FairShareModel(depth if fair else float("inf"), cap)
+    free = []  # (time, slot) of busy workers
+    idle = list(range(workers))
+    done = []
+    position = 0
+    
+    def start(now):
+        while idle and model.queue:
+            arrival, service, user = model.queue.popleft()
+            done.append((user, arrival, now + service))
+            heapq.heappush(free, (now + service, idle.pop(), user))
+            if fair:
+                model.release()
+    
+    while position < len(jobs) or free:
+        next_arrival = jobs[position][0] if position < len(jobs) else float("inf")
+        if free and free[0][0] < next_arrival:
+            now, slot, user = heapq.heappop(free)
+            idle.append(slot)
+            model.finished(user)
+        else:
+            now = next_arrival
+            arrival, service, user = jobs[position]
+            position += 1
+            model.hold(user, (arrival, service, user))
+        # Enqueues, job ends and dequeues all release held jobs
+        model.release()
+        start(now)
+    return done
+
+
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--backlog", type=int, default=5000, help="Jobs the heavy user uploads at once")
+    parser.add_argument("--light-users", type=int, default=20)
+    parser.add_argument("--light-rate", type=float, default=2, help="Light users' jobs per second, together")
+    parser.add_argument("--duration", type=float, default=600, help="Seconds of light users' arrivals")
+    parser.add_argument("--job-seconds", type=float, default=0.5, help="Median processing time of a job")
+    parser.add_argument("--depth", type=int, default=4, help="FAIR_SHARE_QUEUE_DEPTH")
+    parser.add_argument("--cap", type=int, default=2, help="FAIR_SHARE_MAX_RUNNING_PER_USER of the fair+cap setup")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    print(
+        f"{args.workers} workers, {args.light_users} light users at {args.light_rate:g} jobs/s for "
+        f"{args.duration:g}s, heavy backlog of {args.backlog} jobs, {args.job_seconds:g}s per job"
+    )
+    print(
+        f"{'setup':>9} {'backlog':>8} {'light p50':>10} {'light p95':>10} {'light p99':>10} "
+        f"{'light max':>10} {'heavy done':>11}"
+    )
+    setups = [("fifo", False, 0), ("fair", True, 0), ("fair+cap", True, args.cap)]
+    for name, fair, cap in setups:
+        for backlog in (False, True):
+            jobs = make_jobs(random.Random(args.seed), args, backlog)
+            done = simulate(jobs, args.workers, fair, args.depth, cap)
+            light = [end - arrival for user, arrival, end in done if user != HEAVY]
+            heavy = [end for user, _, end in done if user == HEAVY]
+            heavy_column = f"{max(heavy):>10.0f}s" if heavy else f"{'-':>11}"
+            print(
+                f"{name:>9} {'yes' if backlog else 'no':>8} "
+                + " ".join(f"{percentile(light, share):>9.2f}s" for share in (0.5, 0.95, 0.99))
+                + f" {max(light):>9.2f}s {heavy_column}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Keyword Search Benchmark
+BM25 over the task_terms inverted index versus scanning the user's rows
+
+Inserts a synthetic user into the configured PostgreSQL (use a scratch
+database): documents with Zipf-distributed terms, a few common ones and a
+long tail of rare ones, minus the most common as stop words. Then, for
+random 1-3 term queries drawn the same way, times:
+
+- index: the queries GET /search runs (app.services.keyword_index),
+  document frequencies then BM25, reading only the query terms' postings
+  from the (user_id, term) index
+- scan: content_preview ILIKE '%term%' over the user's tasks, what keyword
+  search would cost without an index (and it only sees 500 characters)
+
+It also checks that the rare-term pruning of the index queries returns the
+same ranking as BM25 over every matching document, on queries mixing common
+and rare terms.
+
+The synthetic rows are deleted afterwards.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_keyword_search
+    python -m benchmarks.bench_keyword_search --documents 10000 100000 --terms-per-doc 200
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, insert, or_, select
+
+from app.database import engine, Base
+from app.models.task import Task
+from app.models.task_term import TaskTerm
+from app.config import settings
+from app.services.keyword_index import (
+    bm25_query, common_terms_bound, document_frequencies_query, inverse_document_frequency,
+    pruned_ranking_is_exact, select_required_terms
+)
+
+# Most frequent synthetic terms, dropped like stop words
+STOP_TERMS = 50
+
+
+def sample_terms(rng, size: int, vocabulary: int) -> np.ndarray:
+    """Zipf-distributed term ids, stop terms excluded"""
+    return STOP_TERMS + (rng.zipf(1.3, size) - 1) % (vocabulary - STOP_TERMS)
+
+
+def insert_corpus(conn, user_id: uuid.UUID, documents: int, terms_per_doc: int, vocabulary: int, rng):
+    """Insert tasks and postings, 1000 documents per statement batch"""
+    now = datetime.utcnow()
+    for offset in range(0, documents, 1000):
+        tasks, postings = [], []
+        for _ in range(min(1000, documents - offset)):
+            task_id = uuid.uuid4()
+            sampled = sample_terms(rng, terms_per_doc, vocabulary)
+            tasks.append({
+                "id": task_id, "user_id": user_id, "filename": "synthetic.txt", "file_path": "",
+                "file_size": 0, "status": "completed", "created_at": now, "completed_at": now,
+                "content_preview": " ".join(f"t{term}" for term in sampled)[:500],
+                "term_count": terms_per_doc
+            })
+            unique, counts = np.unique(sampled, return_counts=True)
+            postings.extend(
+                {"task_id": task_id, "user_id": user_id, "term": f"t{term}", "tf": int(tf), "doc_length": terms_per_doc}
+                for term, tf in zip(unique, counts)
+            )
+        conn.execute(insert(Task), tasks)
+        conn.execute(insert(TaskTerm), postings)
+        conn.commit()
+
+
+def keyword_search(
+    conn, user_id: uuid.UUID, terms, documents: int, average_length: float, top_k: int, prune: bool = True
+):
+    """The queries of app.routes.search.keyword_search (prune=False: always score in full)"""
+    df = dict(conn.execute(document_frequencies_query(user_id, terms)).all())
+    if not df:
+        return []
+    idf = {term: inverse_document_frequency(count, documents) for term, count in df.items()}
+    required = select_required_terms(df, documents, settings.KEYWORD_COMMON_TERM_RATIO) if prune else None
+    if required:
+        ranked = conn.execute(bm25_query(user_id, idf, average_length, top_k, required=required)).all()
+        if pruned_ranking_is_exact(ranked, top_k, common_terms_bound(idf, required)):
+            return ranked
+    return conn.execute(bm25_query(user_id, idf, average_length, top_k)).all()
+
+
+def check_pruning(conn, user_id: uuid.UUID, rng, args, documents: int) -> int:
+    """
+    Compare pruned and full rankings of common + rare term queries
+    
+    Returns:
+        Queries whose rankings differ
+    """
+    mismatches = 0
+    for _ in range(args.queries):
+        common = [f"t{term}" for term in STOP_TERMS + rng.integers(0, 3, rng.integers(1, 3))]
+        rare = [f"t{term}" for term in STOP_TERMS + rng.integers(100, 2000, rng.integers(1, 3))]
+        terms = sorted(set(common + rare))
+        pruned = keyword_search(conn, user_id, terms, documents, args.terms_per_doc, args.top_k)
+        full = keyword_search(conn, user_id, terms, documents, args.terms_per_doc, args.top_k, prune=False)
+        if [(task_id, round(score, 6)) for task_id, score in pruned] != [
+            (task_id, round(score, 6)) for task_id, score in full
+        ]:
+            mismatches += 1
+    return mismatches
+
+
+def timed(run, repeat: int = 3) -> float:
+    """Best of `repeat` runs in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--terms-per-doc", type=int, default=100)
+    parser.add_argument("--vocabulary", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    Base.metadata.create_all(bind=engine, tables=[Task.__table__, TaskTerm.__table__])
+    rng = np.random.default_rng(0)
+    print(f"{'docs':>8} {'index p50 ms':>13} {'index p95 ms':>13} {'scan p50 ms':>12} {'pruning':>12}")
+    
+    for documents in args.documents:
+        user_id = uuid.uuid4()
+        with engine.connect() as conn:
+            try:
+                insert_corpus(conn, user_id, documents, args.terms_per_doc, args.vocabulary, rng)
+                
+                index_ms, scan_ms = [], []
+                for _ in range(args.queries):
+                    terms = [f"t{term}" for term in np.unique(sample_terms(rng, rng.integers(1, 4), args.vocabulary))]
+                    index_ms.append(timed(lambda: keyword_search(
+                        conn, user_id, terms, documents, args.terms_per_doc, args.top_k
+                    )))
+                    scan_ms.append(timed(lambda: conn.execute(select(Task.id).where(
+                        Task.user_id == user_id,
+                        or_(*(Task.content_preview.ilike(f"%{term} %") for term in terms))
+                    )).all(), repeat=1))
+                
+                mismatches = check_pruning(conn, user_id, rng, args, documents)
+                
+                index_ms.sort()
+                print(
+                    f"{documents:>8} {statistics.median(index_ms):>13.2f} "
+                    f"{index_ms[int(len(index_ms) * 0.95)]:>13.2f} {statistics.median(scan_ms):>12.2f} "
+                    f"{'exact' if not mismatches else f'{mismatches} differ':>12}"
+                )
+            finally:
+                conn.rollback()
+                conn.execute(delete(Task).where(Task.user_id == user_id))
+                conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+MinHash Near-Duplicate Benchmark
+Signature cost, LSH recall and lookup work of near-duplicate detection at ingest
+
+Builds a synthetic corpus of random-word documents where a share are
+edited copies of earlier ones (a few words replaced, like a rotated log
+or a revised report), then:
+
+- times MinHasher on the term stream, the work analyze_file adds per file
+- files each document in order the way the worker does: look up LSH
+  candidates (an in-process dict of sets stands in for the Redis band
+  sets), verify them by signature and link the best one at or above the
+  threshold
+- compares the links with exact Jaccard similarity of the shingle sets,
+  for recall and precision, and reports the share of documents linked
+  (those skip the embedding model when MINHASH_REUSE_EMBEDDING is on)
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_minhash
+    python -m benchmarks.bench_minhash --documents 5000 --copy-ratio 0.5 --bands 16 32
+"""
+
+import argparse
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from app.services.minhash import (
+    SHINGLE_SIZE, MAX_CANDIDATES, MinHasher, band_hashes, candidate_probability, estimate_jaccard
+)
+
+
+def shingle_set(terms):
+    return {tuple(terms[i:i + SHINGLE_SIZE]) for i in range(len(terms) - SHINGLE_SIZE + 1)}
+
+
+def build_corpus(rng, documents: int, length: int, vocabulary: int, copy_ratio: float, max_edit: float):
+    """Random documents; copy_ratio of them are edited copies of an earlier one"""
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    corpus = []
+    for i in range(documents):
+        if i and rng.random() < copy_ratio:
+            terms = corpus[rng.integers(i)].copy()
+            edits = rng.integers(0, int(len(terms) * max_edit) + 1)
+            terms[rng.choice(len(terms), edits, replace=False)] = words[rng.integers(vocabulary, size=edits)]
+        else:
+            terms = words[rng.integers(vocabulary, size=length)]
+        corpus.append(terms)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--length", type=int, default=1000, help="Terms per document")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--copy-ratio", type=float, default=0.3)
+    parser.add_argument("--max-edit", type=float, default=0.1, help="Largest share of words replaced in a copy")
+    parser.add_argument("--permutations", type=int, default=128)
+    parser.add_argument("--bands", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    corpus = build_corpus(rng, args.documents, args.length, args.vocabulary, args.copy_ratio, args.max_edit)
+    term_lists = [terms.tolist() for terms in corpus]
+    
+    start = time.perf_counter()
+    signatures = []
+    for terms in term_lists:
+        hasher = MinHasher(args.permutations)
+        hasher.update(terms)
+        signatures.append(hasher.signature())
+    per_million = (time.perf_counter() - start) / (args.documents * args.length) * 1e6
+    print(f"Signatures: {per_million * 1000:.0f} ms per million terms")
+    
+    # Ground truth: each document's most similar earlier document
+    shingles = [shingle_set(terms) for terms in term_lists]
+    postings = defaultdict(list)
+    truth = {}
+    for i, doc_shingles in enumerate(shingles):
+        overlap = Counter(j for shingle in doc_shingles for j in postings[shingle])
+        best = max(
+            ((len(doc_shingles & shingles[j]) / len(doc_shingles | shingles[j]), j) for j in overlap),
+            default=(0.0, None)
+        )
+        if best[0] >= args.threshold:
+            truth[i] = best[1]
+        for shingle in doc_shingles:
+            postings[shingle].append(i)
+    print(f"Documents with an earlier one at Jaccard >= {args.threshold}: {len(truth)} of {args.documents}")
+    
+    print(
+        f"{'bands':>6} {'P(s=thr)':>9} {'cands/doc':>10} {'lookup ms':>10} "
+        f"{'recall':>7} {'precision':>10} {'linked':>7}"
+    )
+    for bands in args.bands:
+        index = defaultdict(set)
+        linked = {}
+        candidates_seen = 0
+        start = time.perf_counter()
+        for i, signature in enumerate(signatures):
+            keys = [(band, band_hash) for band, band_hash in enumerate(band_hashes(signature, bands))]
+            shared = Counter(j for key in keys for j in index.get(key, ()))
+            candidates = [j for j, _ in shared.most_common(MAX_CANDIDATES)]
+            candidates_seen += len(candidates)
+            best = max(((estimate_jaccard(signature, signatures[j]), j) for j in candidates), default=(0.0, None))
+            if best[0] >= args.threshold:
+                linked[i] = best[1]
+            for key in keys:
+                index[key].add(i)
+        lookup_ms = (time.perf_counter() - start) / args.documents * 1000
+        
+        found = sum(1 for i in linked if i in truth)
+        correct = sum(
+            1 for i, j in linked.items()
+            if len(shingles[i] & shingles[j]) / len(shingles[i] | shingles[j]) >= args.threshold
+        )
+        print(
+            f"{bands:>6} {candidate_probability(args.threshold, args.permutations, bands):>9.3f} "
+            f"{candidates_seen / args.documents:>10.2f} {lookup_ms:>10.3f} "
+            f"{found / max(len(truth), 1):>7.3f} {correct / max(len(linked), 1):>10.3f} "
+            f"{len(linked) / args.documents:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
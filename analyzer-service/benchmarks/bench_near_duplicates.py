@@ -0,0 +1,68 @@
+"""
+Near-Duplicate Benchmark
+Time and memory of the blockwise all-pairs scan
+
+Builds a random corpus with planted near-duplicates (noisy copies of some
+documents) and times app.services.near_duplicates.similar_pairs: a full
+scan of every pair, and an incremental update comparing 1% new documents
+against the corpus. Reports the planted pairs found and the size of one
+block of scores, the scan's working memory next to the embeddings.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_near_duplicates
+    python -m benchmarks.bench_near_duplicates --sizes 10000 100000 --block-sizes 1024 4096
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.near_duplicates import similar_pairs
+from app.services.vector_search import normalize_rows
+
+
+def make_corpus(size: int, dimensions: int, duplicate_share: float, rng):
+    """Random unit vectors, with noisy copies of the first rows appended"""
+    originals = int(size * duplicate_share / 2)
+    vectors = rng.standard_normal((size, dimensions)).astype(np.float32)
+    vectors[size - originals:] = vectors[:originals] + 0.05 * rng.standard_normal((originals, dimensions)).astype(np.float32)
+    normalize_rows(vectors)
+    planted = {(i, size - originals + i) for i in range(originals)}
+    return vectors, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--block-sizes", type=int, nargs="+", default=[2048])
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--duplicates", type=float, default=0.02, help="Share of documents that are planted copies")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    print(f"{'docs':>8} {'block':>6} {'block MB':>9} {'full s':>8} {'update s':>9} {'pairs':>7} {'recall':>7}")
+    
+    for size in args.sizes:
+        vectors, planted = make_corpus(size, args.dimensions, args.duplicates, rng)
+        new_rows = rng.choice(size, max(1, size // 100), replace=False)
+        
+        for block_size in args.block_sizes:
+            start = time.perf_counter()
+            pairs = {(min(i, j), max(i, j)) for i, j, _ in similar_pairs(vectors, args.threshold, block_size)}
+            full_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for _ in similar_pairs(vectors, args.threshold, block_size, new_rows):
+                pass
+            update_seconds = time.perf_counter() - start
+            
+            recall = len(planted & pairs) / len(planted) if planted else 1.0
+            block_mb = block_size * block_size * 4 / 1024 / 1024
+            print(f"{size:>8} {block_size:>6} {block_mb:>9.0f} {full_seconds:>8.2f} {update_seconds:>9.2f} "
+                  f"{len(pairs):>7} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Worker Pool Memory Benchmark
+Host memory of N workers sharing one model against N separate processes
+
+For each worker count, measures the proportional set size (PSS) summed over
+all processes, which counts shared pages once, plus the plain RSS sum:
+
+- prefork: one process loads the model and forks N children, as WorkerPool
+  does; each child embeds a few documents before being measured
+- separate: N independent processes that each load the model, as N worker
+  containers would
+
+Linux only (reads /proc/<pid>/smaps_rollup). Needs the embedding model.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_pool_memory
+    python -m benchmarks.bench_pool_memory --workers 1 2 4 8
+"""
+
+import argparse
+import gc
+import os
+import signal
+import subprocess
+import sys
+from typing import List, Tuple
+
+SAMPLE_TEXTS = [f"document {i} about queues, workers and vector search" for i in range(32)]
+
+SEPARATE_SCRIPT = f"""
+import sys, time
+from app.services.embedding_service import embedding_service
+embedding_service.warmup()
+embedding_service.cache.max_entries = 0
+embedding_service.cache.redis_conn = None
+embedding_service.generate_embeddings({SAMPLE_TEXTS!r})
+print("ready", flush=True)
+time.sleep(3600)
+"""
+
+
+def memory_kb(pid: int) -> Tuple[int, int]:
+    """(rss, pss) of a process in kB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values["Rss:"], values["Pss:"]
+
+
+def total_memory(pids: List[int]) -> Tuple[float, float]:
+    """Summed (rss, pss) in MB"""
+    rss, pss = zip(*(memory_kb(pid) for pid in pids))
+    return sum(rss) / 1024, sum(pss) / 1024
+
+
+def run_prefork(workers: int) -> Tuple[float, float]:
+    """Load the model once, fork `workers` children and measure them all"""
+    from app.services.embedding_service import embedding_service
+    from app.workers.worker_pool import limit_torch_threads
+    
+    embedding_service.warmup()
+    embedding_service.cache.max_entries = 0
+    embedding_service.cache.redis_conn = None
+    gc.freeze()
+    
+    children = []
+    ready_read, ready_write = os.pipe()
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            limit_torch_threads(workers)
+            embedding_service.generate_embeddings(SAMPLE_TEXTS)
+            os.write(ready_write, b"r")
+            signal.pause()
+            os._exit(0)
+        children.append(pid)
+    
+    os.close(ready_write)
+    received = 0
+    while received < workers:
+        received += len(os.read(ready_read, workers))
+    os.close(ready_read)
+    
+    try:
+        return total_memory([os.getpid()] + children)
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+
+
+def run_separate(workers: int) -> Tuple[float, float]:
+    """Start `workers` processes that each load their own model"""
+    processes = [
+        subprocess.Popen([sys.executable, "-c", SEPARATE_SCRIPT], stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    try:
+        for process in processes:
+            process.stdout.readline()
+        return total_memory([process.pid for process in processes])
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    
+    print(f"{'workers':>8} {'separate PSS':>13} {'prefork PSS':>12} {'separate RSS':>13} {'prefork RSS':>12}")
+    for workers in args.workers:
+        separate_rss, separate_pss = run_separate(workers)
+        # Fork from a fresh interpreter so earlier runs do not inflate the parent
+        result = subprocess.run(
+            [sys.executable, "-c",
+             f"from benchmarks.bench_pool_memory import run_prefork; print(*run_prefork({workers}))"],
+            capture_output=True, text=True, check=True
+        )
+        prefork_rss, prefork_pss = map(float, result.stdout.split()[-2:])
+        print(f"{workers:>8} {separate_pss:>10.0f} MB {prefork_pss:>9.0f} MB "
+              f"{separate_rss:>10.0f} MB {prefork_rss:>9.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Column Projection Benchmark
+Bytes read and query latency of each read endpoint, full rows against projections
+
+Runs the database queries behind each read endpoint twice against the
+configured PostgreSQL, for one user's real data:
+
+- full: whole Task rows, as the endpoints loaded them before
+- projected: only the columns the endpoint returns (app.routes.*)
+
+Bytes are the size of the values the driver hands back (binary and text
+lengths, JSON as serialized, 16 bytes for UUIDs, 8 for numbers and
+timestamps); latency is the median of `--repeat` runs, each in a fresh
+session so nothing is served from the identity map.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_projection --user-id <uuid>
+    python -m benchmarks.bench_projection --user-id <uuid> --limit 50 --top-k 10 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from typing import List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+
+from app.database import AsyncSessionLocal, close_db
+from app.models.task import Task
+from app.routes.similarity import EMBEDDING_COLUMNS, WINNER_COLUMNS
+from app.routes.tasks import TASK_DETAIL_COLUMNS, TASK_LIST_COLUMNS
+
+
+def value_bytes(value) -> int:
+    """Approximate wire size of one column value"""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (dict, list)):
+        return len(json.dumps(value))
+    if isinstance(value, uuid.UUID):
+        return 16
+    return 8
+
+
+def row_bytes(row) -> int:
+    """Size of a result row; ORM objects count the attributes actually loaded"""
+    total = 0
+    for item in row:
+        if isinstance(item, Task):
+            total += sum(
+                value_bytes(value) for key, value in vars(item).items() if not key.startswith("_")
+            )
+        else:
+            total += value_bytes(item)
+    return total
+
+
+async def measure(stmt, repeat: int) -> Tuple[int, float]:
+    """(bytes per request, median ms) of a statement"""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            rows = (await db.execute(stmt)).all()
+            timings.append((time.perf_counter() - start) * 1000)
+            size = sum(row_bytes(row) for row in rows)
+    return size, statistics.median(timings)
+
+
+async def sample_ids(user_uuid: uuid.UUID, count: int) -> List[uuid.UUID]:
+    """Most recent completed tasks with embeddings"""
+    async with AsyncSessionLocal() as db:
+        return list((await db.scalars(
+            select(Task.id).where(
+                Task.user_id == user_uuid,
+                Task.status == "completed",
+                Task.embedding_data.isnot(None)
+            ).order_by(Task.created_at.desc()).limit(count)
+        )).all())
+
+
+async def run(args):
+    user_uuid = uuid.UUID(args.user_id)
+    ids = await sample_ids(user_uuid, max(args.top_k, 2))
+    if len(ids) < 2:
+        raise SystemExit("The user needs at least two completed tasks with embeddings")
+    
+    by_user = Task.user_id == user_uuid
+    page = lambda stmt: stmt.where(by_user).order_by(Task.created_at.desc(), Task.id.desc()).limit(args.limit + 1)
+    one = Task.id == ids[0]
+    winners = Task.id.in_(ids[:args.top_k])
+    pair = Task.id.in_(ids[:2])
+    
+    cases = [
+        ("GET /tasks/{id}",
+         select(Task).where(one, by_user),
+         select(Task).options(load_only(*TASK_DETAIL_COLUMNS)).where(one, by_user)),
+        ("GET /tasks",
+         page(select(Task)),
+         page(select(*TASK_LIST_COLUMNS))),
+        ("similarity: reference",
+         select(Task).where(one, by_user),
+         select(Task).options(
+             load_only(Task.id, Task.filename, Task.content_preview, *EMBEDDING_COLUMNS)
+         ).where(one, by_user)),
+        ("similarity: winners",
+         select(Task).where(winners),
+         select(*WINNER_COLUMNS).where(winners)),
+        ("similarity: compare",
+         select(Task).where(pair, by_user),
+         select(Task).options(load_only(Task.id, Task.filename, *EMBEDDING_COLUMNS)).where(pair, by_user)),
+    ]
+    
+    print(f"{'query':<24} {'full B':>9} {'proj B':>9} {'saved':>7} {'full ms':>8} {'proj ms':>8}")
+    for name, full_stmt, projected_stmt in cases:
+        full_bytes, full_ms = await measure(full_stmt, args.repeat)
+        projected_bytes, projected_ms = await measure(projected_stmt, args.repeat)
+        saved = 1 - projected_bytes / full_bytes if full_bytes else 0.0
+        print(f"{name:<24} {full_bytes:>9} {projected_bytes:>9} {saved:>6.0%} "
+              f"{full_ms:>8.2f} {projected_ms:>8.2f}")
+    
+    await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--limit", type=int, default=10, help="Listing page size")
+    parser.add_argument("--top-k", type=int, default=5, help="Similarity winners to hydrate")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
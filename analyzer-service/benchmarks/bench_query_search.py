@@ -0,0 +1,108 @@
+"""
+Free-Text Search Benchmark
+Latency of encoding a query and searching a user's index on CPU
+
+Loads the real embedding model (sentence-transformers must be installed)
+through the same QueryEncoder the API uses, then times, per query:
+encoding a new query, encoding a repeated (cached) query, and searching
+an index of random document vectors, approximate and exact. The total is
+what GET /similarity/query spends outside the database on a result-cache
+miss; the target is under 50 ms.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_query_search
+    python -m benchmarks.bench_query_search --documents 100000 --queries 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from app.services.ann_index import IVFIndex
+from app.services.embedding_service import embedding_service
+from app.services.query_encoder import QueryEncoder
+
+WORDS = (
+    "invoice contract report quarterly revenue meeting notes deadline server "
+    "error budget proposal design review customer support ticket migration "
+    "database backup policy security audit release schedule onboarding"
+).split()
+
+
+def percentiles(timings_ms):
+    """(p50, p95) of a list of milliseconds"""
+    ordered = sorted(timings_ms)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+async def time_encodes(encoder: QueryEncoder, queries) -> list:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        await encoder.encode(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20000, help="Documents in the searched index")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    
+    # Measure the model, not Redis
+    embedding_service.cache.redis_conn = None
+    embedding_service.cache.max_entries = 0
+    encoder = QueryEncoder(embedding_service, max_entries=10000, max_length=1000)
+    
+    rng = np.random.default_rng(0)
+    queries = [
+        " ".join(rng.choice(WORDS, size=rng.integers(2, 8))) + f" {i}"
+        for i in range(args.queries)
+    ]
+    
+    async def encode_all():
+        load_seconds = await encoder.warmup()
+        if not encoder.is_ready:
+            raise SystemExit("Embedding model could not be loaded")
+        cold = await time_encodes(encoder, queries)
+        cached = await time_encodes(encoder, queries)
+        vectors = [await encoder.encode(query) for query in queries]
+        return load_seconds, cold, cached, vectors
+    
+    load_seconds, cold, cached, vectors = asyncio.run(encode_all())
+    encoder.close()
+    print(f"Model load: {load_seconds:.1f}s")
+    
+    index = IVFIndex(dimensions=len(vectors[0]))
+    index.add((str(i), vector) for i, vector in enumerate(rng.standard_normal((args.documents, len(vectors[0])))))
+    index.train()
+    
+    searches = {}
+    for label, exact in (("approximate", False), ("exact", True)):
+        timings = []
+        for vector in vectors:
+            start = time.perf_counter()
+            index.search(vector, top_k=args.top_k, exact=exact)
+            timings.append((time.perf_counter() - start) * 1000)
+        searches[label] = timings
+    
+    print(f"{'step':<28} {'p50 ms':>8} {'p95 ms':>8}")
+    rows = [
+        ("encode (new query)", cold),
+        ("encode (cached query)", cached),
+        (f"search {args.documents} approximate", searches["approximate"]),
+        (f"search {args.documents} exact", searches["exact"]),
+        ("total, new query", [a + b for a, b in zip(cold, searches["approximate"])]),
+    ]
+    for label, timings in rows:
+        p50, p95 = percentiles(timings)
+        print(f"{label:<28} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Queue Lanes Benchmark
+Small-file completion times during a burst of large files, by queue setup
+
+Simulates a worker pool (no Redis, no model) fed a steady stream of small
+files, plus a burst of large files partway through, and compares:
+
+- fifo: one queue, the setup before lanes
+- lanes: the high/normal/low lanes taken in weighted turns by every
+  worker, with the real LaneScheduler and QUEUE_WEIGHT_* weights
+- fast-lane: lanes, plus WORKER_FAST_LANE_WORKERS of the workers only
+  taking the "high" lane
+
+For each setup it reports small-file p50/p95 time to completion (queue
+wait plus processing) with and without the burst, and the p95 and last
+completion of the large files, to show they are not starved.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_queue_lanes
+    python -m benchmarks.bench_queue_lanes --workers 8 --burst 500 --fast-lane-workers 2
+"""
+
+import argparse
+import heapq
+import random
+from collections import deque
+
+from app.redis_client import LANE_QUEUE_NAMES, lane_weights
+from app.workers.lanes import LaneScheduler
+
+QUEUE_NAMES = list(LANE_QUEUE_NAMES.values())
+HIGH, LOW = LANE_QUEUE_NAMES["high"], LANE_QUEUE_NAMES["low"]
+
+
+def make_jobs(rng, args, burst: bool) -> list:
+    """(arrival, service seconds, queue name, is small) of every job, by arrival"""
+    jobs = []
+    t = 0.0
+    while t < args.duration:
+        t += rng.expovariate(args.small_rate)
+        jobs.append((t, rng.lognormvariate(0, 0.5) * args.small_seconds, HIGH, True))
+    if burst:
+        for _ in range(args.burst):
+            arrival = args.burst_at + rng.random() * args.burst_spread
+            jobs.append((arrival, rng.lognormvariate(0, 0.3) * args.large_seconds, LOW, False))
+    return sorted(jobs)
+
+
+def simulate(jobs: list, workers: int, lanes: bool, fast_lane_workers: int) -> list:
+    """
+    Run the jobs through the pool
+    
+    Returns:
+        (is small, arrival, completion) of every job
+    """
+    weights = {LANE_QUEUE_NAMES[lane]: weight for lane, weight in lane_weights().items()}
+    queues = {name: deque() for name in QUEUE_NAMES}
+    pool = []
+    for slot in range(workers):
+        names = [HIGH] if lanes and slot < fast_lane_workers else QUEUE_NAMES
+        pool.append((names, LaneScheduler(names, weights)))
+    free = [(0.0, slot) for slot in range(workers)]
+    waiting = []  # idle workers, by slot
+    done = []
+    position = 0
+    
+    def dispatch(now, slot):
+        names, scheduler = pool[slot]
+        if lanes:
+            order = scheduler.order([_Named(name) for name in names])
+            name = next((queue.name for queue in order if queues[queue.name]), None)
+        else:
+            name = min(
+                (name for name in names if queues[name]),
+                key=lambda name: queues[name][0][0],
+                default=None
+            )
+        if name is None:
+            return False
+        arrival, service, small = queues[name].popleft()
+        done.append((small, arrival, now + service))
+        heapq.heappush(free, (now + service, slot))
+        return True
+    
+    while position < len(jobs) or any(queues.values()) or free:
+        next_arrival = jobs[position][0] if position < len(jobs) else float("inf")
+        next_free = free[0][0] if free else float("inf")
+        if next_arrival == next_free == float("inf"):
+            break
+        if next_arrival <= next_free:
+            arrival, service, name, small = jobs[position]
+            position += 1
+            queues[name if lanes else HIGH].append((arrival, service, small))
+            # Idle workers wake up in slot order, like blocked BLPOPs
+            for slot in sorted(waiting):
+                if dispatch(arrival, slot):
+                    waiting.remove(slot)
+                    break
+        else:
+            now, slot = heapq.heappop(free)
+            if not dispatch(now, slot):
+                waiting.append(slot)
+    return done
+
+
+class _Named:
+    """Stands in for an RQ Queue in LaneScheduler.order"""
+    
+    def __init__(self, name: str):
+        self.name = name
+
+
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--fast-lane-workers", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=300, help="Seconds of small-file arrivals")
+    parser.add_argument("--small-rate", type=float, default=10, help="Small files per second")
+    parser.add_argument("--small-seconds", type=float, default=0.05, help="Median processing time of a small file")
+    parser.add_argument("--burst", type=int, default=300, help="Large files in the burst")
+    parser.add_argument("--burst-at", type=float, default=30)
+    parser.add_argument("--burst-spread", type=float, default=2, help="Seconds over which the burst arrives")
+    parser.add_argument("--large-seconds", type=float, default=1.5, help="Median processing time of a large file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    print(
+        f"{args.workers} workers, {args.small_rate:g} small files/s for {args.duration:g}s, "
+        f"burst of {args.burst} large files at {args.burst_at:g}s, weights {lane_weights()}"
+    )
+    print(
+        f"{'setup':>10} {'burst':>6} {'small p50':>10} {'small p95':>10} {'small max':>10} "
+        f"{'large p95':>10} {'last large':>11}"
+    )
+    setups = [("fifo", False, 0), ("lanes", True, 0), ("fast-lane", True, args.fast_lane_workers)]
+    for name, lanes, fast_lane_workers in setups:
+        for burst in (False, True):
+            jobs = make_jobs(random.Random(args.seed), args, burst)
+            done = simulate(jobs, args.workers, lanes, fast_lane_workers)
+            small = [end - arrival for is_small, arrival, end in done if is_small]
+            large = [end - arrival for is_small, arrival, end in done if not is_small]
+            if large:
+                last_large = max(end for is_small, _, end in done if not is_small)
+                large_columns = f"{percentile(large, 0.95):>9.1f}s {last_large:>10.1f}s"
+            else:
+                large_columns = f"{'-':>10} {'-':>11}"
+            print(
+                f"{name:>10} {'yes' if burst else 'no':>6} {percentile(small, 0.5) * 1000:>8.0f}ms "
+                f"{percentile(small, 0.95) * 1000:>8.0f}ms {max(small) * 1000:>8.0f}ms {large_columns}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Similarity Top-K Benchmark
+Compares the per-pair Python loop with the batched float32 top-k engine
+
+Before timing, checks on many small random sets full of duplicated
+vectors (exact ties) that both paths return the same ranking, ties broken
+by position.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_similarity
+    python -m benchmarks.bench_similarity --sizes 1000 10000 100000 --top-k 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.vector_search import find_top_k, stack_embeddings, cosine_scores, top_k_indices
+
+DIMENSIONS = 384
+
+
+def legacy_calculate_similarity(embedding1, embedding2) -> float:
+    """Per-pair cosine similarity as previously done by EmbeddingService"""
+    vec1 = np.array(embedding1)
+    vec2 = np.array(embedding2)
+    dot_product = np.dot(vec1, vec2)
+    norm1 = np.linalg.norm(vec1)
+    norm2 = np.linalg.norm(vec2)
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
+    return float((dot_product / (norm1 * norm2) + 1) / 2)
+
+
+def legacy_find_similar(query_embedding, candidate_embeddings, top_k):
+    """Loop, score every pair and sort the full list"""
+    similarities = []
+    for item_id, embedding in candidate_embeddings:
+        similarities.append((item_id, legacy_calculate_similarity(query_embedding, embedding)))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities[:top_k]
+
+
+def best_of(func, repeat: int) -> float:
+    """Best wall-clock time in milliseconds over `repeat` runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def check_ties(rng, rounds: int, top_k: int) -> int:
+    """
+    Compare both paths on candidate sets with duplicated vectors
+    
+    Returns:
+        Number of rounds whose ranking differs
+    """
+    mismatches = 0
+    for _ in range(rounds):
+        distinct = rng.standard_normal((int(rng.integers(2, 20)), DIMENSIONS))
+        rows = distinct[rng.integers(len(distinct), size=int(rng.integers(2, 80)))]
+        candidates = [(i, row.tolist()) for i, row in enumerate(rows)]
+        query = (distinct[rng.integers(len(distinct))] + rng.standard_normal(DIMENSIONS) * 0.1).tolist()
+        
+        legacy = [item_id for item_id, _ in legacy_find_similar(query, candidates, top_k)]
+        batched = [item_id for item_id, _ in find_top_k(query, candidates, top_k)]
+        if legacy != batched:
+            mismatches += 1
+            print(f"  ranking differs: loop {legacy}, batched {batched}")
+    return mismatches
+
+
+def run(sizes, top_k: int, repeat: int, seed: int, tie_rounds: int):
+    rng = np.random.default_rng(seed)
+    mismatches = check_ties(rng, tie_rounds, top_k)
+    print(f"Duplicate-vector rankings: {tie_rounds - mismatches}/{tie_rounds} identical to the loop\n")
+    query = rng.standard_normal(DIMENSIONS).tolist()
+    
+    print(
+        f"{'candidates':>10} | {'loop (ms)':>10} | {'batched (ms)':>12} | "
+        f"{'speedup':>8} | {'scoring only (ms)':>17} | ranking"
+    )
+    print("-" * 82)
+    
+    for size in sizes:
+        # Candidates arrive as Python lists, exactly as loaded from the ORM
+        matrix = rng.standard_normal((size, DIMENSIONS))
+        candidates = [(str(i), row.tolist()) for i, row in enumerate(matrix)]
+        
+        legacy = legacy_find_similar(query, candidates, top_k)
+        batched = find_top_k(query, candidates, top_k)
+        same_ranking = [item_id for item_id, _ in legacy] == [item_id for item_id, _ in batched]
+        
+        loop_ms = best_of(lambda: legacy_find_similar(query, candidates, top_k), repeat)
+        batched_ms = best_of(lambda: find_top_k(query, candidates, top_k), repeat)
+        
+        # Matrix already stacked: the cost once embeddings stay in NumPy
+        stacked, valid = stack_embeddings([embedding for _, embedding in candidates])
+        scoring_ms = best_of(lambda: top_k_indices(cosine_scores(query, stacked, valid), top_k), repeat)
+        
+        print(
+            f"{size:>10} | {loop_ms:>10.1f} | {batched_ms:>12.1f} | "
+            f"{loop_ms / batched_ms:>7.1f}x | {scoring_ms:>17.2f} | "
+            f"{'identical' if same_ranking else 'DIFFERENT'}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tie-rounds", type=int, default=2000, help="Random duplicate-vector sets checked")
+    args = parser.parse_args()
+    run(args.sizes, args.top_k, args.repeat, args.seed, args.tie_rounds)
+
+
+if __name__ == "__main__":
+    main()
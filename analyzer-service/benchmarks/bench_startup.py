@@ -0,0 +1,78 @@
+"""
+Startup Benchmark
+Import time of the API app and which heavy modules it pulls in
+
+Imports app.main in fresh interpreters (so nothing is cached in-process)
+and reports the median wall time. Importing the API must not import torch
+or sentence-transformers: the model is loaded through
+EmbeddingService.warmup(), by workers and by the API lifespan (for query
+encoding), never at import. Database connections are not opened, so this
+measures the cold-start cost that remains once the model is out of the way.
+
+Usage (from analyzer-service/):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --warmup
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "heavy": [name for name in %r if name in sys.modules],
+}))
+"""
+
+WARMUP_SCRIPT = """
+import json, time
+from app.services.embedding_service import embedding_service
+start = time.perf_counter()
+embedding_service.warmup()
+print(json.dumps({"seconds": time.perf_counter() - start, "loaded": embedding_service.is_loaded}))
+"""
+
+
+def run_script(script: str) -> dict:
+    """Run a snippet in a fresh interpreter and parse its JSON output"""
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="also time a worker model warmup")
+    args = parser.parse_args()
+    
+    samples = [run_script(IMPORT_SCRIPT % (HEAVY_MODULES,)) for _ in range(args.runs)]
+    seconds = [sample["seconds"] for sample in samples]
+    heavy = sorted({name for sample in samples for name in sample["heavy"]})
+    
+    print(f"import app.main  median {statistics.median(seconds) * 1000:8.1f} ms  "
+          f"min {min(seconds) * 1000:8.1f} ms  ({args.runs} runs)")
+    print(f"heavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+    
+    if args.warmup:
+        result = run_script(WARMUP_SCRIPT)
+        status = "loaded" if result["loaded"] else "FAILED"
+        print(f"worker model warmup  {result['seconds'] * 1000:8.1f} ms  ({status})")
+    
+    if heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
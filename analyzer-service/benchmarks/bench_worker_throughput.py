@@ -0,0 +1,94 @@
+"""
+Worker Throughput Benchmark
+Files per second of the single-job path against batch mode
+
+Measures the CPU work of a job (file analysis + embedding) on synthetic
+text files. Database writes and the simulated delay in process_file are
+left out, so the numbers isolate what batching changes: one model call
+per batch instead of one per file. The embedding cache is turned off, or
+every run after the first would read the vectors of the first.
+
+Usage (from analyzer-service/, needs the embedding model):
+    python -m benchmarks.bench_worker_throughput
+    python -m benchmarks.bench_worker_throughput --files 256 --batch-sizes 8 16 32
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.embedding_service import embedding_service
+from app.services.file_processor import analyze_file
+
+WORDS = (
+    "analysis report server request latency queue worker upload document "
+    "python database index cache memory vector search result error status"
+).split()
+
+
+def make_files(directory: Path, count: int, words_per_file: int, seed: int) -> list:
+    """Write `count` random text files and return their paths"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = directory / f"doc_{i}.txt"
+        lines = [" ".join(rng.choices(WORDS, k=12)) for _ in range(words_per_file // 12)]
+        path.write_text("\n".join(lines), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def run_single(paths: list) -> float:
+    """One analysis and one model call per file, like process_file"""
+    start = time.perf_counter()
+    for path in paths:
+        analysis = analyze_file(path, embedding_length=embedding_service.max_document_length)
+        embedding_service.generate_document_embedding(analysis['embedding_text'])
+    return len(paths) / (time.perf_counter() - start)
+
+
+def run_batched(paths: list, batch_size: int) -> float:
+    """Analyze a batch of files, then embed them with one model call"""
+    start = time.perf_counter()
+    for offset in range(0, len(paths), batch_size):
+        analyses = [
+            analyze_file(path, embedding_length=embedding_service.max_document_length)
+            for path in paths[offset:offset + batch_size]
+        ]
+        embedding_service.generate_document_embeddings(
+            [analysis['embedding_text'] for analysis in analyses]
+        )
+    return len(paths) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=128)
+    parser.add_argument("--words", type=int, default=600, help="Words per file")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 16, 32])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    # Every mode embeds the same files; measure the model, not the cache
+    embedding_service.cache.max_entries = 0
+    embedding_service.cache.redis_conn = None
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_files(Path(tmp), args.files, args.words, args.seed)
+        
+        # Warm up the model so loading time is not measured
+        run_single(paths[:2])
+        
+        baseline = run_single(paths)
+        print(f"{'mode':>12} | {'files/s':>8} | speedup")
+        print("-" * 34)
+        print(f"{'single':>12} | {baseline:>8.1f} | 1.0x")
+        for batch_size in args.batch_sizes:
+            throughput = run_batched(paths, batch_size)
+            print(f"{'batch=' + str(batch_size):>12} | {throughput:>8.1f} | {throughput / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Load Test
+Latency percentiles of the API under concurrent mixed traffic
+
+Runs `--concurrency` clients against a live service for `--duration`
+seconds. Each client loops over a weighted mix of requests: task lookups,
+task listings, similarity searches and small uploads. Reports throughput
+and p50/p95/p99 latency per endpoint.
+
+With the synchronous session, every Postgres round-trip blocked the event
+loop, so one slow request (e.g. a similarity index load) delayed all the
+others and p99 grew with concurrency. Compare a run before and after the
+async database layer:
+    
+    git checkout <before> && python -m benchmarks.load_test --user-id <uuid> --save before.json
+    git checkout <after>  && python -m benchmarks.load_test --user-id <uuid> --compare before.json
+
+Usage (from analyzer-service/, service running, needs httpx):
+    python -m benchmarks.load_test --user-id <uuid>
+    python -m benchmarks.load_test --user-id <uuid> --concurrency 100 --duration 60 \\
+        --mix task=5 tasks=3 similarity=2 upload=1
+
+The user must exist (the gateway creates users); the test uploads a few
+seed files for it when it has no tasks yet.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+DEFAULT_MIX = {"task": 5, "tasks": 3, "similarity": 2, "upload": 1}
+
+SEED_FILES = 8
+
+WORDS = (
+    "analysis report server request latency queue worker upload document "
+    "python database index cache memory vector search result error status"
+).split()
+
+
+def random_text(rng: random.Random, words: int = 200) -> bytes:
+    """Random text payload for uploads"""
+    return " ".join(rng.choices(WORDS, k=words)).encode("utf-8")
+
+
+class LoadTest:
+    """Shared state of one load test run"""
+    
+    def __init__(self, client: httpx.AsyncClient, user_id: str, mix: Dict[str, int], seed: int):
+        self.client = client
+        self.user_id = user_id
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.rng = random.Random(seed)
+        self.task_ids: List[str] = []
+        self.completed_ids: List[str] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+    
+    async def prepare(self):
+        """Collect the user's task ids, uploading seed files if there are none"""
+        await self.refresh_tasks()
+        if self.task_ids:
+            return
+        
+        print(f"No tasks for this user, uploading {SEED_FILES} seed files...")
+        for i in range(SEED_FILES):
+            await self.upload()
+        # Give the workers a moment so similarity searches have embeddings
+        for _ in range(30):
+            await self.refresh_tasks()
+            if self.completed_ids:
+                break
+            await asyncio.sleep(1)
+    
+    async def refresh_tasks(self):
+        response = await self.client.get("/api/v1/tasks", params={"user_id": self.user_id, "limit": 100})
+        response.raise_for_status()
+        tasks = response.json()["tasks"]
+        self.task_ids = [task["taskId"] for task in tasks]
+        self.completed_ids = [task["taskId"] for task in tasks if task["status"] == "completed"]
+    
+    async def upload(self) -> httpx.Response:
+        files = {"file": (f"load_{uuid.uuid4().hex[:8]}.txt", random_text(self.rng), "text/plain")}
+        return await self.client.post("/api/v1/upload", data={"user_id": self.user_id}, files=files)
+    
+    async def request(self, op: str) -> Optional[httpx.Response]:
+        """Send one request of the given kind"""
+        params = {"user_id": self.user_id}
+        if op == "task" and self.task_ids:
+            return await self.client.get(f"/api/v1/tasks/{self.rng.choice(self.task_ids)}", params=params)
+        if op == "tasks":
+            return await self.client.get("/api/v1/tasks", params={**params, "limit": 20})
+        if op == "similarity" and self.completed_ids:
+            task_id = self.rng.choice(self.completed_ids)
+            return await self.client.get(f"/api/v1/similarity/search/{task_id}", params=params)
+        if op == "upload":
+            return await self.upload()
+        return None
+    
+    async def client_loop(self, deadline: float):
+        """One simulated client sending requests back to back"""
+        while time.perf_counter() < deadline:
+            op = self.rng.choices(self.ops, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await self.request(op)
+            except httpx.HTTPError:
+                self.errors[op] += 1
+                continue
+            if response is None:
+                continue
+            self.latencies[op].append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                self.errors[op] += 1
+    
+    def report(self, duration: float) -> dict:
+        """Throughput and latency percentiles per operation and overall"""
+        def summarize(samples: List[float], errors: int) -> dict:
+            values = np.array(samples) * 1000
+            return {
+                "requests": len(samples),
+                "rps": round(len(samples) / duration, 1),
+                "p50": round(float(np.percentile(values, 50)), 1) if len(values) else None,
+                "p95": round(float(np.percentile(values, 95)), 1) if len(values) else None,
+                "p99": round(float(np.percentile(values, 99)), 1) if len(values) else None,
+                "max": round(float(values.max()), 1) if len(values) else None,
+                "errors": errors,
+            }
+        
+        report = {op: summarize(self.latencies[op], self.errors[op]) for op in self.ops}
+        report["all"] = summarize(
+            [latency for samples in self.latencies.values() for latency in samples],
+            sum(self.errors.values())
+        )
+        return report
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    """Print a latency table, with the change against a baseline run if given"""
+    print(f"{'endpoint':>12} {'reqs':>7} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    for op, row in report.items():
+        cells = [f"{row[key]:>8}" if row[key] is not None else f"{'-':>8}" for key in ("p50", "p95", "p99", "max")]
+        line = f"{op:>12} {row['requests']:>7} {row['rps']:>7} {' '.join(cells)} {row['errors']:>6}"
+        before = (baseline or {}).get(op)
+        if before and before.get("p99") and row["p99"]:
+            line += f"   p99 {before['p99']} -> {row['p99']} ms ({row['p99'] / before['p99']:.2f}x)"
+        print(line)
+
+
+async def run(args) -> dict:
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix = {op: int(weight) for op, weight in (item.split("=") for item in args.mix)}
+    
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        test = LoadTest(client, args.user_id, mix, seed=args.seed)
+        await test.prepare()
+        print(f"{len(test.task_ids)} tasks ({len(test.completed_ids)} completed), "
+              f"{args.concurrency} clients for {args.duration}s, mix {mix}")
+        
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(test.client_loop(deadline) for _ in range(args.concurrency)))
+        return test.report(args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--mix", nargs="+", metavar="OP=WEIGHT", help=f"request mix, default {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the report to a JSON file")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare against")
+    args = parser.parse_args()
+    
+    report = asyncio.run(run(args))
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+One-off data migrations
+
+Schema changes that Base.metadata.create_all cannot apply to existing tables.
+Run them from analyzer-service/ with `python -m migrations.<name>`.
+"""
@@ -0,0 +1,138 @@
+"""
+Compact Embeddings Migration
+Moves embeddings from float8[] columns to the packed binary format
+
+Adds the embedding_data / embedding_format / embedding_scale columns to the
+tasks and task_chunks tables, then re-encodes every legacy `embedding` array
+in batches (see app.services.embedding_codec). It is safe to re-run and to
+interrupt: only rows without embedding_data are converted.
+
+Rows that are not migrated yet have no embedding as far as the service is
+concerned, so run it right after deploying. --drop-legacy removes the old
+columns once every row has been converted.
+
+Usage (from analyzer-service/):
+    python -m migrations.compact_embeddings
+    python -m migrations.compact_embeddings --format int8 --batch-size 1000
+    python -m migrations.compact_embeddings --drop-legacy
+"""
+
+import argparse
+import time
+
+from sqlalchemy import inspect, text
+
+from app.config import settings
+from app.database import engine
+from app.services.embedding_codec import FORMATS, encode_embedding
+
+TABLES = ("tasks", "task_chunks")
+
+NEW_COLUMNS = (
+    "ADD COLUMN IF NOT EXISTS embedding_data BYTEA",
+    "ADD COLUMN IF NOT EXISTS embedding_format VARCHAR(16)",
+    "ADD COLUMN IF NOT EXISTS embedding_scale FLOAT",
+)
+
+
+def add_columns(table: str, columns: set):
+    """Add the binary embedding columns and relax the legacy one"""
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} {', '.join(NEW_COLUMNS)}"))
+        if "embedding" in columns:
+            # New rows no longer write the legacy array
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN embedding DROP NOT NULL"))
+
+
+def backfill(table: str, storage_format: str, batch_size: int) -> int:
+    """
+    Encode legacy arrays into embedding_data, one transaction per batch
+    
+    Returns:
+        Number of rows converted
+    """
+    select = text(
+        f"SELECT id, embedding FROM {table} "
+        f"WHERE embedding IS NOT NULL AND embedding_data IS NULL LIMIT :limit"
+    )
+    update = text(
+        f"UPDATE {table} SET embedding_data = :data, embedding_format = :format, "
+        f"embedding_scale = :scale WHERE id = :id"
+    )
+    
+    converted = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select, {"limit": batch_size}).all()
+            if not rows:
+                return converted
+            
+            params = []
+            for row in rows:
+                data, scale = encode_embedding(row.embedding, storage_format)
+                params.append({"id": row.id, "data": data, "format": storage_format, "scale": scale})
+            conn.execute(update, params)
+        
+        converted += len(rows)
+        print(f"   {table}: {converted} rows converted")
+
+
+def storage_report(table: str, columns: set):
+    """Print the average stored size of both representations"""
+    legacy = "AVG(pg_column_size(embedding))" if "embedding" in columns else "NULL"
+    with engine.connect() as conn:
+        row = conn.execute(text(
+            f"SELECT {legacy} AS legacy, AVG(pg_column_size(embedding_data)) AS packed FROM {table}"
+        )).one()
+    
+    def fmt(value):
+        return f"{float(value):.0f} bytes" if value is not None else "-"
+    
+    print(f"   {table}: legacy array {fmt(row.legacy)}, packed {fmt(row.packed)} per embedding")
+
+
+def drop_legacy(table: str):
+    """Drop the legacy array column once every row has been converted"""
+    with engine.begin() as conn:
+        remaining = conn.execute(text(
+            f"SELECT COUNT(*) FROM {table} WHERE embedding IS NOT NULL AND embedding_data IS NULL"
+        )).scalar()
+        if remaining:
+            print(f"⚠️  {table}: {remaining} rows not converted, keeping the legacy column")
+            return
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN embedding"))
+    print(f"✓ {table}: legacy embedding column dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=FORMATS, default=settings.EMBEDDING_STORAGE_FORMAT)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--drop-legacy", action="store_true", help="drop the float8[] columns afterwards")
+    args = parser.parse_args()
+    
+    inspector = inspect(engine)
+    start = time.time()
+    
+    for table in TABLES:
+        if not inspector.has_table(table):
+            print(f"- {table}: table does not exist, skipped")
+            continue
+        
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        print(f"🔄 Migrating {table} to {args.format}")
+        add_columns(table, columns)
+        
+        if "embedding" in columns:
+            converted = backfill(table, args.format, args.batch_size)
+            print(f"✓ {table}: {converted} embeddings converted")
+        storage_report(table, columns)
+        
+        if args.drop_legacy and "embedding" in columns:
+            drop_legacy(table)
+    
+    print(f"Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
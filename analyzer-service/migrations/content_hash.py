@@ -0,0 +1,39 @@
+"""
+Content Hash Migration
+Adds tasks.content_hash, used to deduplicate identical uploads
+
+New databases get the column and index from Base.metadata.create_all; this
+adds them to an existing tasks table (including one created by
+scripts/init-db.sql). The index is built without blocking writes
+(CREATE INDEX CONCURRENTLY). Existing tasks keep a NULL hash and are simply
+never matched. Safe to re-run.
+
+Usage (from analyzer-service/):
+    python -m migrations.content_hash
+"""
+
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+
+ADD_COLUMN = "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"
+
+CREATE_INDEX = "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_content_hash ON tasks (content_hash)"
+
+
+def main():
+    start = time.time()
+    print("🔄 Adding tasks.content_hash")
+    with engine.begin() as conn:
+        conn.execute(text(ADD_COLUMN))
+    print("🔄 Creating ix_tasks_content_hash")
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(CREATE_INDEX))
+    print(f"✓ Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
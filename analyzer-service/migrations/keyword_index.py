@@ -0,0 +1,99 @@
+"""
+Keyword Index Migration
+Adds the keyword search inverted index and fills it for existing tasks
+
+Adds tasks.term_count and creates the task_terms table with its covering
+(user_id, term) index, then re-reads the stored file of every completed
+task that has no term_count yet and writes its postings, one transaction
+per batch. It is safe to re-run and to interrupt. Tasks whose file is gone
+are skipped and stay out of keyword search.
+
+Usage (from analyzer-service/):
+    python -m migrations.keyword_index
+    python -m migrations.keyword_index --batch-size 100
+"""
+
+import argparse
+import time
+
+from sqlalchemy import select, text
+
+from app.database import SessionLocal, engine
+from app.models.task import Task
+from app.models.task_term import TaskTerm
+from app.redis_client import bump_keyword_version
+from app.services.file_processor import analyze_file
+from app.workers.file_worker import index_task_terms
+
+
+def add_schema():
+    """Add the term_count column and the task_terms table"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS term_count INTEGER"))
+    TaskTerm.__table__.create(bind=engine, checkfirst=True)
+
+
+def backfill(batch_size: int) -> dict:
+    """
+    Index completed tasks without term statistics, one transaction per batch
+    
+    Returns:
+        Counts of indexed and skipped tasks
+    """
+    counts = {"indexed": 0, "skipped": 0}
+    users = set()
+    last_id = None
+    
+    while True:
+        db = SessionLocal()
+        try:
+            query = select(Task).where(
+                Task.status == "completed",
+                Task.term_count.is_(None)
+            ).order_by(Task.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(Task.id > last_id)
+            tasks = db.scalars(query).all()
+            if not tasks:
+                break
+            
+            for task in tasks:
+                try:
+                    analysis = analyze_file(task.file_path)
+                except (FileNotFoundError, OSError) as e:
+                    print(f"   Skipping {task.id}: {e}")
+                    counts["skipped"] += 1
+                    continue
+                index_task_terms(db, task, analysis)
+                users.add(str(task.user_id))
+                counts["indexed"] += 1
+            
+            last_id = tasks[-1].id
+            db.commit()
+        finally:
+            db.close()
+        
+        print(f"   {counts['indexed']} indexed, {counts['skipped']} skipped")
+    
+    # Cached keyword statistics of these users are now stale
+    for user_id in users:
+        bump_keyword_version(user_id)
+    
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the keyword search index")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    
+    start = time.time()
+    print("🔄 Adding task_terms and tasks.term_count")
+    add_schema()
+    print("🔄 Indexing completed tasks")
+    counts = backfill(args.batch_size)
+    print(f"✓ Done in {time.time() - start:.1f}s ({counts['indexed']} indexed, {counts['skipped']} skipped)")
+
+
+if __name__ == "__main__":
+    main()
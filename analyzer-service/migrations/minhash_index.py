@@ -0,0 +1,156 @@
+"""
+MinHash Index Migration
+Adds near-duplicate detection at ingest and fills it for existing tasks
+
+Adds tasks.minhash_signature and tasks.near_duplicate_of, then re-reads
+the stored file of every completed task without a signature, stores its
+signature and adds it to the LSH band index in Redis, one transaction per
+batch. Existing tasks are not linked to each other; they become candidates
+for new uploads and for GET /duplicates/{task_id}. It is safe to re-run
+and to interrupt. Tasks whose file is gone are skipped.
+
+--rebuild-index only rebuilds the Redis band index from the stored
+signatures: after losing Redis data or changing MINHASH_BANDS. Changing
+MINHASH_PERMUTATIONS needs new signatures: clear the column
+(UPDATE tasks SET minhash_signature = NULL) and run the backfill again.
+
+Usage (from analyzer-service/):
+    python -m migrations.minhash_index
+    python -m migrations.minhash_index --batch-size 100
+    python -m migrations.minhash_index --rebuild-index
+"""
+
+import argparse
+import time
+
+from sqlalchemy import select, text
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models.task import Task
+from app.redis_client import redis_conn, add_minhash_signatures
+from app.services.file_processor import analyze_file
+from app.services.minhash import band_hashes, signature_from_bytes
+from app.workers.file_worker import record_minhash
+
+
+def add_schema():
+    """Add the minhash_signature and near_duplicate_of columns"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS minhash_signature BYTEA"))
+        conn.execute(text(
+            "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS near_duplicate_of UUID "
+            "REFERENCES tasks(id) ON DELETE SET NULL"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_near_duplicate_of ON tasks (near_duplicate_of)"
+        ))
+
+
+def backfill(batch_size: int) -> dict:
+    """
+    Sign completed tasks without a MinHash signature, one transaction per batch
+    
+    Returns:
+        Counts of signed and skipped tasks
+    """
+    counts = {"signed": 0, "skipped": 0}
+    last_id = None
+    
+    while True:
+        db = SessionLocal()
+        try:
+            query = select(Task).where(
+                Task.status == "completed",
+                Task.minhash_signature.is_(None)
+            ).order_by(Task.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(Task.id > last_id)
+            tasks = db.scalars(query).all()
+            if not tasks:
+                break
+            
+            entries = []
+            for task in tasks:
+                try:
+                    analysis = analyze_file(task.file_path, minhash_permutations=settings.MINHASH_PERMUTATIONS)
+                except (FileNotFoundError, OSError) as e:
+                    print(f"   Skipping {task.id}: {e}")
+                    counts["skipped"] += 1
+                    continue
+                entry = record_minhash(task, analysis, None)
+                if entry:
+                    entries.append(entry)
+                    counts["signed"] += 1
+            
+            last_id = tasks[-1].id
+            db.commit()
+            add_minhash_signatures(entries)
+        finally:
+            db.close()
+        
+        print(f"   {counts['signed']} signed, {counts['skipped']} skipped")
+    
+    return counts
+
+
+def rebuild_index(batch_size: int) -> int:
+    """
+    Replace the Redis band index with the stored signatures
+    
+    Returns:
+        Number of indexed tasks
+    """
+    for key in redis_conn.scan_iter(match="minhash:band:*", count=1000):
+        redis_conn.unlink(key)
+    
+    indexed = 0
+    last_id = None
+    with engine.connect() as conn:
+        while True:
+            query = select(Task.id, Task.user_id, Task.minhash_signature).where(
+                Task.status == "completed",
+                Task.minhash_signature.isnot(None)
+            ).order_by(Task.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(Task.id > last_id)
+            rows = conn.execute(query).all()
+            if not rows:
+                break
+            
+            add_minhash_signatures([
+                (
+                    str(row.user_id),
+                    str(row.id),
+                    band_hashes(signature_from_bytes(row.minhash_signature), settings.MINHASH_BANDS)
+                )
+                for row in rows
+            ])
+            indexed += len(rows)
+            last_id = rows[-1].id
+    
+    return indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the MinHash near-duplicate index")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--rebuild-index", action="store_true", help="Only rebuild the Redis band index")
+    args = parser.parse_args()
+    
+    start = time.time()
+    if args.rebuild_index:
+        print("🔄 Rebuilding the LSH band index")
+        indexed = rebuild_index(args.batch_size * 10)
+        print(f"✓ Done in {time.time() - start:.1f}s ({indexed} indexed)")
+        return
+    
+    print("🔄 Adding tasks.minhash_signature and tasks.near_duplicate_of")
+    add_schema()
+    print("🔄 Signing completed tasks")
+    counts = backfill(args.batch_size)
+    print(f"✓ Done in {time.time() - start:.1f}s ({counts['signed']} signed, {counts['skipped']} skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Task List Index Migration
+Creates the (user_id, created_at, id) index used by keyset pagination
+
+New databases get it from Base.metadata.create_all; this adds it to an
+existing tasks table without blocking writes (CREATE INDEX CONCURRENTLY).
+
+Usage (from analyzer-service/):
+    python -m migrations.task_list_index
+"""
+
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+
+CREATE_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_user_created_id "
+    "ON tasks (user_id, created_at DESC, id DESC)"
+)
+
+
+def main():
+    start = time.time()
+    print("🔄 Creating ix_tasks_user_created_id")
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(CREATE_INDEX))
+    print(f"✓ Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,9 @@ router.post('/upload', authenticate, uploadLimiter, upload.single('file'), async
       contentType: req.file.mimetype
     });
     formData.append('user_id', req.user.id);
+    if (req.body.priority) {
+      formData.append('priority', req.body.priority);
+    }
 
     // Forward request to analyzer service
     const response = await axios.post(
@@ -67,6 +70,56 @@ router.post('/upload', authenticate, uploadLimiter, upload.single('file'), async
   }
 });
 
+/**
+ * @route   POST /api/analyzer/upload/batch
+ * @desc    Upload many files for analysis in one request
+ * @access  Private
+ */
+router.post('/upload/batch', authenticate, uploadLimiter, upload.array('files', 100), async (req, res, next) => {
+  try {
+    if (!req.files || req.files.length === 0) {
+      return res.status(400).json({
+        error: 'Bad Request',
+        message: 'No files uploaded'
+      });
+    }
+
+    // Create form data to forward to analyzer service
+    const formData = new FormData();
+    for (const file of req.files) {
+      formData.append('files', file.buffer, {
+        filename: file.originalname,
+        contentType: file.mimetype
+      });
+    }
+    formData.append('user_id', req.user.id);
+    if (req.body.priority) {
+      formData.append('priority', req.body.priority);
+    }
+
+    // Forward request to analyzer service
+    const response = await axios.post(
+      `${ANALYZER_URL}/api/v1/upload/batch`,
+      formData,
+      {
+        headers: {
+          ...formData.getHeaders(),
+        },
+        maxContentLength: Infinity,
+        maxBodyLength: Infinity
+      }
+    );
+
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    if (error.response) {
+      // Forward error from analyzer service
+      return res.status(error.response.status).json(error.response.data);
+    }
+    next(error);
+  }
+});
+
 /**
  * @route   GET /api/analyzer/tasks/:taskId
  * @desc    Get task status and result
@@ -97,7 +150,7 @@ router.get('/tasks/:taskId', authenticate, async (req, res, next) => {
 
 /**
  * @route   GET /api/analyzer/tasks
- * @desc    Get all tasks for current user
+ * @desc    Get all tasks for current user, paginated with ?limit= and ?cursor=
  * @access  Private
  */
 router.get('/tasks', authenticate, async (req, res, next) => {
@@ -105,6 +158,37 @@ router.get('/tasks', authenticate, async (req, res, next) => {
     // Forward request to analyzer service
     const response = await axios.get(
       `${ANALYZER_URL}/api/v1/tasks`,
+      {
+        params: {
+          user_id: req.user.id,
+          limit: req.query.limit,
+          cursor: req.query.cursor
+        }
+      }
+    );
+
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    if (error.response) {
+      return res.status(error.response.status).json(error.response.data);
+    }
+    next(error);
+  }
+});
+
+/**
+ * @route   POST /api/analyzer/tasks/status
+ * @desc    Get status and timing of many tasks, body: { taskIds: [...] }
+ * @access  Private
+ */
+router.post('/tasks/status', authenticate, async (req, res, next) => {
+  try {
+    // Forward request to analyzer service
+    const response = await axios.post(
+      `${ANALYZER_URL}/api/v1/tasks/status`,
+      {
+        taskIds: req.body.taskIds
+      },
       {
         params: {
           user_id: req.user.id
@@ -121,6 +205,44 @@ router.get('/tasks', authenticate, async (req, res, next) => {
   }
 });
 
+/**
+ * @route   GET /api/analyzer/events
+ * @desc    Server-sent events for the user's task status changes (?task_id= for one task)
+ * @access  Private
+ */
+router.get('/events', authenticate, async (req, res, next) => {
+  try {
+    // Stream the analyzer's response through as it arrives
+    const response = await axios.get(
+      `${ANALYZER_URL}/api/v1/events`,
+      {
+        params: {
+          user_id: req.user.id,
+          task_id: req.query.task_id
+        },
+        responseType: 'stream'
+      }
+    );
+
+    res.writeHead(response.status, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive',
+      'X-Accel-Buffering': 'no'
+    });
+    response.data.pipe(res);
+
+    // Close the upstream stream when the client goes away
+    req.on('close', () => response.data.destroy());
+  } catch (error) {
+    if (error.response) {
+      res.status(error.response.status).type('application/json');
+      return error.response.data.pipe(res);
+    }
+    next(error);
+  }
+});
+
 /**
  * @route   GET /api/analyzer/similarity/search/:taskId
  * @desc    Find similar documents to a given task
@@ -150,6 +272,65 @@ router.get('/similarity/search/:taskId', authenticate, async (req, res, next) =>
   }
 });
 
+/**
+ * @route   GET /api/analyzer/similarity/query
+ * @desc    Find documents matching a free-text query
+ * @access  Private
+ */
+router.get('/similarity/query', authenticate, async (req, res, next) => {
+  try {
+    const { q, top_k } = req.query;
+
+    const response = await axios.get(
+      `${ANALYZER_URL}/api/v1/similarity/query`,
+      {
+        params: {
+          q,
+          user_id: req.user.id,
+          top_k: top_k || 5
+        }
+      }
+    );
+
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    if (error.response) {
+      return res.status(error.response.status).json(error.response.data);
+    }
+    next(error);
+  }
+});
+
+/**
+ * @route   GET /api/analyzer/search
+ * @desc    Search documents by keywords, optionally fused with semantic search
+ * @access  Private
+ */
+router.get('/search', authenticate, async (req, res, next) => {
+  try {
+    const { q, top_k, hybrid } = req.query;
+
+    const response = await axios.get(
+      `${ANALYZER_URL}/api/v1/search`,
+      {
+        params: {
+          q,
+          user_id: req.user.id,
+          top_k: top_k || 10,
+          hybrid
+        }
+      }
+    );
+
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    if (error.response) {
+      return res.status(error.response.status).json(error.response.data);
+    }
+    next(error);
+  }
+});
+
 /**
  * @route   POST /api/analyzer/similarity/compare
  * @desc    Compare similarity between two documents
@@ -180,4 +361,86 @@ router.post('/similarity/compare', authenticate, async (req, res, next) => {
   }
 });
 
+/**
+ * @route   POST /api/analyzer/duplicates/scan
+ * @desc    Queue a near-duplicate scan of the user's documents
+ * @access  Private
+ */
+router.post('/duplicates/scan', authenticate, async (req, res, next) => {
+  try {
+    const { threshold, full } = req.query;
+
+    const response = await axios.post(
+      `${ANALYZER_URL}/api/v1/duplicates/scan`,
+      {},
+      {
+        params: {
+          user_id: req.user.id,
+          threshold,
+          full
+        }
+      }
+    );
+
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    if (error.response) {
+      return res.status(error.response.status).json(error.response.data);
+    }
+    next(error);
+  }
+});
+
+/**
+ * @route   GET /api/analyzer/duplicates
+ * @desc    Get clusters of near-identical documents
+ * @access  Private
+ */
+router.get('/duplicates', authenticate, async (req, res, next) => {
+  try {
+    const response = await axios.get(
+      `${ANALYZER_URL}/api/v1/duplicates`,
+      {
+        params: {
+          user_id: req.user.id,
+          threshold: req.query.threshold
+        }
+      }
+    );
+
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    if (error.response) {
+      return res.status(error.response.status).json(error.response.data);
+    }
+    next(error);
+  }
+});
+
+/**
+ * @route   GET /api/analyzer/duplicates/:taskId
+ * @desc    Get the near-duplicates of one document (MinHash)
+ * @access  Private
+ */
+router.get('/duplicates/:taskId', authenticate, async (req, res, next) => {
+  try {
+    const response = await axios.get(
+      `${ANALYZER_URL}/api/v1/duplicates/${req.params.taskId}`,
+      {
+        params: {
+          user_id: req.user.id,
+          threshold: req.query.threshold
+        }
+      }
+    );
+
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    if (error.response) {
+      return res.status(error.response.status).json(error.response.data);
+    }
+    next(error);
+  }
+});
+
 module.exports = router;
\ No newline at end of file